@@ -102,6 +102,8 @@ try:
 
 except Exception as e:
     print("QuTiP warning: Cython setup failed: " + str(e))
+    # string-format time-dependence is evaluated by generated python code
+    qutip.settings.rhs_compile = False
 
 
 #------------------------------------------------------------------------------
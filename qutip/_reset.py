@@ -46,6 +46,14 @@ def _reset():
     qutip.settings.auto_tidyup = True
     qutip.settings.auto_tidyup_atol = 1e-12
     qutip.settings.debug = False
+    qutip.settings.rhs_cache_dir = os.path.join(os.path.expanduser("~"),
+                                                ".qutip", "rhs_cache")
+    qutip.settings.rhs_cache_size = 200
+    try:
+        import pyximport
+        qutip.settings.rhs_compile = True
+    except ImportError:
+        qutip.settings.rhs_compile = False
     # set cpus using hardware_info
     info = hardware_info()
     if 'cpus' in info:
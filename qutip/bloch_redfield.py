@@ -38,6 +38,7 @@ from qutip.qobj import Qobj, isket
 from qutip.superoperator import spre, spost, vec2mat, mat2vec, vec2mat_index
 from qutip.expect import expect
 from qutip.odeoptions import Odeoptions
+from qutip.odechecks import _ode_method_check
 from qutip.cy.spmatfuncs import cy_ode_rhs
 from qutip.odedata import Odedata
 
@@ -188,6 +189,7 @@ def bloch_redfield_solve(R, ekets, rho0, tlist, e_ops=[], options=None):
     initial_vector = mat2vec(rho_eb.full())
     r = scipy.integrate.ode(cy_ode_rhs)
     r.set_f_params(R.data.data, R.data.indices, R.data.indptr)
+    _ode_method_check(options, 'brmesolve')
     r.set_integrator('zvode', method=options.method, order=options.order,
                      atol=options.atol, rtol=options.rtol,
                      nsteps=options.nsteps, first_step=options.first_step,
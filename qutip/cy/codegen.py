@@ -30,7 +30,21 @@
 #    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
 #    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 ###############################################################################
+import os
+import sys
+import shutil
+import hashlib
+import importlib
+import tempfile
+import warnings
 import numpy as np
+from distutils.errors import DistutilsError, CCompilerError
+import qutip.settings
+
+# errors of a failed build or import of a compiled module, after which the
+# python code is used instead
+_build_errors = (ImportError, EnvironmentError, DistutilsError,
+                 CCompilerError, SystemExit)
 
 
 class Codegen():
@@ -78,9 +92,80 @@ class Codegen():
 
     def generate(self, filename="rhs.pyx"):
         """generate the file"""
+        self.generate_code()
+        self.file(filename)
+        self.file.writelines(self.code)
+        self.file.close()
+        self.odeconfig.cgen_num += 1
+
+    def generate_module(self, name=None):
+        """
+        Generate the code and return the name of the module to import it
+        from. Unless a name is given, the module is taken from the cache
+        of compiled modules in qutip.settings.rhs_cache_dir, and compiled
+        into it if no module with identical code exists. Otherwise, or if
+        the cache is disabled, the code is written to 'name.pyx' in the
+        current directory and compiled by pyximport.
+
+        If qutip.settings.rhs_compile is False, a python module with the
+        same functions is generated instead ('name.py'), which needs no
+        compilation (see generate_py_code). This is also done, with a
+        warning, if the compilation fails, e.g. because Cython or a C
+        compiler is not available.
+        """
+        if qutip.settings.rhs_compile:
+            h_tdterms = list(self.h_tdterms) if self.h_tdterms else None
+            c_tdterms = list(self.c_tdterms)
+            try:
+                return self._generate_module(name, compiled=True)
+            except _build_errors as e:
+                warnings.warn("Compiling the time-dependent RHS failed, " +
+                              "using python code instead: " + str(e))
+                # time_vars rewrites the terms in place
+                if h_tdterms:
+                    self.h_tdterms[:] = h_tdterms
+                self.c_tdterms[:] = c_tdterms
+                self.code = []
+                self.level = 0
+        return self._generate_module(name, compiled=False)
+
+    def _generate_module(self, name, compiled):
+        if compiled:
+            self.generate_code()
+            ext = ".pyx"
+        else:
+            self.generate_py_code()
+            ext = ".py"
+
+        if name is None and qutip.settings.rhs_cache_dir:
+            name = _rhs_cache_module("".join(self.code), ext)
+            self.odeconfig.cgen_num += 1
+            return name
+
+        if name is None:
+            name = "rhs" + str(self.odeconfig.cgen_num)
+        f = open(name + ext, "w")
+        f.writelines(self.code)
+        f.close()
+        if compiled:
+            # compile now, so that failures can be handled here
+            try:
+                importlib.import_module(name)
+            except Exception:
+                _rhs_remove(name)
+                raise
+        self.odeconfig.cgen_num += 1
+        return name
+
+    def generate_code(self):
+        """generate the lines of code"""
         self.time_vars()
         for line in cython_preamble():
             self.write(line)
+        if self.args and any([isinstance(value, np.ndarray)
+                              for value in self.args.values()]):
+            for line in cython_interp():
+                self.write(line)
 
         # write function for Hamiltonian terms (there is always at least one
         # term)
@@ -112,10 +197,71 @@ class Codegen():
                 self.write(line)
             self.write(self.func_end_real())
             self.dedent()
-        self.file(filename)
-        self.file.writelines(self.code)
-        self.file.close()
-        self.odeconfig.cgen_num += 1
+
+    def generate_py_code(self):
+        """
+        Generate the lines of a python module with the functions of the
+        Cython module. The coefficients of all terms are evaluated together
+        by one expression, compiled once on import, and the sum of the terms
+        is calculated by the precompiled spmv_terms.
+        """
+        self.time_vars()
+        for line in python_preamble():
+            self.write(line)
+
+        params = self.func_params()
+        self.write("")
+        self.write("")
+        self.write("def cy_td_ode_rhs(t, vec, " + ", ".join(params) + "):")
+        self.indent()
+        terms = self.rhs_terms()
+        coeffs = ["1.0" if coeff is None else coeff for d, coeff in terms]
+        self.write("coeffs = np.array([" + ", ".join(coeffs) +
+                   "], dtype=complex)")
+        for var in ["data", "idx", "ptr"]:
+            self.write("%s = (%s,)" % (var, ", ".join(["%s%d" % (var, d)
+                                                       for d, c in terms])))
+        self.write("return spmv_terms(data, idx, ptr, vec, coeffs)")
+        self.dedent()
+
+        if any(self.c_tdterms):
+            args = "".join([", " + name for name in self.args])
+            self.write("")
+            self.write("")
+            self.write("def col_spmv(which, t, data, idx, ptr, vec" +
+                       args + "):")
+            self.indent()
+            self.write("out = spmv_csr(data, idx, ptr, vec)")
+            for line in self.func_which():
+                self.write(line)
+            self.write(self.func_end())
+            self.dedent()
+            self.write("")
+            self.write("")
+            self.write("def col_expect(which, t, data, idx, ptr, vec" +
+                       args + "):")
+            self.indent()
+            self.write("out = np.vdot(vec, col_spmv(which, t, data, idx, " +
+                       "ptr, vec" + args + "))")
+            for line in self.func_which_expect():
+                self.write(line)
+            self.write(self.func_end_real())
+            self.dedent()
+
+    def func_params(self):
+        """
+        Returns the names of the parameters of the RHS function after the
+        time and state: the sparse matrix data of each term and the args.
+        """
+        n_terms = len(self.h_terms)
+        if any(self.c_tdterms):
+            n_terms += len(self.c_tdterms)
+        params = []
+        for k in range(n_terms):
+            params += ["data%d" % k, "idx%d" % k, "ptr%d" % k]
+        if self.args:
+            params += list(self.args.keys())
+        return params
 
     def indent(self):
         """increase indention level by one"""
@@ -146,8 +292,8 @@ class Codegen():
             td_consts = list(self.args.items())
             td_len = len(td_consts)
             for jj in range(td_len):
-                kind = type(td_consts[jj][1]).__name__
-                input_vars += ", np." + kind + "_t " + td_consts[jj][0]
+                input_vars += (", " + _arg_type(td_consts[jj][1]) + " " +
+                               td_consts[jj][0])
         func_end = "):"
         return [func_name + input_vars + func_end]
 
@@ -164,7 +310,10 @@ class Codegen():
             td_consts = list(self.args.items())
             td_len = len(td_consts)
             for jj in range(td_len):
-                kind = type(td_consts[jj][1]).__name__
+                if isinstance(td_consts[jj][1], np.ndarray):
+                    kind = "ndarray"
+                else:
+                    kind = type(td_consts[jj][1]).__name__
                 input_vars += ", np." + kind + " " + td_consts[jj][0]
         func_end = "):"
         return [func_name + input_vars + func_end]
@@ -182,8 +331,8 @@ class Codegen():
             td_consts = list(self.args.items())
             td_len = len(td_consts)
             for jj in range(td_len):
-                kind = type(td_consts[jj][1]).__name__
-                input_vars += ", np." + kind + "_t" + " " + td_consts[jj][0]
+                input_vars += (", " + _arg_type(td_consts[jj][1]) + " " +
+                               td_consts[jj][0])
         func_end = "):"
         return [func_name + input_vars + func_end]
 
@@ -210,65 +359,72 @@ class Codegen():
                     text = text.replace(self.func_list[kk], new_text)
                 self.c_tdterms[jj] = text
 
-    def func_vars(self):
-        """Writes the variables and their types & spmv parts"""
-        func_vars = ["", 'cdef Py_ssize_t row', 'cdef int num_rows = len(vec)',
-                     'cdef np.ndarray[CTYPE_t, ndim=1] ' +
-                     'out = np.zeros((num_rows),dtype=np.complex)']
-        func_vars.append(" ")
-        tdterms = self.h_tdterms
+    def rhs_terms(self):
+        """
+        Returns the index of the sparse matrix data and the coefficient
+        expression (None for constant terms) of each term of the RHS.
+        """
+        terms = []
         hinds = 0
         for ht in self.h_terms:
-            hstr = str(ht)
             if self.type == 'mc':
-                str_out = ("cdef np.ndarray[CTYPE_t, ndim=1] Hvec" + hstr +
-                           " = " + "spmv_csr(data" + hstr + "," +
-                           "idx" + hstr + "," + "ptr" + hstr +
-                           "," + "vec" + ")")
                 if ht in self.h_td_inds:
-                    str_out += " * " + tdterms[hinds]
+                    terms.append((ht, self.h_tdterms[hinds]))
                     hinds += 1
-                func_vars.append(str_out)
-            else:
-                if self.h_tdterms[ht] == "1.0":
-                    str_out = "spmvpy(data%s, idx%s, ptr%s, vec, 1.0, out)" % (
-                        ht, ht, ht)
                 else:
-                    str_out = "spmvpy(data%s, idx%s, ptr%s, vec, %s, out)" % (
-                        ht, ht, ht, self.h_tdterms[ht])
-                func_vars.append(str_out)
+                    terms.append((ht, None))
+            elif self.h_tdterms[ht] == "1.0":
+                terms.append((ht, None))
+            else:
+                terms.append((ht, self.h_tdterms[ht]))
 
-        if len(self.c_tdterms) > 0:
-            # add a spacer line between Hamiltonian components and collapse
-            # components.
-            func_vars.append(" ")
-            terms = len(self.c_tdterms)
-            tdterms = self.c_tdterms
-            cinds = 0
-            for ct in range(terms):
-                cstr = str(ct + hinds + 1)
-                str_out = ("cdef np.ndarray[CTYPE_t, ndim=1] Cvec" + str(ct) +
-                           " = " + "spmv_csr(data" + cstr + "," +
-                           "idx" + cstr + "," +
-                           "ptr" + cstr + "," + "vec" + ")")
-                if ct in range(len(self.c_td_inds)):
-                    str_out += " * np.abs(" + tdterms[ct] + ")**2"
-                    cinds += 1
-                func_vars.append(str_out)
+        for ct in range(len(self.c_tdterms)):
+            if ct in range(len(self.c_td_inds)):
+                terms.append((ct + hinds + 1,
+                              "np.abs(" + self.c_tdterms[ct] + ")**2"))
+            else:
+                terms.append((ct + hinds + 1, None))
+        return terms
+
+    def func_vars(self):
+        """
+        Writes the variables and their types, and evaluates the coefficients
+        of all time-dependent terms once per call.
+        """
+        func_vars = ["", "global _out_buffer",
+                     "cdef Py_ssize_t row, jj",
+                     "cdef int num_rows = len(vec)",
+                     "cdef CTYPE_t dot, term_dot",
+                     "cdef np.ndarray[CTYPE_t, ndim=1] out"]
+        for k, (d, coeff) in enumerate(self.rhs_terms()):
+            if coeff is not None:
+                func_vars.append("cdef CTYPE_t coeff%d = %s" % (k, coeff))
+        func_vars.append(" ")
+        # the output array is reused between calls
+        func_vars += ["if _out_buffer is None or " +
+                      "len(_out_buffer) != num_rows:",
+                      "\t_out_buffer = np.empty(num_rows, " +
+                      "dtype=np.complex128)",
+                      "out = _out_buffer"]
         return func_vars
 
     def func_for(self):
-        """Writes function for-loop"""
-        func_terms = []
-        if self.type == 'mc':
-            func_terms.append("for row in range(num_rows):")
-            sum_string = "\tout[row] = Hvec0[row]"
-            for ht in range(1, len(self.h_terms)):
-                sum_string += " + Hvec" + str(ht) + "[row]"
-            if any(self.c_tdterms):
-                for ct in range(len(self.c_tdterms)):
-                    sum_string += " + Cvec" + str(ct) + "[row]"
-            func_terms.append(sum_string)
+        """
+        Writes the fused for-loop that accumulates the products of all terms
+        with the state vector, row by row, directly into the output.
+        """
+        func_terms = ["for row in range(num_rows):", "\tdot = 0"]
+        for k, (d, coeff) in enumerate(self.rhs_terms()):
+            acc = "dot" if coeff is None else "term_dot"
+            if coeff is not None:
+                func_terms.append("\tterm_dot = 0")
+            func_terms.append("\tfor jj in range(ptr%d[row], ptr%d[row + 1]):"
+                              % (d, d))
+            func_terms.append("\t\t%s = %s + data%d[jj] * vec[idx%d[jj]]"
+                              % (acc, acc, d, d))
+            if coeff is not None:
+                func_terms.append("\tdot = dot + coeff%d * term_dot" % k)
+        func_terms.append("\tout[row] = dot")
         return func_terms
 
     def func_which(self):
@@ -312,7 +468,67 @@ def cython_preamble():
     line5 = ""
     line6 = "ctypedef np.complex128_t CTYPE_t"
     line7 = "ctypedef np.float64_t DTYPE_t"
-    return [line0, line1, line2, line3, line4, line5, line6, line7]
+    line8 = ""
+    line9 = "# output array of cy_td_ode_rhs, reused between calls"
+    lineA = "_out_buffer = None"
+    return [line0, line1, line2, line3, line4, line5, line6, line7,
+            line8, line9, lineA]
+
+
+def python_preamble():
+    """
+    Returns list of strings for the preamble of generated python modules.
+    """
+    line0 = ("# This file is generated automatically by QuTiP. " +
+             "(C) 2011-2013 Paul D. Nation & J. R. Johansson")
+    line1 = "import numpy as np"
+    line2 = "from qutip.cy.spmatfuncs import spmv_csr, spmv_terms"
+    line3 = "from qutip.interpolate import _interp"
+    return [line0, line1, line2, line3]
+
+
+def _arg_type(value):
+    """
+    Returns the Cython type of an argument of the time-dependent terms.
+    Arrays are the sample times (real, 1D) and interpolation coefficients
+    (complex, 2D) of sampled coefficients.
+    """
+    if isinstance(value, np.ndarray):
+        if value.ndim == 1:
+            return "np.ndarray[DTYPE_t, ndim=1]"
+        return "np.ndarray[CTYPE_t, ndim=2]"
+    return "np." + type(value).__name__ + "_t"
+
+
+def cython_interp():
+    """
+    Writes the function evaluating the interpolation of sampled coefficients
+    (see qutip.interpolate), with the interval found by bisection.
+    """
+    return ["",
+            "",
+            "@cython.boundscheck(False)",
+            "@cython.wraparound(False)",
+            "cdef CTYPE_t _interp(double t, np.ndarray[DTYPE_t, ndim=1] " +
+            "times, np.ndarray[CTYPE_t, ndim=2] coeffs):",
+            "\tcdef int n = times.shape[0]",
+            "\tcdef int lo = 0, hi = n - 1, mid",
+            "\tcdef double s",
+            "\tif t <= times[0]:",
+            "\t\treturn coeffs[0, 0]",
+            "\tif t >= times[hi]:",
+            "\t\tlo = hi - 1",
+            "\t\tt = times[hi]",
+            "\telse:",
+            "\t\twhile hi - lo > 1:",
+            "\t\t\tmid = (lo + hi) // 2",
+            "\t\t\tif times[mid] <= t:",
+            "\t\t\t\tlo = mid",
+            "\t\t\telse:",
+            "\t\t\t\thi = mid",
+            "\ts = t - times[lo]",
+            "\treturn coeffs[lo, 0] + s * (coeffs[lo, 1] + s * " +
+            "(coeffs[lo, 2] + s * coeffs[lo, 3]))"]
 
 
 def cython_checks():
@@ -366,3 +582,110 @@ def cython_col_expect(args):
     line7 = "\t\tout+=vec_ct[row]*dot[row]"
     return [line1, line2, line3, line4, line5, line6, line7]
 
+
+
+def _rhs_cache_module(code, ext=".pyx"):
+    """
+    Returns the name of the compiled module for the given Cython code in the
+    cache directory qutip.settings.rhs_cache_dir. The module name is derived
+    from a hash of the code, so that identical problems share one module
+    across processes and sessions, and the code is only compiled if the
+    module is not in the cache yet. Python code (ext ".py") is stored as is.
+    The hash also covers the Python and numpy versions and the platform, so
+    that a module built by another installation is never picked up.
+    """
+    cache_dir = qutip.settings.rhs_cache_dir
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    _rhs_cache_path()
+
+    # the cache may be shared by several python installations, so the
+    # interpreter, numpy version and platform are part of the key
+    key = "\n".join([code, sys.version, np.__version__, sys.platform])
+    name = "rhs_" + hashlib.sha1(key.encode('utf-8')).hexdigest()
+    filename = _rhs_cache_find(cache_dir, name)
+    if filename:
+        # mark as recently used
+        os.utime(filename, None)
+        return name
+
+    # compile in a private directory and move the module into the cache in
+    # one step, so that other processes never see an incomplete module
+    build_dir = tempfile.mkdtemp(dir=cache_dir)
+    try:
+        src_file = os.path.join(build_dir, name + ext)
+        f = open(src_file, "w")
+        f.write(code)
+        f.close()
+        if ext == ".pyx":
+            from pyximport import pyxbuild
+            src_file = pyxbuild.pyx_to_dll(
+                src_file, build_in_temp=True,
+                pyxbuild_dir=os.path.join(build_dir, "build"),
+                setup_args={'include_dirs': [np.get_include()]})
+        filename = os.path.join(cache_dir, os.path.basename(src_file))
+        os.rename(src_file, filename)
+    finally:
+        shutil.rmtree(build_dir, ignore_errors=True)
+
+    if hasattr(importlib, 'invalidate_caches'):
+        # the import system may not have noticed the new file yet
+        importlib.invalidate_caches()
+    _rhs_cache_evict(cache_dir, filename)
+    return name
+
+
+def _rhs_remove(name):
+    """
+    Removes the source file of a generated module from the current
+    directory, if there is one.
+    """
+    for ext in [".pyx", ".py"]:
+        if name and os.path.exists(name + ext):
+            os.remove(name + ext)
+
+
+def _rhs_cache_path():
+    """
+    Makes the modules in the RHS cache importable, also in worker processes
+    started before the cache was first used.
+    """
+    cache_dir = qutip.settings.rhs_cache_dir
+    if cache_dir and cache_dir not in sys.path:
+        sys.path.insert(0, cache_dir)
+
+
+def _rhs_cache_find(cache_dir, name):
+    """
+    Returns the file name of the compiled module `name` in the cache, or
+    None if it is not there.
+    """
+    for filename in os.listdir(cache_dir):
+        if filename.startswith(name + "."):
+            return os.path.join(cache_dir, filename)
+    return None
+
+
+def _rhs_cache_evict(cache_dir, keep):
+    """
+    Removes the least recently used modules from the cache until its size is
+    below qutip.settings.rhs_cache_size (in MB). The module `keep` is never
+    removed.
+    """
+    files = [os.path.join(cache_dir, filename)
+             for filename in os.listdir(cache_dir)
+             if filename.startswith("rhs_")]
+    files = [filename for filename in files if os.path.isfile(filename)]
+    size = sum([os.path.getsize(filename) for filename in files])
+    max_size = qutip.settings.rhs_cache_size * 1024 ** 2
+    for filename in sorted(files, key=os.path.getmtime):
+        if size <= max_size:
+            break
+        if filename == keep:
+            continue
+        try:
+            size -= os.path.getsize(filename)
+            os.remove(filename)
+        except OSError:
+            # removed by another process in the meantime
+            pass
@@ -104,6 +104,45 @@ def _breadth_first_search(
     return order, level
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _connected_components(
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] ind,
+        np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr,
+        int num_rows):
+    """
+    Labels the connected components of a graph with symmetric structure in
+    sparse CSR format, with one breadth first search per component.
+    Components are numbered in the order of their lowest node.
+    """
+
+    cdef unsigned int i, j, ii, jj, seed, head, tail
+    cdef int num_comps = 0
+    cdef np.ndarray[ITYPE_t] label = -1 * np.ones(num_rows, dtype=ITYPE)
+    cdef np.ndarray[ITYPE_t] queue = np.zeros(num_rows, dtype=ITYPE)
+
+    for seed in range(num_rows):
+        if label[seed] != -1:
+            continue
+        label[seed] = num_comps
+        queue[0] = seed
+        head = 0
+        tail = 1
+        while head < tail:
+            i = queue[head]
+            head += 1
+            # add unvisited neighbors to queue
+            for jj in range(ptr[i], ptr[i + 1]):
+                j = ind[jj]
+                if label[j] == -1:
+                    label[j] = num_comps
+                    queue[tail] = j
+                    tail += 1
+        num_comps += 1
+
+    return label, num_comps
+
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 def _rcm(
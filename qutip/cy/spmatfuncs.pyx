@@ -133,6 +133,31 @@ cpdef np.ndarray[CTYPE_t, ndim=1, mode="c"] spmvpy(
     return out
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[CTYPE_t, ndim=1, mode="c"] spmv_terms(
+        tuple data,
+        tuple idx,
+        tuple ptr,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] vec,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] coeffs):
+    """
+    Sparse matrix time vector function for a sum of terms:
+    out = sum_k coeffs[k] * (data[k], idx[k], ptr[k]) * vec
+    Terms with zero coefficient are skipped.
+    """
+    cdef int k
+    cdef int num_terms = len(data)
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] out = \
+        np.zeros((vec.shape[0]), dtype=np.complex)
+
+    for k in range(num_terms):
+        if coeffs[k] != 0:
+            spmvpy(data[k], idx[k], ptr[k], vec, coeffs[k], out)
+
+    return out
+
+
 @cython.boundscheck(False)
 @cython.wraparound(False)
 cpdef np.ndarray[CTYPE_t, ndim=1, mode="c"] cy_ode_rhs(
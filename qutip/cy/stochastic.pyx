@@ -34,12 +34,14 @@ import numpy as np
 cimport numpy as np
 cimport cython
 cimport libc.math
+from libc.stdlib cimport malloc, free
 
 from qutip.cy.spmatfuncs cimport (spmv_csr,
                                   cy_expect_rho_vec_csr, cy_expect_psi_csr)
 
 ctypedef np.complex128_t CTYPE_t
 ctypedef np.float64_t DTYPE_t
+ctypedef np.int32_t ITYPE_t
 
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -155,3 +157,196 @@ cpdef cy_d2_rho_photocurrent(object A, np.ndarray[CTYPE_t, ndim=1] rho_vec):
         return [- rho_vec]
 
 
+# -----------------------------------------------------------------------------
+# Fused Euler-Maruyama steps for the stochastic master equation
+#
+# The drift superoperator D and the stochastic superoperators M_k are stacked
+# into one csr matrix S = [D; M_1; M_2; ...], see
+# qutip.stochastic._generate_rho_A_ops_fused, which is stored as A_ops[0][8].
+# The traces Tr[M_k rho] only need the rows of the diagonal elements, and the
+# step
+#
+#   rho_new = c rho + w_0 D rho + sum_k w_k M_k rho
+#
+# is then evaluated in one pass over the rows of the state, without
+# temporary vectors.
+#
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef CTYPE_t _block_trace(CTYPE_t *data, ITYPE_t *idx, ITYPE_t *ptr,
+                          int block, int N2, int n, CTYPE_t *rho) nogil:
+    """
+    Tr[M rho] for the block M of S.
+    """
+    cdef int j, jj, row
+    cdef CTYPE_t tr = 0.0
+
+    for j in range(n):
+        row = block * N2 + j * (n + 1)
+        for jj in range(ptr[row], ptr[row + 1]):
+            tr = tr + data[jj] * rho[idx[jj]]
+    return tr
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fused_step(CTYPE_t *data, ITYPE_t *idx, ITYPE_t *ptr,
+                      int n_blocks, int N2, CTYPE_t *w, CTYPE_t c,
+                      CTYPE_t *rho, CTYPE_t *out) nogil:
+    """
+    out = c rho + sum_b w[b] S_b rho, skipping the blocks with w[b] = 0.
+    """
+    cdef int i, b, jj, row
+    cdef CTYPE_t acc, dot
+
+    for i in range(N2):
+        acc = c * rho[i]
+        for b in range(n_blocks):
+            if w[b] == 0:
+                continue
+            row = b * N2 + i
+            dot = 0.0
+            for jj in range(ptr[row], ptr[row + 1]):
+                dot = dot + data[jj] * rho[idx[jj]]
+            acc = acc + w[b] * dot
+        out[i] = acc
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[CTYPE_t, ndim=1] cy_rhs_rho_euler_homodyne(
+        object L,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] rho_t,
+        double t,
+        object A_ops,
+        double dt,
+        np.ndarray[DTYPE_t, ndim=2] dW,
+        object d1, object d2, object args):
+    """
+    Euler-Maruyama step for homodyne detection,
+
+        rho + D rho dt + sum_k (M_k rho - Tr[M_k rho] rho) dW_k,
+
+    with S = [D; M_1; ...; M_K], D = L + sum_k D[c_k] and
+    M_k = c_k,L + c_k^dag,R.
+    """
+    S = A_ops[0][8]
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] data = S.data
+    cdef np.ndarray[ITYPE_t, ndim=1, mode="c"] idx = S.indices
+    cdef np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr = S.indptr
+    cdef int N2 = rho_t.shape[0]
+    cdef int n = <int>libc.math.sqrt(N2)
+    cdef int K = dW.shape[0]
+    cdef int k
+    cdef CTYPE_t c = 1.0
+    cdef CTYPE_t *w = <CTYPE_t *>malloc((K + 1) * sizeof(CTYPE_t))
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] out = \
+        np.empty(N2, dtype=complex)
+
+    w[0] = dt
+    for k in range(K):
+        w[k + 1] = dW[k, 0]
+        c -= w[k + 1] * _block_trace(&data[0], &idx[0], &ptr[0],
+                                     k + 1, N2, n, &rho_t[0])
+    _fused_step(&data[0], &idx[0], &ptr[0], K + 1, N2, w, c,
+                &rho_t[0], &out[0])
+    free(w)
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[CTYPE_t, ndim=1] cy_rhs_rho_euler_heterodyne(
+        object L,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] rho_t,
+        double t,
+        object A_ops,
+        double dt,
+        np.ndarray[DTYPE_t, ndim=2] dW,
+        object d1, object d2, object args):
+    """
+    Euler-Maruyama step for heterodyne detection,
+
+        rho + D rho dt + sum_k [(M_k rho - Tr[M_k rho] rho) dW_k,1
+                                - i (N_k rho - Tr[N_k rho] rho) dW_k,2] / sqrt(2),
+
+    with S = [D; M_1; N_1; ...; M_K; N_K], D = L + sum_k D[c_k],
+    M_k = c_k,L + c_k^dag,R and N_k = c_k,L - c_k^dag,R.
+    """
+    S = A_ops[0][8]
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] data = S.data
+    cdef np.ndarray[ITYPE_t, ndim=1, mode="c"] idx = S.indices
+    cdef np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr = S.indptr
+    cdef int N2 = rho_t.shape[0]
+    cdef int n = <int>libc.math.sqrt(N2)
+    cdef int K = dW.shape[0]
+    cdef int k, b
+    cdef double r = 1.0 / libc.math.sqrt(2.0)
+    cdef CTYPE_t c = 1.0
+    cdef CTYPE_t *w = <CTYPE_t *>malloc((2 * K + 1) * sizeof(CTYPE_t))
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] out = \
+        np.empty(N2, dtype=complex)
+
+    w[0] = dt
+    for k in range(K):
+        w[2 * k + 1] = r * dW[k, 0]
+        w[2 * k + 2] = -1.0j * r * dW[k, 1]
+    for b in range(1, 2 * K + 1):
+        c -= w[b] * _block_trace(&data[0], &idx[0], &ptr[0],
+                                 b, N2, n, &rho_t[0])
+    _fused_step(&data[0], &idx[0], &ptr[0], 2 * K + 1, N2, w, c,
+                &rho_t[0], &out[0])
+    free(w)
+    return out
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray[CTYPE_t, ndim=1] cy_rhs_rho_euler_photocurrent(
+        object L,
+        np.ndarray[CTYPE_t, ndim=1, mode="c"] rho_t,
+        double t,
+        object A_ops,
+        double dt,
+        np.ndarray[DTYPE_t, ndim=2] dW,
+        object d1, object d2, object args):
+    """
+    Euler step for photo-current detection with the jump counts dW,
+
+        rho + D rho dt + sum_k 0.5 Tr[N_k rho] rho dt
+            + sum_k (J_k rho / Tr[J_k rho] - rho) dW_k,
+
+    with S = [D; J_1; ...; J_K; N_1; ...; N_K], D = L - sum_k 0.5 N_k,
+    J_k = c_k,L c_k^dag,R and N_k = (c_k^dag c_k)_L + (c_k^dag c_k)_R.
+    """
+    S = A_ops[0][8]
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] data = S.data
+    cdef np.ndarray[ITYPE_t, ndim=1, mode="c"] idx = S.indices
+    cdef np.ndarray[ITYPE_t, ndim=1, mode="c"] ptr = S.indptr
+    cdef int N2 = rho_t.shape[0]
+    cdef int n = <int>libc.math.sqrt(N2)
+    cdef int K = dW.shape[0]
+    cdef int k
+    cdef CTYPE_t c = 1.0
+    cdef CTYPE_t e
+    cdef CTYPE_t *w = <CTYPE_t *>malloc((2 * K + 1) * sizeof(CTYPE_t))
+    cdef np.ndarray[CTYPE_t, ndim=1, mode="c"] out = \
+        np.empty(N2, dtype=complex)
+
+    w[0] = dt
+    for k in range(K):
+        c += 0.5 * dt * _block_trace(&data[0], &idx[0], &ptr[0],
+                                     K + 1 + k, N2, n, &rho_t[0])
+        w[K + 1 + k] = 0.0
+        w[k + 1] = 0.0
+        if dW[k, 0] != 0:
+            c -= dW[k, 0]
+            e = _block_trace(&data[0], &idx[0], &ptr[0],
+                             k + 1, N2, n, &rho_t[0])
+            if e.real > 1e-12:
+                w[k + 1] = dW[k, 0] / e
+    _fused_step(&data[0], &idx[0], &ptr[0], 2 * K + 1, N2, w, c,
+                &rho_t[0], &out[0])
+    free(w)
+    return out
@@ -0,0 +1,260 @@
+# This file is part of QuTiP: Quantum Toolbox in Python.
+#
+#    Copyright (c) 2011 and later, Paul D. Nation and Robert J. Johansson.
+#    All rights reserved.
+#
+#    Redistribution and use in source and binary forms, with or without
+#    modification, are permitted provided that the following conditions are
+#    met:
+#
+#    1. Redistributions of source code must retain the above copyright notice,
+#       this list of conditions and the following disclaimer.
+#
+#    2. Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#
+#    3. Neither the name of the QuTiP: Quantum Toolbox in Python nor the names
+#       of its contributors may be used to endorse or promote products derived
+#       from this software without specific prior written permission.
+#
+#    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+#    PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#    HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#    LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#    DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#    THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+"""
+Explicit Dormand-Prince 5(4) integrator with continuous (dense) output.
+
+The integrator follows the interface of :class:`scipy.integrate.ode` closely
+enough to be used as a drop-in replacement in the Monte-Carlo solver, but in
+addition the solution can be evaluated anywhere inside the last step through
+:meth:`Dopri5.dense`, without re-integrating.
+"""
+
+import numpy as np
+
+# Butcher tableau of the Dormand-Prince 5(4) pair
+_C = np.array([0, 1 / 5., 3 / 10., 4 / 5., 8 / 9., 1])
+_A = [np.array([]),
+      np.array([1 / 5.]),
+      np.array([3 / 40., 9 / 40.]),
+      np.array([44 / 45., -56 / 15., 32 / 9.]),
+      np.array([19372 / 6561., -25360 / 2187., 64448 / 6561., -212 / 729.]),
+      np.array([9017 / 3168., -355 / 33., 46732 / 5247., 49 / 176.,
+                -5103 / 18656.])]
+_B = np.array([35 / 384., 0, 500 / 1113., 125 / 192., -2187 / 6784.,
+               11 / 84.])
+# difference between the 5th and 4th order solutions
+_E = np.array([-71 / 57600., 0, 71 / 16695., -71 / 1920., 17253 / 339200.,
+               -22 / 525., 1 / 40.])
+# coefficients of the 4th order continuous extension
+_P = np.array([
+    [1, -8048581381 / 2820520608., 8663915743 / 2820520608.,
+     -12715105075 / 11282082432.],
+    [0, 0, 0, 0],
+    [0, 131558114200 / 32700410799., -68118460800 / 10900136933.,
+     87487479700 / 32700410799.],
+    [0, -1754552775 / 470086768., 14199869525 / 1410260304.,
+     -10690763975 / 1880347072.],
+    [0, 127303824393 / 49829197408., -318862633887 / 49829197408.,
+     701980252875 / 199316789632.],
+    [0, -282668133 / 205662961., 2019193451 / 616988883.,
+     -1453857185 / 822651844.],
+    [0, 40617522 / 29380423., -110615467 / 29380423.,
+     69997945 / 29380423.]])
+
+_SAFETY = 0.9
+_MIN_FACTOR = 0.2
+_MAX_FACTOR = 10.0
+
+
+class Dopri5():
+    """
+    Adaptive Dormand-Prince 5(4) integrator with dense output for complex
+    valued ODEs ``dy/dt = f(t, y, *f_params)``.
+
+    The class mimics the parts of :class:`scipy.integrate.ode` used by the
+    solvers: :meth:`set_f_params`, :meth:`set_integrator`,
+    :meth:`set_initial_value`, :meth:`integrate` and :meth:`successful`.
+    In contrast to ``zvode``, a single step (``step=1``) never moves the
+    solution past the requested time, so there is no need to reset the
+    integrator to hit the output times exactly.
+
+    Parameters
+    ----------
+    f : function
+        Right-hand side ``f(t, y, *f_params)``.
+
+    """
+    def __init__(self, f):
+        self.f = f
+        self.f_params = ()
+        self.atol = 1e-8
+        self.rtol = 1e-6
+        self.nsteps = 1000
+        self.first_step = 0
+        self.max_step = 0
+        self.t = None
+        self.y = None
+        # number of right-hand side evaluations
+        self.nfev = 0
+        self._h = 0
+        self._success = True
+
+    def set_f_params(self, *args):
+        self.f_params = args
+        return self
+
+    def set_integrator(self, name=None, atol=1e-8, rtol=1e-6, nsteps=1000,
+                       first_step=0, max_step=0, **kwargs):
+        """
+        Sets the tolerances and step size limits. Options that only apply
+        to ``zvode`` (method, order, min_step) are ignored.
+        """
+        self.atol = atol
+        self.rtol = rtol
+        self.nsteps = nsteps
+        self.first_step = first_step
+        self.max_step = max_step
+        return self
+
+    def set_initial_value(self, y, t=0.0):
+        """
+        Restarts the integration from state `y` at time `t`. The last
+        accepted step size is kept as initial guess for the next step.
+        """
+        self.y = np.array(y, dtype=complex)
+        self.t = t
+        # start and end of the current internal step
+        self._t_old = t
+        self._y_old = self.y
+        self._t_int = t
+        self._y_int = self.y
+        self._K = None
+        self._f_int = self._eval(t, self.y)
+        self._success = True
+        return self
+
+    def successful(self):
+        return self._success
+
+    def _eval(self, t, y):
+        self.nfev += 1
+        # copy, since generated right-hand sides reuse their output array
+        return np.array(self.f(t, y, *self.f_params), dtype=complex)
+
+    def _scale(self, y, y_new):
+        return self.atol + self.rtol * np.maximum(np.abs(y), np.abs(y_new))
+
+    def _initial_step(self, t_end):
+        if self.first_step:
+            return self.first_step
+        if self._h:
+            return self._h
+        y0, f0 = self._y_int, self._f_int
+        scale = self._scale(y0, y0)
+        d0 = np.sqrt(np.mean(np.abs(y0 / scale) ** 2))
+        d1 = np.sqrt(np.mean(np.abs(f0 / scale) ** 2))
+        if d0 < 1e-5 or d1 < 1e-5:
+            h0 = 1e-6
+        else:
+            h0 = 0.01 * d0 / d1
+        h0 = min(h0, abs(t_end - self._t_int))
+        y1 = y0 + h0 * f0
+        f1 = self._eval(self._t_int + h0, y1)
+        d2 = np.sqrt(np.mean(np.abs((f1 - f0) / scale) ** 2)) / h0
+        if max(d1, d2) <= 1e-15:
+            h1 = max(1e-6, h0 * 1e-3)
+        else:
+            h1 = (0.01 / max(d1, d2)) ** (1 / 5.)
+        return min(100 * h0, h1)
+
+    def _step(self, t_end):
+        """
+        Takes one accepted step from the end of the current internal step,
+        never stepping past t_end.
+        """
+        t, y, f0 = self._t_int, self._y_int, self._f_int
+        h = self._initial_step(t_end)
+        if self.max_step:
+            h = min(h, self.max_step)
+
+        K = np.empty((7, y.shape[0]), dtype=complex)
+        K[0] = f0
+        while True:
+            last = t + h >= t_end
+            if last:
+                h = t_end - t
+            for s in range(1, 6):
+                dy = np.dot(K[:s].T, _A[s]) * h
+                K[s] = self._eval(t + _C[s] * h, y + dy)
+            y_new = y + h * np.dot(K[:6].T, _B)
+            K[6] = self._eval(t + h, y_new)
+
+            err = h * np.dot(K.T, _E) / self._scale(y, y_new)
+            err_norm = np.sqrt(np.mean(np.abs(err) ** 2))
+
+            if err_norm < 1:
+                if err_norm == 0:
+                    factor = _MAX_FACTOR
+                else:
+                    factor = min(_MAX_FACTOR,
+                                 _SAFETY * err_norm ** (-1 / 5.))
+                if last:
+                    # a step shortened to hit t_end says little about the
+                    # size of the next one
+                    self._h = max(self._h, h * factor)
+                else:
+                    self._h = h * factor
+                break
+            h *= max(_MIN_FACTOR, _SAFETY * err_norm ** (-1 / 5.))
+            if h < 1e-14 * max(abs(t), 1.0):
+                raise Exception("Dopri5: step size too small.")
+
+        self._t_old, self._y_old = t, y
+        self._t_int = t_end if last else t + h
+        self._y_int, self._f_int = y_new, K[6]
+        self._K = K
+
+    def dense(self, t):
+        """
+        Evaluates the continuous extension of the last step at time `t`,
+        which must lie within that step.
+        """
+        if t == self._t_int or self._K is None:
+            return self._y_int
+        h = self._t_int - self._t_old
+        x = (t - self._t_old) / h
+        p = np.cumprod([x] * 4)
+        return self._y_old + h * np.dot(np.dot(self._K.T, _P), p)
+
+    def integrate(self, t, step=0):
+        """
+        Integrates up to time `t`. With ``step=1`` a single step is taken,
+        ending at `t` at the latest.
+        """
+        try:
+            if step:
+                self._step(t)
+                self.t = self._t_int
+            else:
+                n = 0
+                while self._t_int < t:
+                    n += 1
+                    if n > self.nsteps:
+                        raise Exception("Dopri5: nsteps exceeded.")
+                    self._step(t)
+                self.t = t
+        except Exception:
+            self._success = False
+            raise
+        self.y = self.dense(self.t)
+        return self.y
@@ -164,3 +164,98 @@ def variance(oper, state):
 
     """
     return expect(oper ** 2, state) - expect(oper, state) ** 2
+
+
+class _ExpectOps():
+    """
+    A set of expectation value operators, stacked into sparse matrices so
+    that the expectation values of all operators are evaluated in one pass
+    over the state, as needed by the time-evolution solvers.
+
+    For kets the operators are stacked on top of each other, and for density
+    matrices in stacked-column form (see mat2vec) each operator contributes
+    a single row ``A_ij -> rho_ji`` of a trace matrix. The memory needed is
+    therefore proportional to the number of nonzero elements of the
+    operators. Expectation values of hermitian operators are evaluated with
+    real arithmetic only and returned as real numbers.
+
+    Parameters
+    ----------
+    e_ops : list of :class:`qutip.Qobj` / sparse matrices
+        The expectation value operators.
+
+    isherm : list of bool
+        Which expectation values are real. Taken from the Qobjs if not given.
+
+    rho_vec : bool {False, True}
+        Whether the states are density matrices in stacked-column form
+        instead of kets.
+
+    """
+    def __init__(self, e_ops, isherm=None, rho_vec=False):
+        if isherm is None:
+            isherm = [op.isherm for op in e_ops]
+        data = [op.data if isinstance(op, Qobj) else sp.csr_matrix(op)
+                for op in e_ops]
+
+        self.num = len(data)
+        self.rho_vec = rho_vec
+        self.herm_inds = [k for k in range(self.num) if isherm[k]]
+        self.cplx_inds = [k for k in range(self.num) if not isherm[k]]
+        self.N = data[0].shape[0] if self.num else 0
+
+        if rho_vec:
+            N = self.N
+            rows = []
+            for op in data:
+                op = op.tocoo()
+                rows.append(sp.csr_matrix((op.data, (np.zeros(op.nnz, int),
+                                                     op.col + N * op.row)),
+                                          shape=(1, N ** 2), dtype=complex))
+            data = rows
+
+        self.cplx_ops = None
+        if self.cplx_inds:
+            self.cplx_ops = sp.vstack([data[k] for k in self.cplx_inds],
+                                      format='csr')
+        self.herm_ops = None
+        if self.herm_inds:
+            herm_ops = sp.vstack([data[k] for k in self.herm_inds],
+                                 format='csr')
+            if rho_vec:
+                # Tr(A rho) = Re(A).Re(rho) - Im(A).Im(rho) when real
+                self.herm_ops = (herm_ops.real.tocsr(), herm_ops.imag.tocsr())
+            else:
+                self.herm_ops = herm_ops
+
+    def expect(self, state):
+        """
+        Returns the list of expectation values of all operators for the
+        state vector `state`. Several states can be given as the columns
+        of a matrix, in which case each expectation value is an array with
+        one element per column.
+        """
+        out = [None] * self.num
+        if self.cplx_ops is not None:
+            vals = self._apply(self.cplx_ops, state, len(self.cplx_inds))
+            for k, val in zip(self.cplx_inds, vals):
+                out[k] = val
+        if self.herm_ops is not None:
+            n = len(self.herm_inds)
+            if self.rho_vec:
+                op_re, op_im = self.herm_ops
+                vals = op_re.dot(state.real) - op_im.dot(state.imag)
+            else:
+                Astate = self.herm_ops.dot(state).reshape(
+                    (n, self.N) + state.shape[1:])
+                vals = np.sum(state.real * Astate.real +
+                              state.imag * Astate.imag, axis=1)
+            for k, val in zip(self.herm_inds, vals):
+                out[k] = val
+        return out
+
+    def _apply(self, ops, state, n):
+        if self.rho_vec:
+            return ops.dot(state)
+        Astate = ops.dot(state).reshape((n, self.N) + state.shape[1:])
+        return np.sum(state.conj() * Astate, axis=1)
@@ -30,8 +30,12 @@
 #    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
 #    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 ###############################################################################
+import os
 import pickle
+import hashlib
+from functools import partial
 import numpy as np
+import scipy.sparse as sp
 
 from qutip.qobj import Qobj
 from qutip.odedata import Odedata
@@ -290,3 +294,117 @@ def qload(name):
     else:
         print("Loaded " + str(type(out).__name__) + " object.")
     return out
+
+
+# -----------------------------------------------------------------------------
+# Checkpoints of long trajectory runs
+#
+def _checkpoint_save(path, name, data):
+    """
+    Stores `data` as 'name.qu' in the checkpoint directory `path`. The data
+    is written to a temporary file first, so that an interrupted write
+    never leaves a truncated checkpoint behind.
+    """
+    filename = os.path.join(path, name + '.qu')
+    fileObject = open(filename + '.tmp', 'wb')
+    pickle.dump(data, fileObject)
+    fileObject.close()
+    try:
+        os.rename(filename + '.tmp', filename)
+    except OSError:
+        # windows does not overwrite on rename
+        os.remove(filename)
+        os.rename(filename + '.tmp', filename)
+
+
+def _checkpoint_hash(*objects):
+    """
+    Returns a SHA-1 digest of the operators, states, arrays, strings and
+    numbers in `objects` (also nested in lists, tuples and dicts), which
+    identifies the problem a checkpoint belongs to. Functions are identified
+    by their module, name and byte code.
+    """
+    sha = hashlib.sha1()
+
+    def _update(obj):
+        if isinstance(obj, Qobj):
+            sha.update(b'Qobj' + repr(obj.dims).encode('utf-8'))
+            _update(obj.data)
+        elif sp.issparse(obj):
+            obj = sp.csr_matrix(obj)
+            obj.sort_indices()
+            sha.update(repr(obj.shape).encode('utf-8'))
+            for arr in [obj.data, obj.indices, obj.indptr]:
+                _update(arr)
+        elif isinstance(obj, np.ndarray):
+            arr = np.ascontiguousarray(obj)
+            sha.update((arr.dtype.str + repr(arr.shape)).encode('utf-8'))
+            if arr.dtype != object:
+                sha.update(arr.tobytes() if hasattr(arr, 'tobytes')
+                           else arr.tostring())
+            else:
+                _update(arr.tolist())
+        elif isinstance(obj, (list, tuple)):
+            sha.update(('%s%d' % (type(obj).__name__, len(obj))).encode())
+            for item in obj:
+                _update(item)
+        elif isinstance(obj, dict):
+            sha.update(('dict%d' % len(obj)).encode())
+            for key in sorted(obj, key=repr):
+                _update(key)
+                _update(obj[key])
+        elif isinstance(obj, partial):
+            _update(obj.func)
+            _update(obj.args)
+            _update(obj.keywords or {})
+        elif hasattr(obj, '__code__'):
+            sha.update(('%s.%s' % (obj.__module__, obj.__name__)).encode())
+            sha.update(obj.__code__.co_code)
+        elif callable(obj):
+            sha.update(('%s.%s' % (getattr(obj, '__module__', ''),
+                                   getattr(obj, '__name__', repr(obj))))
+                       .encode('utf-8'))
+        else:
+            sha.update(repr(obj).encode('utf-8'))
+
+    for obj in objects:
+        _update(obj)
+    return sha.hexdigest()
+
+
+def _checkpoint_read(filename):
+    fileObject = open(filename, 'rb')
+    data = pickle.load(fileObject)
+    fileObject.close()
+    return data
+
+
+def _checkpoint_load(path, config):
+    """
+    Opens the checkpoint directory `path` for a run described by the
+    dictionary `config`, creating the directory if needed.
+
+    Returns a dictionary with all data stored by _checkpoint_save in an
+    earlier run with the same configuration. An exception is raised if the
+    directory holds checkpoints of a run with a different configuration.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    config_file = os.path.join(path, 'config.qu')
+    if not os.path.exists(config_file):
+        _checkpoint_save(path, 'config', config)
+        return {}
+
+    old_config = _checkpoint_read(config_file)
+    if (sorted(old_config.keys()) != sorted(config.keys()) or
+            not all([np.array_equal(old_config[key], config[key])
+                     for key in config])):
+        raise Exception("The checkpoint directory '%s' belongs to a run " %
+                        path + "with a different configuration.")
+
+    saved = {}
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith('.qu') and filename != 'config.qu':
+            saved[filename[:-3]] = _checkpoint_read(os.path.join(path, filename))
+    return saved
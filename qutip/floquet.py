@@ -43,6 +43,7 @@ from qutip.steadystate import steadystate
 from qutip.states import ket2dm
 from qutip.states import projection
 from qutip.odeoptions import Odeoptions
+from qutip.odechecks import _ode_method_check
 from qutip.propagator import propagator
 from qutip.odedata import Odedata
 from qutip.cy.spmatfuncs import cy_ode_rhs
@@ -830,6 +831,7 @@ def floquet_markov_mesolve(R, ekets, rho0, tlist, e_ops, f_modes_table=None,
     initial_vector = mat2vec(rho0.full())
     r = scipy.integrate.ode(cy_ode_rhs)
     r.set_f_params(R.data.data, R.data.indices, R.data.indptr)
+    _ode_method_check(opt, 'fmmesolve')
     r.set_integrator('zvode', method=opt.method, order=opt.order,
                      atol=opt.atol, rtol=opt.rtol, max_step=opt.max_step)
     r.set_initial_value(initial_vector, tlist[0])
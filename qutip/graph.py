@@ -39,7 +39,7 @@ import numpy as np
 import scipy.sparse as sp
 from qutip.cy.graph_utils import (
         _pseudo_peripheral_node, _breadth_first_search, _node_degrees,
-        _rcm, _bfs_matching, _weighted_bfs_matching)
+        _rcm, _bfs_matching, _weighted_bfs_matching, _connected_components)
 from qutip.settings import debug
 from warnings import warn
 if debug:
@@ -101,6 +101,48 @@ def breadth_first_search(A,start):
     return order[order!=-1], levels[levels!=-1]
 
 
+def graph_components(A, sym=False):
+    """
+    Returns the connected components of the graph of a sparse CSR or CSC
+    matrix or Qobj. Each component is a block of the matrix that is
+    independent of the others, i.e. the matrix is block diagonal after
+    ordering the rows and columns component by component.
+
+    Like :func:`symrcm`, this routine works on the structure of A+Trans(A)
+    unless the *sym* flag is set.
+
+    Parameters
+    ----------
+    A : csr_matrix, csc_matrix, qobj
+        Input sparse matrix or Qobj.
+
+    sym : bool {False, True}
+        Flag to set whether input matrix is symmetric.
+
+    Returns
+    -------
+    components : list of arrays
+        Row (and column) indices of the nodes in each component, in
+        ascending order. The components are ordered by their lowest index.
+
+    """
+    if A.__class__.__name__=='Qobj':
+        A = A.data
+    nrows = A.shape[0]
+    # work on the structure only, so that entries cancelling in
+    # A+Trans(A), e.g. A_jk = -A_kj, are not dropped from the graph.
+    A = sp.csr_matrix(A)
+    A = sp.csr_matrix((np.ones(len(A.data), dtype=np.int32),
+                       A.indices, A.indptr), shape=A.shape)
+    if not sym:
+        A = sp.csr_matrix(A+A.transpose())
+    labels, num_comps = _connected_components(
+            np.asarray(A.indices, dtype=np.int32),
+            np.asarray(A.indptr, dtype=np.int32), nrows)
+    order = np.argsort(labels, kind='mergesort')
+    return np.split(order, np.cumsum(np.bincount(labels))[:-1])
+
+
 def symrcm(A, sym=False):
     """
     Returns the permutation array that orders a sparse CSR or CSC matrix or Qobj
@@ -0,0 +1,177 @@
+# This file is part of QuTiP: Quantum Toolbox in Python.
+#
+#    Copyright (c) 2011 and later, Paul D. Nation and Robert J. Johansson.
+#    All rights reserved.
+#
+#    Redistribution and use in source and binary forms, with or without
+#    modification, are permitted provided that the following conditions are
+#    met:
+#
+#    1. Redistributions of source code must retain the above copyright notice,
+#       this list of conditions and the following disclaimer.
+#
+#    2. Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#
+#    3. Neither the name of the QuTiP: Quantum Toolbox in Python nor the names
+#       of its contributors may be used to endorse or promote products derived
+#       from this software without specific prior written permission.
+#
+#    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+#    PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#    HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#    LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#    DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#    THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+"""
+Time-dependent coefficients given as arrays of samples, for the list-format
+Hamiltonians and collapse operators of the time-evolution solvers.
+
+A term ``[op, samples]`` gives the coefficient of `op` at the times of the
+`tlist` passed to the solver, and a term ``[op, (times, samples)]`` at the
+given `times`. In between, the coefficient is interpolated by cubic splines
+or linearly (Odeoptions.coeff_interpolation). The solvers translate such
+terms to the string format, with the polynomial coefficients of the
+interpolation passed as arguments, so the compiled right-hand side evaluates
+them without calling back into Python, and only the values of these
+arguments change when the samples do.
+"""
+
+import numpy as np
+from scipy.linalg import solve_banded
+
+from qutip.qobj import Qobj
+
+
+def interpolation_coeffs(times, samples, kind='cubic'):
+    """
+    Calculates the polynomial coefficients of the interpolation of sampled
+    values.
+
+    Parameters
+    ----------
+    times : array_like
+        Increasing sample times.
+
+    samples : array_like
+        Real or complex samples at `times`.
+
+    kind : str {'cubic', 'linear'}
+        Cubic spline with not-a-knot end conditions or linear
+        interpolation.
+
+    Returns
+    -------
+    coeffs : array
+        Complex array of shape (len(times) - 1, 4), holding the coefficients
+        ``a, b, c, d`` of ``a + b s + c s**2 + d s**3`` on each interval,
+        where ``s`` is the time since the start of the interval.
+
+    """
+    times = np.asarray(times, dtype=float)
+    y = np.asarray(samples, dtype=complex)
+    n = len(times)
+    if n < 2 or len(y) != n:
+        raise ValueError("Need at least two samples, one for each time.")
+    h = np.diff(times)
+    if np.any(h <= 0):
+        raise ValueError("Sample times must be increasing.")
+
+    coeffs = np.zeros((n - 1, 4), dtype=complex)
+    coeffs[:, 0] = y[:-1]
+    slopes = np.diff(y) / h
+
+    if kind == 'linear' or n == 2:
+        coeffs[:, 1] = slopes
+    elif kind == 'cubic':
+        # first derivatives D of the spline with not-a-knot end conditions,
+        # i.e. continuous third derivatives at the second and the second to
+        # last knots, which keeps the O(h**4) accuracy up to the ends
+        ab = np.zeros((3, n))
+        rhs = np.zeros(n, dtype=complex)
+        ab[1, 1:-1] = 2 * (h[:-1] + h[1:])
+        ab[0, 2:] = h[:-1]
+        ab[2, :-2] = h[1:]
+        rhs[1:-1] = 3 * (h[1:] * slopes[:-1] + h[:-1] * slopes[1:])
+        if n == 3:
+            # the parabola through the three samples
+            ab[1, 0] = ab[0, 1] = ab[2, 1] = ab[1, 2] = 1
+            rhs[0] = 2 * slopes[0]
+            rhs[-1] = 2 * slopes[1]
+        else:
+            d = times[2] - times[0]
+            ab[1, 0] = h[1]
+            ab[0, 1] = d
+            rhs[0] = ((h[0] + 2 * d) * h[1] * slopes[0] +
+                      h[0] ** 2 * slopes[1]) / d
+            d = times[-1] - times[-3]
+            ab[1, -1] = h[-2]
+            ab[2, -2] = d
+            rhs[-1] = (h[-1] ** 2 * slopes[-2] +
+                       (2 * d + h[-1]) * h[-2] * slopes[-1]) / d
+        D = solve_banded((1, 1), ab, rhs)
+        t = (D[:-1] + D[1:] - 2 * slopes) / h
+        coeffs[:, 1] = D[:-1]
+        coeffs[:, 2] = (slopes - D[:-1]) / h - t
+        coeffs[:, 3] = t / h
+    else:
+        raise ValueError("Unknown interpolation '%s'." % kind)
+
+    return coeffs
+
+
+def _interp(t, times, coeffs):
+    """
+    Evaluates the interpolation with coefficients from interpolation_coeffs
+    at time t. Outside of the sampled interval the boundary values are used.
+    This is the python version of the function used in the compiled code.
+    """
+    if t <= times[0]:
+        return coeffs[0, 0]
+    k = min(np.searchsorted(times, t, side='right') - 1, len(times) - 2)
+    s = min(t, times[-1]) - times[k]
+    return coeffs[k, 0] + s * (coeffs[k, 1] + s * (coeffs[k, 2] +
+                                                   s * coeffs[k, 3]))
+
+
+def _interpolated_terms(H, c_ops, args, tlist, kind='cubic'):
+    """
+    Replaces the terms with sampled coefficients in the list-format
+    Hamiltonian `H` and collapse operators `c_ops` with string-format terms,
+    and returns the new H, c_ops and args. The times and the interpolation
+    coefficients are added to args as _interp_t<n> and _interp_c<n>. Without
+    `tlist`, all samples must be given together with their times.
+    """
+    args = dict(args) if args else {}
+    n_interp = [0]
+
+    def _convert(spec):
+        if (not isinstance(spec, list) or len(spec) != 2 or
+                not isinstance(spec[0], Qobj) or
+                not isinstance(spec[1], (np.ndarray, tuple))):
+            return spec
+        if isinstance(spec[1], tuple):
+            times, samples = spec[1]
+        elif tlist is not None:
+            times, samples = tlist, spec[1]
+        else:
+            raise TypeError("Sampled coefficients need the sample times, " +
+                            "given as [op, (times, samples)].")
+        n = n_interp[0]
+        n_interp[0] += 1
+        args['_interp_t%d' % n] = np.asarray(times, dtype=float)
+        args['_interp_c%d' % n] = interpolation_coeffs(times, samples, kind)
+        return [spec[0], '_interp(t, _interp_t%d, _interp_c%d)' % (n, n)]
+
+    if isinstance(H, list):
+        H = [_convert(spec) for spec in H]
+    if isinstance(c_ops, list):
+        c_ops = [_convert(spec) for spec in c_ops]
+    return H, c_ops, args
@@ -0,0 +1,182 @@
+# This file is part of QuTiP: Quantum Toolbox in Python.
+#
+#    Copyright (c) 2011 and later, Paul D. Nation and Robert J. Johansson.
+#    All rights reserved.
+#
+#    Redistribution and use in source and binary forms, with or without
+#    modification, are permitted provided that the following conditions are
+#    met:
+#
+#    1. Redistributions of source code must retain the above copyright notice,
+#       this list of conditions and the following disclaimer.
+#
+#    2. Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#
+#    3. Neither the name of the QuTiP: Quantum Toolbox in Python nor the names
+#       of its contributors may be used to endorse or promote products derived
+#       from this software without specific prior written permission.
+#
+#    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+#    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A
+#    PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+#    HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+#    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+#    LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+#    DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+#    THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+#    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+#    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+"""
+Krylov subspace propagation of a state vector with a constant Hamiltonian.
+
+The state is advanced by ``exp(-i H dt) psi`` using a Lanczos (Hermitian H)
+or Arnoldi (general H) basis of the Krylov subspace, whose dimension is
+increased until an a-posteriori estimate of the error is within tolerance.
+Only a few sparse matrix-vector products are needed per step and only the
+basis vectors are kept in memory. The class follows the interface of
+:class:`scipy.integrate.ode` used by the solvers, like :class:`Dopri5`.
+"""
+
+import numpy as np
+import scipy.linalg as la
+
+from qutip.cy.spmatfuncs import spmv_csr
+
+_SAFETY = 0.9
+
+
+class Krylov():
+    """
+    Propagator ``y(t) = exp(-i H (t - t0)) y(t0)`` for a constant, sparse
+    Hamiltonian H.
+
+    Parameters
+    ----------
+    H : csr_matrix
+        Hamiltonian.
+
+    hermitian : bool
+        Use the Lanczos algorithm, for Hermitian H.
+
+    """
+    def __init__(self, H, hermitian=True):
+        self.H = H
+        self.hermitian = hermitian
+        self.atol = 1e-8
+        self.nsteps = 1000
+        self.max_dim = 30
+        self.t = None
+        self.y = None
+        # number of matrix-vector products
+        self.nmatvec = 0
+        self._success = True
+
+    def set_integrator(self, name=None, atol=1e-8, nsteps=1000, max_dim=30,
+                       **kwargs):
+        """
+        Sets the tolerance of the (2-norm) error of each step, the maximum
+        number of steps per call of integrate and the maximum dimension of
+        the Krylov subspace. Other options of ``zvode`` are ignored.
+        """
+        self.atol = atol
+        self.nsteps = nsteps
+        self.max_dim = max_dim
+        return self
+
+    def set_initial_value(self, y, t=0.0):
+        self.y = np.array(y, dtype=complex)
+        self.t = t
+        self._success = True
+        return self
+
+    def successful(self):
+        return self._success
+
+    def _basis(self, h):
+        """
+        Builds the Krylov basis of the current state until the error estimate
+        for a step of length h is below tolerance, or the maximum dimension
+        is reached. Returns the basis vectors, the norm of the state and the
+        projected Hamiltonian, including the norm of the residual vector as
+        last row (zero if the subspace is invariant).
+        """
+        beta = la.norm(self.y)
+        V = [self.y / beta]
+        Hm = np.zeros((self.max_dim + 1, self.max_dim), dtype=complex)
+        for j in range(self.max_dim):
+            w = spmv_csr(self.H.data, self.H.indices, self.H.indptr, V[j])
+            self.nmatvec += 1
+            # three-term recurrence (Lanczos) or full Gram-Schmidt (Arnoldi)
+            first = max(0, j - 1) if self.hermitian else 0
+            for i in range(first, j + 1):
+                Hm[i, j] = np.vdot(V[i], w)
+                w = w - Hm[i, j] * V[i]
+            # reorthogonalization, the basis is kept anyway
+            for i in range(j + 1):
+                w = w - np.vdot(V[i], w) * V[i]
+            Hm[j + 1, j] = la.norm(w)
+            if Hm[j + 1, j].real < 1e-12 * max(1.0, abs(Hm[j, j])):
+                Hm[j + 1, j] = 0
+                break
+            if _error(Hm[:j + 2, :j + 1], beta, h, self.hermitian)[0] \
+                    <= self.atol:
+                break
+            if j + 1 < self.max_dim:
+                V.append(w / Hm[j + 1, j])
+        return V, beta, Hm[:len(V) + 1, :len(V)]
+
+    def _step(self, t_end):
+        """
+        Takes one step towards t_end, the full interval if the error
+        estimate allows, and otherwise the longest step within tolerance.
+        """
+        h = t_end - self.t
+        V, beta, Hm = self._basis(h)
+        m = len(V)
+        err, f = _error(Hm, beta, h, self.hermitian)
+        while err > self.atol:
+            # the error decreases like h**m
+            h *= min(0.5, _SAFETY * (self.atol / err) ** (1.0 / m))
+            err, f = _error(Hm, beta, h, self.hermitian)
+        y = np.zeros_like(self.y)
+        for k in range(m):
+            y += (beta * f[k]) * V[k]
+        self.y = y
+        self.t = t_end if h == t_end - self.t else self.t + h
+
+    def integrate(self, t, step=0):
+        """
+        Propagates the state to time `t`.
+        """
+        try:
+            n = 0
+            while self.t < t:
+                n += 1
+                if n > self.nsteps:
+                    raise Exception("Krylov: nsteps exceeded.")
+                self._step(t)
+                if step:
+                    break
+        except Exception:
+            self._success = False
+            raise
+        return self.y
+
+
+def _error(Hm, beta, h, hermitian):
+    """
+    Returns the error estimate of a step of length h in the Krylov subspace
+    with projected Hamiltonian Hm (with the residual norm as last row) and
+    the coefficients ``exp(-i h Hm) e_1`` of the new state in the basis.
+    """
+    m = Hm.shape[1]
+    if hermitian:
+        evals, evecs = la.eigh(Hm[:m])
+        f = np.dot(evecs, np.exp(-1j * h * evals) * evecs[0].conj())
+    else:
+        f = la.expm(-1j * h * Hm[:m])[:, 0]
+    return beta * abs(Hm[m, m - 1]) * abs(f[m - 1]), f
@@ -37,8 +37,6 @@ import time
 import copy
 import numpy as np
 from types import FunctionType
-from multiprocessing import Pool, cpu_count
-from numpy.random import RandomState, random_integers
 
 from scipy import arange, array, cumsum, mean, ndarray, setdiff1d, sort, zeros
 from scipy.integrate import ode
@@ -49,14 +47,19 @@ dznrm2 = get_blas_funcs("znrm2", dtype=np.float64)
 
 from qutip.qobj import *
 from qutip.expect import *
+from qutip.expect import _ExpectOps
 from qutip.states import ket2dm
-from qutip.parfor import parfor
+from qutip.parfor import parfor, parallel_pool, pool_initialize, pool_shutdown
 from qutip.odeoptions import Odeoptions
 from qutip.odeconfig import odeconfig
 from qutip.cy.spmatfuncs import cy_ode_rhs, cy_expect_psi_csr, spmv, spmv_csr
-from qutip.cy.codegen import Codegen
+from qutip.cy.codegen import Codegen, _rhs_cache_path, _rhs_remove
 from qutip.odedata import Odedata
-from qutip.odechecks import _ode_checks
+from qutip.fileio import _checkpoint_load, _checkpoint_save, _checkpoint_hash
+from qutip.dopri import Dopri5
+from qutip.random_objects import _trajectory_seeds, _trajectory_prng
+from qutip.odechecks import _ode_checks, _ode_method_check
+from qutip.interpolate import _interpolated_terms
 import qutip.settings
 from qutip.settings import debug
 from qutip.gui.progressbar import TextProgressBar
@@ -74,6 +77,10 @@ _cy_col_spmv_call_func = None
 _cy_col_expect_call_func = None
 _cy_rhs_func = None
 
+# solver configuration and trajectory arguments installed in each worker of
+# the persistent pool by _mc_init_worker
+_mc_worker_data = None
+
 
 def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
             args={}, options=Odeoptions()):
@@ -153,6 +160,7 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
 
     if ntraj is None:
         ntraj = options.ntraj
+    _ode_method_check(options, 'mcsolve', ('adams', 'bdf', 'dopri5'))
 
     if not psi0.isket:
         raise Exception("Initial state must be a state vector.")
@@ -169,6 +177,10 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
     else:
         e_ops_dict = None
 
+    # sampled coefficients are interpolated in string-format terms
+    H, c_ops, args = _interpolated_terms(H, c_ops, args, tlist,
+                                         options.coeff_interpolation)
+
     odeconfig.options = options
     if isinstance(ntraj, list):
         odeconfig.progress_bar = TextProgressBar(max(ntraj))
@@ -240,25 +252,51 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
         elif odeconfig.tflag in array([2, 3, 20, 22]):
             odeconfig.h_func_args = args
 
+    # average trajectories in chunks inside the workers, if requested. a
+    # target tolerance, block evolution or checkpoints need the running
+    # averages, so they imply chunking.
+    if ((options.chunk_size > 0 or options.target_tol is not None
+            or options.block_trajectories or options.checkpoint_dir)
+            and not isinstance(ntraj, (list, ndarray))
+            and (options.average_expect if e_ops else options.average_states)):
+        chunk_size = options.chunk_size or 10
+    else:
+        chunk_size = 0
+
+    if options.checkpoint_dir and not chunk_size and c_ops:
+        raise Exception("Checkpoints require averaged output and a single " +
+                        "number of trajectories.")
+
     # load monte-carlo class
-    mc = _MC_class(odeconfig)
+    mc = _MC_class(odeconfig, chunk_size)
+    if options.checkpoint_dir:
+        # identifies the problem the checkpoints belong to
+        mc.problem_hash = _checkpoint_hash(H, c_ops, e_ops, args)
 
     # RUN THE SIMULATION
     mc.run()
 
-    # remove RHS cython file if necessary
-    if not options.rhs_reuse and odeconfig.tdname:
+    # remove RHS source file if necessary (modules in the RHS cache are
+    # kept)
+    if not options.rhs_reuse:
         try:
-            os.remove(odeconfig.tdname + ".pyx")
+            _rhs_remove(odeconfig.tdname)
         except Exception as e:
-            print("Error removing pyx file: " + str(e))
+            print("Error removing RHS source file: " + str(e))
 
     # AFTER MCSOLVER IS DONE --------------------------------------
     #-------COLLECT AND RETURN OUTPUT DATA IN ODEDATA OBJECT --------------#
     output = Odedata()
     output.solver = 'mcsolve'
+    # trajectories already averaged in chunks
+    if mc.chunk_size and odeconfig.c_num != 0:
+        if odeconfig.e_num == 0:
+            output.states = mc.psi_out
+        else:
+            output.expect = mc.expect_out
+            output.expect_err = mc.expect_err
     # state vectors
-    if (mc.psi_out is not None and odeconfig.options.average_states
+    elif (mc.psi_out is not None and odeconfig.options.average_states
             and odeconfig.cflag and ntraj != 1):
         output.states = parfor(_mc_dm_avg, mc.psi_out.T)
     elif mc.psi_out is not None:
@@ -295,13 +333,16 @@ def mcsolve(H, psi0, tlist, c_ops, e_ops, ntraj=None,
     output.times = odeconfig.tlist
     output.num_expect = odeconfig.e_num
     output.num_collapse = odeconfig.c_num
-    output.ntraj = odeconfig.ntraj
+    output.ntraj = mc.num_done if mc.chunk_size else odeconfig.ntraj
     output.col_times = mc.collapse_times_out
     output.col_which = mc.which_op_out
 
     if e_ops_dict:
         output.expect = {e: output.expect[n]
                          for n, e in enumerate(e_ops_dict.keys())}
+        if output.expect_err is not None:
+            output.expect_err = {e: output.expect_err[n]
+                                 for n, e in enumerate(e_ops_dict.keys())}
 
     return output
 
@@ -314,7 +355,7 @@ class _MC_class():
     Private class for solving Monte-Carlo evolution from mcsolve
     """
 
-    def __init__(self, odeconfig):
+    def __init__(self, odeconfig, chunk_size=0):
 
         #-----------------------------------#
         # INIT MC CLASS
@@ -348,6 +389,20 @@ class _MC_class():
         self.expect_out = []
         self.collapse_times_out = None
         self.which_op_out = None
+        # number of trajectories per chunk averaged in the workers (0 = off)
+        self.chunk_size = chunk_size
+        # running sums over trajectories for chunked execution
+        self.num_done = 0
+        self.expect_sum = None
+        self.expect_sum2 = None
+        self.states_sum = None
+        self.expect_err = None
+        # number of trajectories dispatched in chunked execution
+        self.ntraj_run = 0
+        # chunks whose results have been collected
+        self.chunks_done = set()
+        # digest of the operators and args, for the checkpoint configuration
+        self.problem_hash = None
 
         # FOR EVOLUTION FOR NO COLLAPSE OPERATORS
         if odeconfig.c_num == 0:
@@ -376,7 +431,10 @@ class _MC_class():
             # which operator
             self.collapse_times_out = zeros((odeconfig.ntraj), dtype=ndarray)
             self.which_op_out = zeros((odeconfig.ntraj), dtype=ndarray)
-            if odeconfig.e_num == 0:
+            if self.chunk_size:
+                # only the running sums are kept, see chunk_callback
+                pass
+            elif odeconfig.e_num == 0:
                 # if no expectation operators, preallocate #ntraj arrays
                 # for state vectors
                 if self.odeconfig.options.steady_state_average:
@@ -406,14 +464,145 @@ class _MC_class():
         if self.odeconfig.ntraj != 1:
             self.odeconfig.progress_bar.update(self.count)
 
+    def chunk_callback(self, results, save=True):
+        chunk, num, sums, sums2, col_times, which_ops = results
+        if save and self.odeconfig.options.checkpoint_dir:
+            _checkpoint_save(self.odeconfig.options.checkpoint_dir,
+                             'chunk_%08d' % chunk[0], results)
+        self.chunks_done.add(tuple(chunk))
+        for k in range(chunk[1] - chunk[0]):
+            self.collapse_times_out[chunk[0] + k] = col_times[k]
+            self.which_op_out[chunk[0] + k] = which_ops[k]
+        self.num_done += num
+        if num == 0:
+            return
+
+        if self.odeconfig.e_num == 0:
+            if self.states_sum is None:
+                self.states_sum = sums
+            else:
+                self.states_sum = [s + ds for s, ds in
+                                   zip(self.states_sum, sums)]
+        else:
+            if self.expect_sum is None:
+                self.expect_sum, self.expect_sum2 = sums, sums2
+            else:
+                self.expect_sum = [s + ds for s, ds in
+                                   zip(self.expect_sum, sums)]
+                self.expect_sum2 = [s + ds for s, ds in
+                                    zip(self.expect_sum2, sums2)]
+
+        self.count += chunk[1] - chunk[0]
+        self.odeconfig.progress_bar.update(self.count)
+
+    def chunk_average(self):
+        """
+        Converts the running sums collected by chunk_callback into averaged
+        states or expectation values and their standard errors.
+        """
+        n = float(self.num_done)
+        if self.odeconfig.e_num == 0:
+            self.psi_out = array([Qobj(s / n,
+                                       [self.odeconfig.psi0_dims[0],
+                                        self.odeconfig.psi0_dims[0]],
+                                       [self.odeconfig.psi0_shape[0],
+                                        self.odeconfig.psi0_shape[0]],
+                                       fast='mc-dm')
+                                  for s in self.states_sum])
+        else:
+            self.expect_out = [s / n for s in self.expect_sum]
+            self.expect_err = []
+            for mean_val, s2 in zip(self.expect_out, self.expect_sum2):
+                var = (s2 - n * np.abs(mean_val) ** 2) / max(n - 1, 1)
+                self.expect_err.append(np.sqrt(np.maximum(var, 0) / n))
+
     def serial(self, args, top):
 
         if debug:
             print(inspect.stack()[0][3])
 
+        if self.chunk_size:
+            for wave in self.waves():
+                for chunk in wave:
+                    top.chunk_callback(
+                        _mc_alg_chunk(chunk, args, self.odeconfig))
+            return
+
         for nt in range(self.odeconfig.ntraj):
             top.callback(_mc_alg_evolve(nt, args, self.odeconfig))
 
+    def chunks(self):
+        """
+        Splits the trajectory indices into blocks of chunk_size.
+        """
+        ntraj = self.odeconfig.ntraj
+        return [(start, min(start + self.chunk_size, ntraj))
+                for start in range(0, ntraj, self.chunk_size)]
+
+    def waves(self):
+        """
+        Generates the chunks to run, in waves of one chunk per cpu when a
+        target tolerance is given in Odeoptions.target_tol. After each wave
+        the standard errors of the running averages are checked, and no more
+        waves are generated once they are all within tolerance.
+        """
+        # chunks restored from a checkpoint are not run again
+        chunks = [chunk for chunk in self.chunks()
+                  if chunk not in self.chunks_done]
+        if self.odeconfig.options.target_tol is None:
+            self.ntraj_run = self.odeconfig.ntraj
+            yield chunks
+            return
+
+        wave_size = max(self.cpus, 1)
+        for start in range(0, len(chunks), wave_size):
+            if self.converged():
+                break
+            wave = chunks[start:start + wave_size]
+            self.ntraj_run = max(self.ntraj_run, wave[-1][1])
+            yield wave
+
+    def converged(self):
+        """
+        Checks if the standard errors of all averaged expectation values are
+        within Odeoptions.target_tol.
+        """
+        if self.odeconfig.e_num == 0 or self.num_done < 2:
+            return False
+        tol = self.odeconfig.options.target_tol
+        if not isinstance(tol, (list, ndarray)):
+            tol = [tol] * self.odeconfig.e_num
+        self.chunk_average()
+        return all([np.max(err) <= tol[jj]
+                    for jj, err in enumerate(self.expect_err)])
+
+    def checkpoint_resume(self):
+        """
+        Opens the checkpoint directory given in Odeoptions.checkpoint_dir and
+        returns the results of the chunks completed by an earlier run with
+        the same configuration. The random seeds of that run are reused, so
+        the resumed run gives the same result as an uninterrupted one.
+        """
+        path = self.odeconfig.options.checkpoint_dir
+        config = {'solver': 'mcsolve',
+                  'problem': self.problem_hash,
+                  'tlist': self.odeconfig.tlist,
+                  'psi0': self.odeconfig.psi0,
+                  'ntraj': self.odeconfig.ntraj,
+                  'chunk_size': self.chunk_size,
+                  'e_num': self.odeconfig.e_num,
+                  'c_num': self.odeconfig.c_num,
+                  'seeds': self.odeconfig.options.seeds,
+                  'steady_state_average':
+                  self.odeconfig.options.steady_state_average}
+        saved = _checkpoint_load(path, config)
+        if 'seeds' in saved:
+            self.seeds = saved['seeds']
+        else:
+            _checkpoint_save(path, 'seeds', self.seeds)
+        return [saved[name] for name in sorted(saved)
+                if name.startswith('chunk_')]
+
     def parallel(self, args, top):
 
         if debug:
@@ -423,18 +612,27 @@ class _MC_class():
             self.serial(args, top)
             return
 
-        pl = Pool(processes=self.cpus)
-        for nt in range(self.odeconfig.ntraj):
-            pl.apply_async(_mc_alg_evolve, args=(nt, args, self.odeconfig),
-                           callback=top.callback)
-        pl.close()
-
+        # send the configuration once to every worker of the persistent pool,
+        # the trajectory tasks themselves only carry the trajectory index
+        pl = pool_initialize(_mc_init_worker, self.odeconfig, args,
+                             num_cpus=self.cpus)
         try:
-            pl.join()
+            if self.chunk_size:
+                # the sums of the chunks are merged in the order of the
+                # trajectories, so that the result does not depend on the
+                # scheduling of the workers
+                for wave in self.waves():
+                    for results in pl.imap(_mc_chunk_worker, wave):
+                        top.chunk_callback(results)
+            else:
+                results = [pl.apply_async(_mc_alg_worker, args=(nt,),
+                                          callback=top.callback)
+                           for nt in range(self.odeconfig.ntraj)]
+                for r in results:
+                    r.wait()
         except KeyboardInterrupt:
             print("Cancel all MC threads on keyboard interrupt")
-            pl.terminate()
-            pl.join()
+            pool_shutdown()
         return
 
     def run(self):
@@ -457,11 +655,12 @@ class _MC_class():
 
         elif self.odeconfig.c_num != 0:
 
-            if self.seeds is None:
-                self.seeds = random_integers(1e8, size=self.odeconfig.ntraj)
-            # else:
-            #    if len(self.seeds) != self.odeconfig.ntraj:
-            #        raise "Incompatible size of seeds vector in Odeconfig."
+            # base seed or list of per-trajectory seeds
+            self.seeds = _trajectory_seeds(self.seeds)
+
+            restored = []
+            if self.chunk_size and self.odeconfig.options.checkpoint_dir:
+                restored = self.checkpoint_resume()
 
             if self.odeconfig.e_num == 0:
                 if odeconfig.options.steady_state_average:
@@ -508,9 +707,19 @@ class _MC_class():
                     self.odeconfig.tlist, self.num_times, self.seeds)
 
             self.odeconfig.progress_bar.start(self.odeconfig.ntraj)
+            for results in restored:
+                self.chunk_callback(results, save=False)
+                self.ntraj_run = max(self.ntraj_run, results[0][1])
             self.parallel(args, self)
             self.odeconfig.progress_bar.finished()
 
+            if self.chunk_size:
+                self.chunk_average()
+                # drop unused slots if fewer trajectories were needed
+                self.collapse_times_out = \
+                    self.collapse_times_out[:self.ntraj_run]
+                self.which_op_out = self.which_op_out[:self.ntraj_run]
+
 
 
 #----------------------------------------------------
@@ -626,28 +835,29 @@ def _no_collapse_psi_out(num_times, psi_out, odeconfig):
         _mc_func_load(odeconfig)
 
     opt = odeconfig.options
+    ode_class = Dopri5 if opt.method == 'dopri5' else ode
     if odeconfig.tflag in array([1, 10, 11]):
-        ODE = ode(_cy_rhs_func)
+        ODE = ode_class(_cy_rhs_func)
         code = compile('ODE.set_f_params(' + odeconfig.string + ')',
                        '<string>', 'exec')
         exec(code)
     elif odeconfig.tflag == 2:
-        ODE = ode(_cRHStd)
+        ODE = ode_class(_cRHStd)
         ODE.set_f_params(odeconfig)
     elif odeconfig.tflag in array([20, 22]):
         if odeconfig.options.rhs_with_state:
-            ODE = ode(_tdRHStd_with_state)
+            ODE = ode_class(_tdRHStd_with_state)
         else:
-            ODE = ode(_tdRHStd)
+            ODE = ode_class(_tdRHStd)
         ODE.set_f_params(odeconfig)
     elif odeconfig.tflag == 3:
         if odeconfig.options.rhs_with_state:
-            ODE = ode(_pyRHSc_with_state)
+            ODE = ode_class(_pyRHSc_with_state)
         else:
-            ODE = ode(_pyRHSc)
+            ODE = ode_class(_pyRHSc)
         ODE.set_f_params(odeconfig)
     else:
-        ODE = ode(cy_ode_rhs)
+        ODE = ode_class(cy_ode_rhs)
         ODE.set_f_params(odeconfig.h_data, odeconfig.h_ind, odeconfig.h_ptr)
 
     # initialize ODE solver for RHS
@@ -687,28 +897,29 @@ def _no_collapse_expect_out(num_times, expect_out, odeconfig):
         _mc_func_load(odeconfig)
 
     opt = odeconfig.options
+    ode_class = Dopri5 if opt.method == 'dopri5' else ode
     if odeconfig.tflag in array([1, 10, 11]):
-        ODE = ode(_cy_rhs_func)
+        ODE = ode_class(_cy_rhs_func)
         code = compile('ODE.set_f_params(' + odeconfig.string + ')',
                        '<string>', 'exec')
         exec(code)
     elif odeconfig.tflag == 2:
-        ODE = ode(_cRHStd)
+        ODE = ode_class(_cRHStd)
         ODE.set_f_params(odeconfig)
     elif odeconfig.tflag in array([20, 22]):
         if odeconfig.options.rhs_with_state:
-            ODE = ode(_tdRHStd_with_state)
+            ODE = ode_class(_tdRHStd_with_state)
         else:
-            ODE = ode(_tdRHStd)
+            ODE = ode_class(_tdRHStd)
         ODE.set_f_params(odeconfig)
     elif odeconfig.tflag == 3:
         if odeconfig.options.rhs_with_state:
-            ODE = ode(_pyRHSc_with_state)
+            ODE = ode_class(_pyRHSc_with_state)
         else:
-            ODE = ode(_pyRHSc)
+            ODE = ode_class(_pyRHSc)
         ODE.set_f_params(odeconfig)
     else:
-        ODE = ode(cy_ode_rhs)
+        ODE = ode_class(cy_ode_rhs)
         ODE.set_f_params(odeconfig.h_data, odeconfig.h_ind, odeconfig.h_ptr)
 
     ODE.set_integrator('zvode', method=opt.method, order=opt.order,
@@ -728,18 +939,85 @@ def _no_collapse_expect_out(num_times, expect_out, odeconfig):
         ODE.integrate(odeconfig.tlist[k], step=0)  # integrate up to tlist[k]
         if ODE.successful():
             state = ODE.y / dznrm2(ODE.y)
-            for jj in range(odeconfig.e_num):
-                expect_out[jj][k] = cy_expect_psi_csr(odeconfig.e_ops_data[jj],
-                                              odeconfig.e_ops_ind[jj],
-                                              odeconfig.e_ops_ptr[jj],
-                                              state,
-                                              odeconfig.e_ops_isherm[jj])
+            for jj, val in enumerate(odeconfig.e_ops_set.expect(state)):
+                expect_out[jj][k] = val
         else:
             raise ValueError('Error in ODE solver')
 
     return expect_out
 
 
+def _mc_init_worker(config, args):
+    """
+    Installs the solver configuration in a worker of the persistent pool and
+    loads the matching RHS functions.
+    """
+    global _mc_worker_data
+
+    _mc_func_load(config)
+    _mc_worker_data = (config, args)
+
+
+def _mc_alg_worker(nt):
+    """
+    Runs trajectory nt using the configuration installed by _mc_init_worker.
+    """
+    config, args = _mc_worker_data
+    return _mc_alg_evolve(nt, args, config)
+
+
+def _mc_chunk_worker(chunk):
+    """
+    Runs a chunk of trajectories using the configuration installed by
+    _mc_init_worker.
+    """
+    config, args = _mc_worker_data
+    return _mc_alg_chunk(chunk, args, config)
+
+
+def _mc_alg_chunk(chunk, args, odeconfig):
+    """
+    Runs the trajectories chunk[0] <= nt < chunk[1] and returns the running
+    sums of their output (expectation values and their absolute squares, or
+    density matrices) instead of the individual trajectories.
+    """
+    if odeconfig.options.block_trajectories and odeconfig.tflag == 0:
+        return _mc_alg_block(chunk, args, odeconfig)
+
+    sums = None
+    sums2 = None
+    num = 0
+    col_times = []
+    which_ops = []
+
+    for nt in range(chunk[0], chunk[1]):
+        results = _mc_alg_evolve(nt, args, odeconfig)
+        if results is None:
+            # failed trajectory, already reported by _mc_alg_evolve
+            col_times.append(None)
+            which_ops.append(None)
+            continue
+        col_times.append(results[2])
+        which_ops.append(results[3])
+        num += 1
+        if odeconfig.e_num == 0:
+            data = [psi.data for psi in results[1]]
+            if sums is None:
+                sums = data
+            else:
+                sums = [s + d for s, d in zip(sums, data)]
+        else:
+            if sums is None:
+                sums = [expt.copy() for expt in results[1]]
+                sums2 = [np.abs(expt) ** 2 for expt in results[1]]
+            else:
+                for jj, expt in enumerate(results[1]):
+                    sums[jj] += expt
+                    sums2[jj] += np.abs(expt) ** 2
+
+    return chunk, num, sums, sums2, col_times, which_ops
+
+
 #---single-trajectory for monte-carlo---
 def _mc_alg_evolve(nt, args, odeconfig):
     """
@@ -757,38 +1035,45 @@ def _mc_alg_evolve(nt, args, odeconfig):
     try:
         # get input data
         mc_alg_out, opt, tlist, num_times, seeds = args
+        # the output template is shared by all trajectories run in the
+        # same process, so never write into it directly
+        mc_alg_out = copy.deepcopy(mc_alg_out)
 
         collapse_times = np.array([],dtype=float)  # times at which collapse occurs
         which_oper = array([],dtype=float)  # which operator did the collapse
 
         # SEED AND RNG AND GENERATE
-        prng = RandomState(seeds[nt])
+        prng = _trajectory_prng(seeds, nt)
         rand_vals = prng.rand(2)  # first rand is collapse norm,
                                   # second is which operator
 
+        # dense-output integrator locates jumps without re-integrating
+        dense = opt.method == 'dopri5'
+        ode_class = Dopri5 if dense else ode
+
         # CREATE ODE OBJECT CORRESPONDING TO DESIRED TIME-DEPENDENCE
         if odeconfig.tflag in array([1, 10, 11]):
-            ODE = ode(_cy_rhs_func)
+            ODE = ode_class(_cy_rhs_func)
             code = compile('ODE.set_f_params(' + odeconfig.string + ')',
                            '<string>', 'exec')
             exec(code)
         elif odeconfig.tflag == 2:
-            ODE = ode(_cRHStd)
+            ODE = ode_class(_cRHStd)
             ODE.set_f_params(odeconfig)
         elif odeconfig.tflag in array([20, 22]):
             if odeconfig.options.rhs_with_state:
-                ODE = ode(_tdRHStd_with_state)
+                ODE = ode_class(_tdRHStd_with_state)
             else:
-                ODE = ode(_tdRHStd)
+                ODE = ode_class(_tdRHStd)
             ODE.set_f_params(odeconfig)
         elif odeconfig.tflag == 3:
             if odeconfig.options.rhs_with_state:
-                ODE = ode(_pyRHSc_with_state)
+                ODE = ode_class(_pyRHSc_with_state)
             else:
-                ODE = ode(_pyRHSc)
+                ODE = ode_class(_pyRHSc)
             ODE.set_f_params(odeconfig)
         else:
-            ODE = ode(_cy_rhs_func)
+            ODE = ode_class(_cy_rhs_func)
             ODE.set_f_params(odeconfig.h_data, odeconfig.h_ind,
                              odeconfig.h_ptr)
 
@@ -823,12 +1108,31 @@ def _mc_alg_evolve(nt, args, odeconfig):
                     if not ODE.successful():
                         raise Exception("ZVODE failed!")
                 norm2_psi = dznrm2(ODE.y) ** 2
+                if norm2_psi <= rand_vals[0] and dense:
+                    # find collapse time on the interpolant of the last step
+                    #---------------------------------------------------
+                    t_final = ODE.t
+                    for ii in range(max(odeconfig.norm_steps, 50)):
+                        t_guess = t_prev + np.log(norm2_prev / rand_vals[0]) / \
+                            np.log(norm2_prev / norm2_psi) * (t_final - t_prev)
+                        y_guess = ODE.dense(t_guess)
+                        norm2_guess = dznrm2(y_guess) ** 2
+                        if (np.abs(rand_vals[0] - norm2_guess) <
+                                odeconfig.norm_tol * rand_vals[0]):
+                            break
+                        elif (norm2_guess < rand_vals[0]):
+                            t_final = t_guess
+                            norm2_psi = norm2_guess
+                        else:
+                            t_prev = t_guess
+                            norm2_prev = norm2_guess
+                    ODE.set_initial_value(y_guess, t_guess)
                 if norm2_psi <= rand_vals[0]:  # <== collapse has occured
                     # find collapse time to within specified tolerance
                     #---------------------------------------------------
                     ii = 0
                     t_final = ODE.t
-                    while ii < odeconfig.norm_steps:
+                    while ii < odeconfig.norm_steps and not dense:
                         ii += 1
                         t_guess = t_prev + np.log(norm2_prev / rand_vals[0]) / \
                             np.log(norm2_prev / norm2_psi) * (t_final - t_prev)
@@ -936,12 +1240,9 @@ def _mc_alg_evolve(nt, args, odeconfig):
                     mc_alg_out[k] = Qobj(out_psi, odeconfig.psi0_dims,
                                         odeconfig.psi0_shape, fast='mc')
             else:
-                for jj in range(odeconfig.e_num):
-                    mc_alg_out[jj][k] = cy_expect_psi_csr(odeconfig.e_ops_data[jj],
-                                                  odeconfig.e_ops_ind[jj],
-                                                  odeconfig.e_ops_ptr[jj],
-                                                  out_psi,
-                                                  odeconfig.e_ops_isherm[jj])
+                for jj, val in enumerate(
+                        odeconfig.e_ops_set.expect(out_psi)):
+                    mc_alg_out[jj][k] = val
         #Run at end of mc_alg function
         #------------------------------
         if odeconfig.options.steady_state_average:
@@ -958,6 +1259,126 @@ def _mc_alg_evolve(nt, args, odeconfig):
         print("failed to run _mc_alg_evolve: " + str(e))
 
 
+def _block_rhs(t, y, A, K):
+    # one sparse-dense product for all trajectories in the block
+    return A.dot(y.reshape((-1, K))).ravel()
+
+
+def _mc_alg_block(chunk, args, odeconfig):
+    """
+    Evolves the trajectories chunk[0] <= nt < chunk[1] together as the
+    columns of one dense N x K block, for constant H and collapse operators.
+    The block is advanced with a dense-output integrator and stopped at the
+    earliest collapse of any column, which is then applied to that column
+    only. Returns the same running sums as _mc_alg_chunk.
+    """
+    mc_alg_out, opt, tlist, num_times, seeds = args
+
+    ntrajs = range(chunk[0], chunk[1])
+    K = len(ntrajs)
+    N = odeconfig.psi0.shape[0]
+
+    def _csr(data, ind, ptr):
+        return sp.csr_matrix((data, ind, ptr), shape=(N, N))
+
+    A = _csr(odeconfig.h_data, odeconfig.h_ind, odeconfig.h_ptr)
+    c_ops = [_csr(odeconfig.c_ops_data[i], odeconfig.c_ops_ind[i],
+                  odeconfig.c_ops_ptr[i]) for i in range(odeconfig.c_num)]
+    n_ops = [_csr(odeconfig.n_ops_data[i], odeconfig.n_ops_ind[i],
+                  odeconfig.n_ops_ptr[i]) for i in range(odeconfig.c_num)]
+
+    # one random number generator per trajectory, seeded as in
+    # _mc_alg_evolve
+    prngs = [_trajectory_prng(seeds, nt) for nt in ntrajs]
+    rand_vals = array([prng.rand(2) for prng in prngs])
+    collapse_times = [[] for nt in ntrajs]
+    which_oper = [[] for nt in ntrajs]
+
+    sums = None
+    sums2 = None
+
+    def _output(Y):
+        # accumulate the output of all columns of the normalized block
+        if odeconfig.e_num == 0:
+            return [sp.csr_matrix(np.dot(Y, Y.conj().T))]
+        return odeconfig.e_ops_set.expect(Y)
+
+    ODE = Dopri5(_block_rhs).set_f_params(A, K)
+    ODE.set_integrator('dopri5', atol=opt.atol, rtol=opt.rtol,
+                       nsteps=opt.nsteps, first_step=opt.first_step,
+                       max_step=opt.max_step)
+    Y = np.tile(odeconfig.psi0.reshape((N, 1)), (1, K)).astype(complex)
+    ODE.set_initial_value(Y.ravel(), tlist[0])
+
+    out = [_output(Y)]
+    for k in range(1, num_times):
+        while ODE.t < tlist[k]:
+            t_prev = ODE.t
+            norm2_prev = np.sum(np.abs(ODE.y.reshape((N, K))) ** 2, axis=0)
+            ODE.integrate(tlist[k], step=1)
+            if not ODE.successful():
+                raise Exception("Dopri5 failed!")
+            norm2_psi = np.sum(np.abs(ODE.y.reshape((N, K))) ** 2, axis=0)
+            jumped = np.where(norm2_psi <= rand_vals[:, 0])[0]
+            if len(jumped) == 0:
+                continue
+
+            # find the collapse time of each column that jumped during the
+            # last step and stop the whole block at the earliest one
+            t_jump = ODE.t
+            j_jump = jumped[0]
+            for j in jumped:
+                r = rand_vals[j, 0]
+                t_lo, n_lo = t_prev, norm2_prev[j]
+                t_hi, n_hi = ODE.t, norm2_psi[j]
+                for ii in range(max(odeconfig.norm_steps, 50)):
+                    t_guess = t_lo + (np.log(n_lo / r) /
+                                      np.log(n_lo / n_hi) * (t_hi - t_lo))
+                    norm2_guess = dznrm2(
+                        ODE.dense(t_guess).reshape((N, K))[:, j]) ** 2
+                    if np.abs(r - norm2_guess) < odeconfig.norm_tol * r:
+                        break
+                    elif norm2_guess < r:
+                        t_hi, n_hi = t_guess, norm2_guess
+                    else:
+                        t_lo, n_lo = t_guess, norm2_guess
+                if t_guess < t_jump:
+                    t_jump, j_jump = t_guess, j
+
+            Y = ODE.dense(t_jump).reshape((N, K)).copy()
+            y = Y[:, j_jump]
+            # determine which operator does collapse
+            n_dp = array([np.real(np.vdot(y, n_ops[i].dot(y)))
+                          for i in range(odeconfig.c_num)])
+            kk = cumsum(n_dp / sum(n_dp))
+            i = np.arange(odeconfig.c_num)[kk >= rand_vals[j_jump, 1]][0]
+            state = c_ops[i].dot(y)
+            Y[:, j_jump] = state / dznrm2(state)
+            collapse_times[j_jump].append(t_jump)
+            which_oper[j_jump].append(i)
+            rand_vals[j_jump] = prngs[j_jump].rand(2)
+            ODE.set_initial_value(Y.ravel(), t_jump)
+
+        Y = ODE.y.reshape((N, K))
+        Y = Y / np.sqrt(np.sum(np.abs(Y) ** 2, axis=0))
+        out.append(_output(Y))
+
+    if odeconfig.e_num == 0:
+        if odeconfig.options.steady_state_average:
+            sums = [sum(o[0] for o in out) / float(num_times)]
+        else:
+            sums = [o[0] for o in out]
+    else:
+        sums = [array([np.sum(o[jj]) for o in out])
+                for jj in range(odeconfig.e_num)]
+        sums2 = [array([np.sum(np.abs(o[jj]) ** 2) for o in out])
+                 for jj in range(odeconfig.e_num)]
+
+    return (chunk, K, sums, sums2,
+            [array(t) for t in collapse_times],
+            [array(w) for w in which_oper])
+
+
 def _mc_func_load(odeconfig):
     """Load cython functions"""
 
@@ -969,6 +1390,7 @@ def _mc_func_load(odeconfig):
         print(inspect.stack()[0][3] + " in " + str(os.getpid()))
 
     if odeconfig.tflag in array([1, 10, 11]):
+        _rhs_cache_path()
         # compile time-depdendent RHS code
         if odeconfig.tflag in array([1, 11]):
             code = compile('from ' + odeconfig.tdname +
@@ -1023,6 +1445,8 @@ def _mc_data_config(H, psi0, h_stuff, c_ops, c_stuff, args, e_ops,
         odeconfig.e_ops_ind = array(odeconfig.e_ops_ind)
         odeconfig.e_ops_ptr = array(odeconfig.e_ops_ptr)
         odeconfig.e_ops_isherm = array(odeconfig.e_ops_isherm)
+        odeconfig.e_ops_set = _ExpectOps([op[0] if isinstance(op, list)
+                                          else op for op in e_ops])
     #----
 
     # take care of collapse operators, if any
@@ -1210,12 +1634,10 @@ def _mc_data_config(H, psi0, h_stuff, c_ops, c_stuff, args, e_ops,
                 odeconfig.string += "," + "odeconfig.c_args[" + str(kk) + "]"
         #----
 
-        name = "rhs" + str(odeconfig.cgen_num)
-        odeconfig.tdname = name
         cgen = Codegen(H_inds, H_tdterms, odeconfig.h_td_inds, args,
                        C_inds, C_tdterms, odeconfig.c_td_inds, type='mc',
                        odeconfig=odeconfig)
-        cgen.generate(name + ".pyx")
+        odeconfig.tdname = cgen.generate_module()
 
     #-------------------------------------------------
     # START PYTHON LIST-FUNCTION BASED TIME-DEPENDENCE
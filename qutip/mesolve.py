@@ -46,14 +46,15 @@ import warnings
 
 from qutip.qobj import Qobj, isket, isoper, issuper
 from qutip.superoperator import spre, spost, liouvillian_fast, mat2vec, vec2mat
-from qutip.expect import expect, expect_rho_vec
+from qutip.expect import expect, expect_rho_vec, _ExpectOps
 from qutip.odeoptions import Odeoptions
 from qutip.cy.spmatfuncs import cy_ode_rhs, cy_ode_rho_func_td
-from qutip.cy.codegen import Codegen
+from qutip.cy.codegen import Codegen, _rhs_remove
 from qutip.rhs_generate import rhs_generate
 from qutip.odedata import Odedata
 from qutip.states import ket2dm
-from qutip.odechecks import _ode_checks
+from qutip.odechecks import _ode_checks, _ode_method_check
+from qutip.interpolate import _interpolated_terms, _interp
 from qutip.odeconfig import odeconfig
 from qutip.settings import debug
 
@@ -192,12 +193,16 @@ def mesolve(H, rho0, tlist, c_ops, e_ops, args={}, options=None,
     else:
         e_ops_dict = None
 
-    # check for type (if any) of time-dependent inputs
-    n_const, n_func, n_str = _ode_checks(H, c_ops)
-
     if options is None:
         options = Odeoptions()
 
+    # sampled coefficients are interpolated in string-format terms
+    H, c_ops, args = _interpolated_terms(H, c_ops, args, tlist,
+                                         options.coeff_interpolation)
+
+    # check for type (if any) of time-dependent inputs
+    n_const, n_func, n_str = _ode_checks(H, c_ops)
+
     if (not options.rhs_reuse) or (not odeconfig.tdfunc):
         # reset odeconfig collapse and time-dependence flags to default values
         odeconfig.reset()
@@ -223,7 +228,16 @@ def mesolve(H, rho0, tlist, c_ops, e_ops, args={}, options=None,
         # operator. Then delegate to appropriate solver...
         #
 
-        if isinstance(H, Qobj):
+        if (options.rhs_matrix_form and
+                not isinstance(H, (types.FunctionType,
+                                   types.BuiltinFunctionType, partial))):
+            # constant or list format operators, evaluated on the density
+            # matrix without constructing the liouvillian
+            res = _mesolve_matrix_form(H, rho0, tlist, c_ops,
+                                       e_ops, args, options,
+                                       progress_bar)
+
+        elif isinstance(H, Qobj):
             # constant hamiltonian
             if n_func == 0 and n_str == 0:
                 # constant collapse operators
@@ -385,6 +399,7 @@ def _mesolve_list_func_td(H_list, rho0, tlist, c_list, e_ops, args, opt,
         r = scipy.integrate.ode(drho_list_td_with_state)
     else:
         r = scipy.integrate.ode(drho_list_td)
+    _ode_method_check(opt, 'mesolve')
     r.set_integrator('zvode', method=opt.method, order=opt.order,
                      atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
                      first_step=opt.first_step, min_step=opt.min_step,
@@ -562,20 +577,17 @@ def _mesolve_list_str_td(H_list, rho0, tlist, c_list, e_ops, args, opt,
     for k in range(n_L_terms):
         string_list.append("Ldata[%d], Linds[%d], Lptrs[%d]" % (k, k, k))
     for name, value in args.items():
-        string_list.append(str(value))
+        # passed by reference, arrays have no exact literal form
+        string_list.append("args[%r]" % name)
     parameter_string = ",".join(string_list)
 
     #
     # generate and compile new cython code if necessary
     #
     if not opt.rhs_reuse or odeconfig.tdfunc is None:
-        if opt.rhs_filename is None:
-            odeconfig.tdname = "rhs" + str(odeconfig.cgen_num)
-        else:
-            odeconfig.tdname = opt.rhs_filename
         cgen = Codegen(h_terms=n_L_terms, h_tdterms=Lcoeff, args=args,
                        odeconfig=odeconfig)
-        cgen.generate(odeconfig.tdname + ".pyx")
+        odeconfig.tdname = cgen.generate_module(opt.rhs_filename)
 
         code = compile('from ' + odeconfig.tdname + ' import cy_td_ode_rhs',
                        '<string>', 'exec')
@@ -587,6 +599,7 @@ def _mesolve_list_str_td(H_list, rho0, tlist, c_list, e_ops, args, opt,
     #
     initial_vector = mat2vec(rho0.full()).ravel()
     r = scipy.integrate.ode(odeconfig.tdfunc)
+    _ode_method_check(opt, 'mesolve')
     r.set_integrator('zvode', method=opt.method, order=opt.order,
                      atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
                      first_step=opt.first_step, min_step=opt.min_step,
@@ -641,6 +654,7 @@ def _mesolve_const(H, rho0, tlist, c_op_list, e_ops, args, opt,
     initial_vector = mat2vec(rho0.full()).ravel()
     r = scipy.integrate.ode(cy_ode_rhs)
     r.set_f_params(L.data.data, L.data.indices, L.data.indptr)
+    _ode_method_check(opt, 'mesolve')
     r.set_integrator('zvode', method=opt.method, order=opt.order,
                      atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
                      first_step=opt.first_step, min_step=opt.min_step,
@@ -661,6 +675,148 @@ def _ode_rho_func(t, rho, L):
     return L * rho
 
 
+# -----------------------------------------------------------------------------
+# Master equation solver in matrix form: the right-hand side is evaluated on
+# the N x N density matrix with sparse-dense products, so that the N^2 x N^2
+# liouvillian is never constructed.
+#
+def _mesolve_matrix_form(H_list, rho0, tlist, c_list, e_ops, args, opt,
+                         progress_bar):
+    """
+    Internal function for solving the master equation. See mesolve for usage.
+    Supports constant operators and time-dependence in list-function and
+    list-string format, but no superoperators.
+    """
+
+    if debug:
+        print(inspect.stack()[0][3])
+
+    #
+    # check initial state
+    #
+    if isket(rho0):
+        rho0 = rho0 * rho0.dag()
+
+    if isinstance(H_list, Qobj):
+        H_list = [H_list]
+
+    N = rho0.shape[0]
+
+    #
+    # the right-hand side is the sum of the terms M rho + rho N, with
+    # M = -iH, N = iH for the hamiltonian and M = N = -C^dag C / 2 for the
+    # collapse operators, and of the jump terms C rho C^dag.
+    #
+    M0 = sp.csr_matrix((N, N), dtype=complex)
+    N0 = sp.csr_matrix((N, N), dtype=complex)
+    mn_terms = []
+    jump_terms = []
+
+    for h_spec in H_list:
+        h, h_coeff = _matrix_form_term(h_spec, args, opt, False)
+        if opt.tidy and h_coeff is None:
+            h = h.tidyup(opt.atol)
+        if h_coeff is None:
+            M0 = M0 - 1j * h.data
+            N0 = N0 + 1j * h.data
+        else:
+            mn_terms.append([-1j * h.data, (1j * h.data).T.tocsr(), h_coeff])
+
+    for c_spec in c_list:
+        c, c_coeff = _matrix_form_term(c_spec, args, opt, True)
+        cdc = -0.5 * (c.dag() * c).data
+        if c_coeff is None:
+            M0 = M0 + cdc
+            N0 = N0 + cdc
+        else:
+            mn_terms.append([cdc, cdc.T.tocsr(), c_coeff])
+        jump_terms.append([c.data, c.data.conj(), c_coeff])
+
+    #
+    # setup integrator
+    #
+    initial_vector = mat2vec(rho0.full()).ravel()
+    r = scipy.integrate.ode(_ode_rho_matrix_form)
+    _ode_method_check(opt, 'mesolve')
+    r.set_integrator('zvode', method=opt.method, order=opt.order,
+                     atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
+                     first_step=opt.first_step, min_step=opt.min_step,
+                     max_step=opt.max_step)
+    r.set_initial_value(initial_vector, tlist[0])
+    r.set_f_params(N, M0, N0.T.tocsr(), mn_terms, jump_terms)
+
+    #
+    # call generic ODE code
+    #
+    return _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar)
+
+
+def _matrix_form_term(spec, args, opt, square, superop=False):
+    """
+    Returns the operator of a hamiltonian or collapse operator term and a
+    function coeff(t, rho) that evaluates its coefficient, or None for a
+    constant term. Coefficients of collapse operators are squared.
+    Superoperators are accepted only if superop is True.
+    """
+    if isinstance(spec, Qobj):
+        op, coeff = spec, None
+
+    elif (isinstance(spec, list) and len(spec) == 2 and
+            isinstance(spec[0], Qobj)):
+        op = spec[0]
+        if isinstance(spec[1], str):
+            # string coefficients are evaluated with the numpy functions
+            # and the args in scope
+            code = compile(spec[1], '<string>', 'eval')
+            namespace = dict(np.__dict__)
+            namespace['_interp'] = _interp
+            namespace.update(args)
+
+            def coeff(t, rho):
+                namespace['t'] = t
+                return eval(code, namespace)
+
+        elif opt.rhs_with_state:
+            coeff = lambda t, rho: spec[1](t, rho, args)
+        else:
+            coeff = lambda t, rho: spec[1](t, args)
+
+        if square:
+            f = coeff
+            coeff = lambda t, rho: f(t, rho) ** 2
+
+    else:
+        raise TypeError("Incorrect specification of Hamiltonian or " +
+                        "collapse operators.")
+
+    if not isoper(op) and not (superop and op.issuper):
+        raise TypeError("The matrix form of the master equation requires " +
+                        "operators, not superoperators.")
+
+    return op, coeff
+
+
+#
+# evaluate drho(t)/dt according to the master equation in matrix form. The
+# vector rho is the density matrix stacked column by column (see mat2vec),
+# i.e., a fortran ordered N x N matrix.
+#
+def _ode_rho_matrix_form(t, rho, N, M0, N0T, mn_terms, jump_terms):
+    rho_mat = rho.reshape((N, N), order='F')
+    rho_T = rho_mat.T
+    out = M0 * rho_mat + (N0T * rho_T).T
+    for M, NT, coeff in mn_terms:
+        out += coeff(t, rho) * (M * rho_mat + (NT * rho_T).T)
+    for C, C_conj, coeff in jump_terms:
+        # C rho C^dag = (conj(C) (C rho)^T)^T
+        jump = (C_conj * (C * rho_mat).T).T
+        if coeff is None:
+            out += jump
+        else:
+            out += coeff(t, rho) * jump
+    return out.ravel(order='F')
+
+
 # -----------------------------------------------------------------------------
 # Master equation solver: deprecated in 2.0.0. No support for time-dependent
 # collapse operators. Only used by the deprecated odesolve function.
@@ -729,13 +885,9 @@ def _mesolve_list_td(H_func, rho0, tlist, c_op_list, e_ops, args, opt,
 
     # run code generator
     if not opt.rhs_reuse or odeconfig.tdfunc is None:
-        if opt.rhs_filename is None:
-            odeconfig.tdname = "rhs" + str(odeconfig.cgen_num)
-        else:
-            odeconfig.tdname = opt.rhs_filename
         cgen = Codegen(h_terms=n_L_terms, h_tdterms=Lcoeff, args=args,
                        odeconfig=odeconfig)
-        cgen.generate(odeconfig.tdname + ".pyx")
+        odeconfig.tdname = cgen.generate_module(opt.rhs_filename)
 
         code = compile('from ' + odeconfig.tdname + ' import cy_td_ode_rhs',
                        '<string>', 'exec')
@@ -747,6 +899,7 @@ def _mesolve_list_td(H_func, rho0, tlist, c_op_list, e_ops, args, opt,
     #
     initial_vector = mat2vec(rho0.full()).ravel()
     r = scipy.integrate.ode(odeconfig.tdfunc)
+    _ode_method_check(opt, 'mesolve')
     r.set_integrator('zvode', method=opt.method, order=opt.order,
                      atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
                      first_step=opt.first_step, min_step=opt.min_step,
@@ -783,14 +936,44 @@ def _mesolve_func_td(L_func, rho0, tlist, c_op_list, e_ops, args, opt,
     #
     # construct liouvillian
     #
-    new_args = None
-
     if len(c_op_list) > 0:
         L_data = liouvillian_fast(None, c_op_list).data
     else:
         n, m = rho0.shape
         L_data = sp.csr_matrix((n ** 2, m ** 2), dtype=complex)
 
+    new_args = _mesolve_func_args(args)
+
+    #
+    # setup integrator
+    #
+    initial_vector = mat2vec(rho0.full()).ravel()
+    if not opt.rhs_with_state:
+        r = scipy.integrate.ode(cy_ode_rho_func_td)
+    else:
+        r = scipy.integrate.ode(_ode_rho_func_td_with_state)
+    _ode_method_check(opt, 'mesolve')
+    r.set_integrator('zvode', method=opt.method, order=opt.order,
+                     atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
+                     first_step=opt.first_step, min_step=opt.min_step,
+                     max_step=opt.max_step)
+    r.set_initial_value(initial_vector, tlist[0])
+    r.set_f_params(L_data, L_func, new_args)
+
+    #
+    # call generic ODE code
+    #
+    return _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar)
+
+
+def _mesolve_func_args(args):
+    """
+    Internal function. Returns the args of a function-format Liouvillian,
+    with Qobj operators replaced by the data of their commutator
+    superoperators, and other Qobjs by their data.
+    """
+    new_args = None
+
     if type(args) is dict:
         new_args = {}
         for key in args:
@@ -825,25 +1008,7 @@ def _mesolve_func_td(L_func, rho0, tlist, c_op_list, e_ops, args, opt,
         else:
             new_args = args
 
-    #
-    # setup integrator
-    #
-    initial_vector = mat2vec(rho0.full()).ravel()
-    if not opt.rhs_with_state:
-        r = scipy.integrate.ode(cy_ode_rho_func_td)
-    else:
-        r = scipy.integrate.ode(_ode_rho_func_td_with_state)
-    r.set_integrator('zvode', method=opt.method, order=opt.order,
-                     atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
-                     first_step=opt.first_step, min_step=opt.min_step,
-                     max_step=opt.max_step)
-    r.set_initial_value(initial_vector, tlist[0])
-    r.set_f_params(L_data, L_func, new_args)
-
-    #
-    # call generic ODE code
-    #
-    return _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar)
+    return new_args
 
 
 #
@@ -880,7 +1045,6 @@ def _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar):
     # prepare output array
     #
     n_tsteps = len(tlist)
-    e_sops_data = []
 
     output = Odedata()
     output.solver = "mesolve"
@@ -906,11 +1070,12 @@ def _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar):
             output.expect = []
             output.num_expect = n_expt_op
             for op in e_ops:
-                e_sops_data.append(spre(op).data)
                 if op.isherm and rho0.isherm:
                     output.expect.append(np.zeros(n_tsteps))
                 else:
                     output.expect.append(np.zeros(n_tsteps, dtype=complex))
+            e_ops_set = _ExpectOps(e_ops, [op.isherm and rho0.isherm
+                                           for op in e_ops], rho_vec=True)
 
     else:
         raise TypeError("Expectation parameter must be a list or a function")
@@ -939,11 +1104,9 @@ def _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar):
                 # use callback method
                 e_ops(t, rho)
 
-        for m in range(n_expt_op):
-            if output.expect[m].dtype == complex:
-                output.expect[m][t_idx] = expect_rho_vec(e_sops_data[m], r.y, 0)
-            else:
-                output.expect[m][t_idx] = expect_rho_vec(e_sops_data[m], r.y, 1)
+        if n_expt_op:
+            for m, val in enumerate(e_ops_set.expect(r.y)):
+                output.expect[m][t_idx] = val
 
         if t_idx < n_tsteps - 1:
             r.integrate(r.t + dt[t_idx])
@@ -952,7 +1115,7 @@ def _generic_ode_solve(r, rho0, tlist, e_ops, opt, progress_bar):
 
     if not opt.rhs_reuse and odeconfig.tdname is not None:
         try:
-            os.remove(odeconfig.tdname + ".pyx")
+            _rhs_remove(odeconfig.tdname)
         except:
             pass
 
@@ -165,3 +165,14 @@ def _ode_checks(H, c_ops, solver='me'):
                 raise Exception("Error determining time-dependence.")
 
         return time_type, [h_const, h_func, h_str], [c_const, c_func, c_str]
+
+
+def _ode_method_check(opt, solver, methods=('adams', 'bdf')):
+    """
+    Raises a ValueError if the integration method of the Odeoptions opt is
+    not implemented by the solver.
+    """
+    if opt.method not in methods:
+        raise ValueError("Integration method '%s' is not supported by %s, "
+                         % (opt.method, solver) + "use one of: " +
+                         ", ".join(["'%s'" % m for m in methods]) + ".")
@@ -83,6 +83,7 @@ class Odeconfig():
         self.e_ops_ind = []   # expect op indices
         self.e_ops_ptr = []   # expect op indptrs
         self.e_ops_isherm = []  # expect op isherm
+        self.e_ops_set = None   # all expect ops stacked (see _ExpectOps)
 
         # Collapse operator stuff
         self.c_num = 0          # number of collapse ops
@@ -45,6 +45,9 @@ class Odedata():
         Times at which simulation data was collected.
     expect : list/array
         Expectation values (if requested) for simulation.
+    expect_err : list/array
+        Standard error of the trajectory-averaged expectation values. Only
+        for Monte-Carlo solver with ``Odeoptions.chunk_size`` set.
     states : array
         State of the simulation (density matrix or ket) evaluated at ``times``.
     num_expect : int
@@ -54,7 +57,8 @@ class Odedata():
     ntraj : int/list
         Number of monte-carlo trajectories (if using mcsolve).  List indicates
         that averaging of expectation values was done over a subset of total
-        number of trajectories.
+        number of trajectories. With ``Odeoptions.target_tol`` this is the
+        number of trajectories actually used.
     col_times : list
         Times at which state collpase occurred.  Only for Monte-Carlo solver.
     col_which : list
@@ -67,6 +71,7 @@ class Odedata():
         self.times = None
         self.states = []
         self.expect = []
+        self.expect_err = None
         self.num_expect = 0
         self.num_collapse = 0
         self.ntraj = None
@@ -59,8 +59,15 @@ class Odeoptions():
         Absolute tolerance.
     rtol : float {1e-6}
         Relative tolerance.
-    method : str {'adams','bdf'}
-        Integration method.
+    method : str {'adams','bdf','dopri5','krylov'}
+        Integration method. 'dopri5' selects an explicit Dormand-Prince
+        integrator with dense output, which mcsolve uses to locate collapse
+        times without re-integration (mcsolve only). 'krylov' propagates
+        the state with the matrix exponential in a Krylov subspace, with
+        the error of each step below ``atol`` (sesolve with constant
+        Hamiltonian only).
+    krylov_dim : int {30}
+        Maximum dimension of the Krylov subspace for method 'krylov'.
     order : int {12}
         Order of integrator (<=12 'adams', <=5 'bdf')
     nsteps : int {2500}
@@ -86,6 +93,27 @@ class Odeoptions():
         Avg. expectation values in mcsolver.
     ntraj : int {500}
         Number of trajectories in stochastic solvers.
+    chunk_size : int {0}
+        Number of trajectories run per task by mcsolve. If non-zero, each
+        task averages its trajectories locally and only returns the
+        running sums, so that memory and communication do not grow with
+        ``ntraj``. Not used when ``ntraj`` is a list. The stochastic solvers
+        always run their trajectories in chunks, of 10 by default. With
+        fixed ``seeds``, the results are identical for any ``num_cpus``,
+        but a different ``chunk_size`` groups the sums differently, which
+        changes them at the level of rounding errors.
+    target_tol : float / list {None}
+        Target standard error of the averaged expectation values in mcsolve,
+        either one value for all operators or a list with one value per
+        operator. Trajectories are then run in waves until all standard
+        errors are within tolerance, with ``ntraj`` as upper limit.
+    block_trajectories : bool {False, True}
+        Evolve each chunk of trajectories in mcsolve and smesolve together
+        as the columns of one dense matrix, using one sparse-dense matrix
+        product per integration step. Only for constant Hamiltonian and
+        collapse operators, and in smesolve for the Euler-Maruyama and
+        Milstein homodyne and heterodyne schemes. In mcsolve it implies
+        averaging in chunks, see ``chunk_size``.
     rhs_reuse : bool {False,True}
         Reuse Hamiltonian data.
     rhs_with_state : bool {False,True}
@@ -93,6 +121,16 @@ class Odeoptions():
         callback signature.
     rhs_filename : str
         Name for compiled Cython file.
+    rhs_matrix_form : bool {False, True}
+        Evaluate the right-hand side of the master equation in mesolve
+        directly on the density matrix, using sparse-dense matrix products,
+        instead of building the Liouvillian superoperator. Uses much less
+        memory for large systems. Requires constant or list format
+        operators, string coefficients are evaluated without compilation.
+    coeff_interpolation : str {'cubic', 'linear'}
+        Interpolation of time-dependent coefficients given as arrays of
+        samples, ``[op, samples]`` at the times in `tlist` or
+        ``[op, (times, samples)]``: not-a-knot cubic splines or linear.
     store_final_state : bool {False, True}
         Whether or not to store the final state of the evolution in the
         result class.
@@ -101,6 +139,19 @@ class Odeoptions():
         result class, even if expectation values operators are given. If no
         expectation are provided, then states are stored by default and this
         option has no effect.
+    seeds : int / list {None}
+        Seed for the random number generators of the trajectory solvers
+        (mcsolve and the stochastic solvers). An int is used as base seed
+        from which every trajectory derives its own stream, which makes the
+        results independent of the number of cpus and the chunk size. A list
+        gives one seed per trajectory. A random base seed is used if None.
+    checkpoint_dir : str {None}
+        Directory in which mcsolve and the stochastic solvers store the
+        results of completed chunks of trajectories (see ``chunk_size``).
+        A later run with the same configuration and checkpoint directory
+        skips those chunks and gives the same result. A run with different
+        operators, args, solver scheme or settings raises an exception
+        instead of resuming.
     """
     def __init__(self, atol=1e-8, rtol=1e-6, method='adams', order=12,
                  nsteps=1000, first_step=0, max_step=0, min_step=0,
@@ -108,7 +159,10 @@ class Odeoptions():
                  num_cpus=0, norm_tol=1e-3, norm_steps=5, rhs_reuse=False,
                  rhs_filename=None, gui=False, ntraj=500, rhs_with_state=False,
                  store_final_state=False, store_states=False, seeds=None,
-                 steady_state_average=False):
+                 steady_state_average=False, chunk_size=0, target_tol=None,
+                 block_trajectories=False, checkpoint_dir=None,
+                 rhs_matrix_form=False, coeff_interpolation='cubic',
+                 krylov_dim=30):
         # Absolute tolerance (default = 1e-8)
         self.atol = atol
         # Relative tolerance (default = 1e-6)
@@ -125,6 +179,8 @@ class Odeoptions():
         self.max_step = max_step
         # Maximum order used by integrator (<=12 for 'adams', <=5 for 'bdf')
         self.order = order
+        # Maximum dimension of the Krylov subspace (method 'krylov')
+        self.krylov_dim = krylov_dim
         # Average expectation values over trajectories (default = True)
         self.average_states = average_states
         # average expectation values
@@ -140,6 +196,10 @@ class Odeoptions():
         # Use filename for preexisting RHS function (will default to last
         # compiled function if None & rhs_exists=True)
         self.rhs_filename = rhs_filename
+        # evaluate the master equation on the density matrix (mesolve only)
+        self.rhs_matrix_form = rhs_matrix_form
+        # interpolation of sampled time-dependent coefficients
+        self.coeff_interpolation = coeff_interpolation
         # Number of processors to use (mcsolve only)
         if num_cpus:
             self.num_cpus = num_cpus
@@ -160,10 +220,18 @@ class Odeoptions():
         self.store_final_state = store_final_state
         # store states even if expectation operators are given?
         self.store_states = store_states
-        # extra solver parameters
+        # seed(s) for the random numbers of the trajectory solvers
         self.seeds = seeds
         # average mcsolver density matricies assuming steady state evolution
         self.steady_state_average = steady_state_average
+        # number of trajectories per averaging chunk (mcsolve only)
+        self.chunk_size = chunk_size
+        # target standard error of expectation values (mcsolve only)
+        self.target_tol = target_tol
+        # evolve chunks of trajectories as one dense block (mcsolve only)
+        self.block_trajectories = block_trajectories
+        # directory for checkpoints of trajectory solvers
+        self.checkpoint_dir = checkpoint_dir
 
     def __str__(self):
         s = ""
@@ -173,6 +241,7 @@ class Odeoptions():
         s += "rtol:              " + str(self.rtol) + "\n"
         s += "method:            " + str(self.method) + "\n"
         s += "order:             " + str(self.order) + "\n"
+        s += "krylov_dim:        " + str(self.krylov_dim) + "\n"
         s += "nsteps:            " + str(self.nsteps) + "\n"
         s += "first_step:        " + str(self.first_step) + "\n"
         s += "min_step:          " + str(self.min_step) + "\n"
@@ -184,10 +253,15 @@ class Odeoptions():
         s += "rhs_filename:      " + str(self.rhs_filename) + "\n"
         s += "rhs_reuse:         " + str(self.rhs_reuse) + "\n"
         s += "rhs_with_state:    " + str(self.rhs_with_state) + "\n"
+        s += "coeff_interpolation: " + str(self.coeff_interpolation) + "\n"
         s += "gui:               " + str(self.gui) + "\n"
         s += "average_expect:    " + str(self.average_expect) + "\n"
         s += "average_states:    " + str(self.average_states) + "\n"
         s += "ntraj:             " + str(self.ntraj) + "\n"
+        s += "chunk_size:        " + str(self.chunk_size) + "\n"
+        s += "target_tol:        " + str(self.target_tol) + "\n"
+        s += "block_trajectories: " + str(self.block_trajectories) + "\n"
+        s += "checkpoint_dir:    " + str(self.checkpoint_dir) + "\n"
         s += "store_states:      " + str(self.store_states) + "\n"
         s += "store_final_state: " + str(self.store_final_state) + "\n"
 
@@ -31,18 +31,216 @@
 #    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 ###############################################################################
 
+__all__ = ['parfor', 'parallel_pool', 'pool_initialize', 'pool_shutdown']
+
 from scipy import array
-from multiprocessing import Pool, cpu_count
+from multiprocessing import Pool, Condition, Value, cpu_count
 from functools import partial
 import os
 import sys
+import time
 import signal
+import atexit
+import pickle
 import qutip.settings as qset
 
+try:
+    from multiprocessing import Barrier
+except ImportError:
+    # multiprocessing.Barrier is only available from Python 3.3
+    Barrier = None
+
+#
+# Persistent worker pool shared by parfor, mcsolve and the solvers built on
+# top of them.  The pool is created on first use and kept alive between calls
+# so that repeated solver calls do not pay the process startup cost.
+#
+_pool = None
+_pool_cpus = 0
+
+# worker-side barrier used to make sure that a broadcast task is executed
+# exactly once in every worker process
+_pool_barrier = None
+
+# seconds to wait for all workers to pick up a broadcast task
+_pool_broadcast_timeout = 60
+
+
+class _ConditionBarrier(object):
+    """Minimal reusable process barrier built on a shared condition, used
+    when multiprocessing.Barrier is not available.
+    """
+    def __init__(self, parties):
+        self._parties = parties
+        self._cond = Condition()
+        self._count = Value('i', 0, lock=False)
+        self._generation = Value('i', 0, lock=False)
+
+    def wait(self, timeout=None):
+        with self._cond:
+            generation = self._generation.value
+            self._count.value += 1
+            if self._count.value == self._parties:
+                self._count.value = 0
+                self._generation.value += 1
+                self._cond.notify_all()
+                return
+            end = None if timeout is None else time.time() + timeout
+            while generation == self._generation.value:
+                remaining = None if end is None else end - time.time()
+                if remaining is not None and remaining <= 0:
+                    self._count.value -= 1
+                    raise RuntimeError("Barrier timed out.")
+                self._cond.wait(remaining)
+
+
+def _pool_barrier_new(parties):
+    if Barrier is not None:
+        return Barrier(parties)
+    else:
+        return _ConditionBarrier(parties)
+
+
+def _pool_init(barrier):
+    global _pool_barrier
+    _pool_barrier = barrier
+
+
+def _pool_broadcast_task(payload):
+    err = None
+    try:
+        func, args = pickle.loads(payload)
+        func(*args)
+    except Exception as e:
+        err = e
+    finally:
+        # block until every worker holds one broadcast task, so that no
+        # worker can run the initializer twice
+        try:
+            _pool_barrier.wait(_pool_broadcast_timeout)
+        except Exception as e:
+            err = err or e
+    return err
+
+
+def parallel_pool(num_cpus=None):
+    """Returns the persistent worker pool, creating it if necessary.
+
+    The pool is reused by subsequent calls as long as the requested number
+    of processes does not change. Use :func:`pool_shutdown` to terminate the
+    worker processes explicitly.
+
+    Parameters
+    ----------
+    num_cpus : int
+        Number of worker processes. Default is ``qutip.settings.num_cpus``.
+
+    Returns
+    -------
+    pool : multiprocessing.Pool
+        The shared pool of worker processes.
+
+    """
+    global _pool, _pool_cpus
+
+    if not num_cpus:
+        num_cpus = qset.num_cpus
+
+    if _pool is not None and _pool_cpus != num_cpus:
+        pool_shutdown()
+
+    if _pool is None:
+        _pool = Pool(processes=num_cpus, initializer=_pool_init,
+                     initargs=(_pool_barrier_new(num_cpus),))
+        _pool_cpus = num_cpus
+
+    return _pool
+
+
+def pool_initialize(func, *args, **kwargs):
+    """Runs ``func(*args)`` exactly once in every process of the persistent
+    worker pool.
+
+    This is used to hand the solver configuration to the workers once per
+    solver call, instead of serializing it with every task. If the workers
+    fail to load the payload, e.g. because it refers to a function defined
+    after the pool was started, the pool is restarted and the call retried
+    once.
+
+    Parameters
+    ----------
+    func : function
+        Function executed in each worker. Must be importable by name.
+
+    args : list
+        Arguments passed to `func`.
+
+    num_cpus : int
+        Number of worker processes. Default is ``qutip.settings.num_cpus``.
+
+    Returns
+    -------
+    pool : multiprocessing.Pool
+        The shared pool of worker processes, with `func` applied in every
+        worker.
+
+    """
+    num_cpus = kwargs.get('num_cpus', None)
+    payload = pickle.dumps((func, args), pickle.HIGHEST_PROTOCOL)
+
+    for attempt in range(2):
+        pool = parallel_pool(num_cpus)
+        errors = [e for e in pool.map(_pool_broadcast_task,
+                                      [payload] * _pool_cpus, chunksize=1)
+                  if e is not None]
+        if not errors:
+            return pool
+        pool_shutdown()
+
+    raise Exception("Failed to initialize worker pool: " + str(errors[0]))
+
+
+def pool_shutdown():
+    """Terminates the persistent worker pool used by :func:`parfor` and the
+    Monte-Carlo solvers. A new pool is started on the next call that needs
+    one.
+    """
+    global _pool, _pool_cpus
+
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+    _pool = None
+    _pool_cpus = 0
+
+atexit.register(pool_shutdown)
+
+
+class _TaskLoadError(object):
+    """Returned by a task whose function could not be loaded in the worker.
+    """
+    def __init__(self, message):
+        self.message = message
+
+
+# function of the last parfor task run in this worker, with its pickle
+_task_func = (None, None)
+
+
+def _task_load(payload):
+    global _task_func
+    if _task_func[0] != payload:
+        _task_func = (payload, pickle.loads(payload))
+    return _task_func[1]
+
 
 def _task_wrapper(args):
     try:
-        return args[0](*args[1])
+        try:
+            func = _task_load(args[0])
+        except Exception as e:
+            return _TaskLoadError(str(e))
+        return func(*args[1])
     except KeyboardInterrupt:
         os.kill(args[2], signal.SIGINT)
         sys.exit(1)
@@ -50,7 +248,11 @@ def _task_wrapper(args):
 
 def _task_wrapper_with_args(args, user_args):
     try:
-        return args[0](*args[1], **user_args)
+        try:
+            func = _task_load(args[0])
+        except Exception as e:
+            return _TaskLoadError(str(e))
+        return func(*args[1], **user_args)
     except KeyboardInterrupt:
         os.kill(args[2], signal.SIGINT)
         sys.exit(1)
@@ -101,13 +303,27 @@ def parfor(func, *args, **kwargs):
               "is larger than physical number (%s)." % qset.num_cpus)
         print("Reduce 'num_cpus' for greater performance.")
 
-    pool = Pool(processes=kw['num_cpus'])
+    # func is loaded by the tasks, so that a worker which cannot load it,
+    # e.g. because it was defined in __main__ after the pool was started,
+    # reports this instead of failing
+    payload = pickle.dumps(func, pickle.HIGHEST_PROTOCOL)
     args = [list(arg) for arg in args]
     var = [[args[j][i] for j in range(len(args))]
            for i in range(len(list(args[0])))]
     try:
-        map_args = ((func, v, os.getpid()) for v in var)
-        par_return = list(pool.map(task_func, map_args))
+        for attempt in range(2):
+            pool = parallel_pool(kw['num_cpus'])
+            map_args = ((payload, v, os.getpid()) for v in var)
+            par_return = list(pool.map(task_func, map_args))
+            errors = [res for res in par_return
+                      if isinstance(res, _TaskLoadError)]
+            if not errors:
+                break
+            # start workers that know func
+            pool_shutdown()
+        else:
+            raise Exception("Failed to load the function in the worker " +
+                            "processes: " + errors[0].message)
 
         if isinstance(par_return[0], tuple):
             par_return = [elem for elem in par_return]
@@ -118,7 +334,7 @@ def parfor(func, *args, **kwargs):
             return list(par_return)
 
     except KeyboardInterrupt:
-        pool.terminate()
+        pool_shutdown()
 
 def _default_parfor_settings():
     settings = {'num_cpus' : qset.num_cpus}
@@ -31,21 +31,33 @@
 #    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 ###############################################################################
 
+import os
 import types
+import pickle
+import tempfile
 import numpy as np
 import scipy.linalg as la
+import scipy.sparse as sp
+import scipy.integrate
 import warnings
 
 from qutip.qobj import Qobj
 from qutip.rhs_generate import rhs_clear
-from qutip.superoperator import vec2mat, mat2vec
-from qutip.mesolve import mesolve
-from qutip.sesolve import sesolve
+from qutip.superoperator import (vec2mat, mat2vec, spre, spost,
+                                 liouvillian_fast, lindblad_dissipator)
+from qutip.mesolve import mesolve, _matrix_form_term, _mesolve_func_args
+from qutip.interpolate import _interpolated_terms
+from qutip.sesolve import sesolve, _sesolve_func_args
+from qutip.cy.spmatfuncs import cy_ode_psi_func_td, cy_ode_rho_func_td
 from qutip.essolve import essolve
 from qutip.steadystate import steadystate
 from qutip.states import basis
 from qutip.states import projection
 from qutip.odeoptions import Odeoptions
+from qutip.odechecks import _ode_method_check
+from qutip.parfor import pool_initialize
+from qutip.graph import graph_components
+import qutip.settings
 
 
 def propagator(H, t, c_op_list, args=None, options=None):
@@ -90,59 +102,32 @@ def propagator(H, t, c_op_list, args=None, options=None):
 
     tlist = [0, t] if isinstance(t, (int, float, np.int64, np.float64)) else t
 
-    if len(c_op_list) == 0:
-        # calculate propagator for the wave function
-
-        if isinstance(H, types.FunctionType):
-            H0 = H(0.0, args)
-            N = H0.shape[0]
-            dims = H0.dims
-        elif isinstance(H, list):
-            H0 = H[0][0] if isinstance(H[0], list) else H[0]
-            N = H0.shape[0]
-            dims = H0.dims
-        else:
-            N = H.shape[0]
-            dims = H.dims
+    if isinstance(c_op_list, Qobj):
+        c_op_list = [c_op_list]
 
-        u = np.zeros([N, N, len(tlist)], dtype=complex)
+    if (isinstance(H, Qobj) and
+            all([isinstance(c, Qobj) for c in c_op_list])):
+        # constant generator: matrix exponentials
+        u, dims = _propagator_expm(H, tlist, c_op_list)
 
-        for n in range(0, N):
-            psi0 = basis(N, n)
-            output = sesolve(H, psi0, tlist, [], args, options)
-            for k, t in enumerate(tlist):
-                u[:, n, k] = output.states[k].full().T
-
-        # todo: evolving a batch of wave functions:
-        # psi_0_list = [basis(N, n) for n in range(N)]
-        # psi_t_list = mesolve(H, psi_0_list, [0, t], [], [], args, options)
-        # for n in range(0, N):
-        #    u[:,n] = psi_t_list[n][1].full().T
+    elif isinstance(H, (Qobj, list)):
+        # time-dependent list format: all columns as one matrix ODE
+        u, dims = _propagator_block(H, tlist, c_op_list, args, options)
 
     else:
-        # calculate the propagator for the vector representation of the
-        # density matrix (a superoperator propagator)
-
-        if isinstance(H, types.FunctionType):
-            H0 = H(0.0, args)
-            N = H0.shape[0]
-            dims = [H0.dims, H0.dims]
-        elif isinstance(H, list):
-            H0 = H[0][0] if isinstance(H[0], list) else H[0]
-            N = H0.shape[0]
-            dims = [H0.dims, H0.dims]
+        # function format Hamiltonian: evolve the basis states one at a time,
+        # in parallel if possible
+        H0 = H(0.0, args)
+        N = H0.shape[0]
+        # the solvers expect the function to return the sparse matrix
+        H0_dims = H0.dims if isinstance(H0, Qobj) else [[N], [N]]
+        if len(c_op_list) == 0:
+            dims = H0_dims
+            M = N
         else:
-            N = H.shape[0]
-            dims = [H.dims, H.dims]
-
-        u = np.zeros([N * N, N * N, len(tlist)], dtype=complex)
-
-        for n in range(0, N * N):
-            psi0 = basis(N * N, n)
-            rho0 = Qobj(vec2mat(psi0.full()))
-            output = mesolve(H, rho0, tlist, c_op_list, [], args, options)
-            for k, t in enumerate(tlist):
-                u[:, n, k] = mat2vec(output.states[k].full()).T
+            dims = [H0_dims, H0_dims]
+            M = N * N
+        u = _propagator_columns(H, tlist, c_op_list, args, options, M)
 
     if len(tlist) == 2:
         return Qobj(u[:, :, 1], dims=dims)
@@ -150,6 +135,229 @@ def propagator(H, t, c_op_list, args=None, options=None):
         return [Qobj(u[:, :, k], dims=dims) for k in range(len(tlist))]
 
 
+def _propagator_setup(H, c_op_list, args):
+    """
+    Right-hand side and its parameters for the evolution of the columns of
+    the propagator of a function-format Hamiltonian, as used by sesolve and
+    mesolve. The Liouvillian of the collapse operators is built only once.
+    """
+    if len(c_op_list) == 0:
+        return cy_ode_psi_func_td, (H, _sesolve_func_args(args))
+    L_data = liouvillian_fast(None, c_op_list).data
+    return cy_ode_rho_func_td, (L_data, H, _mesolve_func_args(args))
+
+
+def _propagator_column(setup, tlist, options, n, M):
+    """
+    Column n of the propagators at all times in tlist, as array of shape
+    (M, len(tlist)), obtained by integrating the n-th basis vector.
+    """
+    rhs, f_params = setup
+    r = scipy.integrate.ode(rhs)
+    _ode_method_check(options, 'propagator')
+    r.set_integrator('zvode', method=options.method, order=options.order,
+                     atol=options.atol, rtol=options.rtol,
+                     nsteps=options.nsteps, first_step=options.first_step,
+                     min_step=options.min_step, max_step=options.max_step)
+    r.set_f_params(*f_params)
+    u = np.zeros((M, len(tlist)), dtype=complex)
+    u[n, 0] = 1
+    r.set_initial_value(u[:, 0], tlist[0])
+    for k in range(1, len(tlist)):
+        r.integrate(tlist[k])
+        if not r.successful():
+            raise Exception("ODE integration error: Try to increase " +
+                            "the allowed number of substeps by increasing " +
+                            "the nsteps parameter in the Odeoptions class.")
+        u[:, k] = r.y
+    return u
+
+
+def _propagator_columns(H, tlist, c_op_list, args, options, M):
+    """
+    Evaluates the columns of the propagators in the persistent worker pool,
+    which write them into a memory-mapped array shared with this process.
+    The right-hand side is set up once and sent to every worker. If it
+    cannot be pickled, e.g. because H is a lambda, the columns are evaluated
+    one after the other.
+    """
+    setup = _propagator_setup(H, c_op_list, args)
+    num_cpus = options.num_cpus or qutip.settings.num_cpus
+    shape = (M, M, len(tlist))
+    if num_cpus > 1 and M > 1:
+        fd, filename = tempfile.mkstemp(suffix='.npy')
+        os.close(fd)
+        try:
+            u = np.lib.format.open_memmap(filename, mode='w+', dtype=complex,
+                                          shape=shape)
+            del u
+            try:
+                pool = pool_initialize(_propagator_init, setup, tlist,
+                                       options, M, filename,
+                                       num_cpus=num_cpus)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                warnings.warn("Evaluating the propagator columns serially, " +
+                              "the Hamiltonian cannot be sent to the " +
+                              "worker processes: " + str(e))
+                pool = None
+            if pool is not None:
+                pool.map(_propagator_task, range(M),
+                         chunksize=max(1, M // (4 * num_cpus)))
+                return np.array(np.load(filename, mmap_mode='r'))
+        finally:
+            os.remove(filename)
+
+    u = np.zeros(shape, dtype=complex)
+    for n in range(M):
+        u[:, n, :] = _propagator_column(setup, tlist, options, n, M)
+    return u
+
+
+# right-hand side setup and result file installed in each worker of the pool
+# by _propagator_init
+_propagator_config = None
+
+
+def _propagator_init(setup, tlist, options, M, filename):
+    global _propagator_config
+    _propagator_config = (setup, tlist, options, M, filename)
+
+
+def _propagator_task(n):
+    setup, tlist, options, M, filename = _propagator_config
+    u = np.load(filename, mmap_mode='r+')
+    u[:, n, :] = _propagator_column(setup, tlist, options, n, M)
+    u.flush()
+    del u
+
+
+def _propagator_expm(H, tlist, c_op_list):
+    """
+    Propagators for a constant Hamiltonian (or Liouvillian) and collapse
+    operators. A Hermitian Hamiltonian is diagonalized once, otherwise the
+    propagator is advanced with the matrix exponential of the generator for
+    each time step, which is reused for equally spaced times. Independent
+    blocks of the generator are treated separately.
+    """
+    if len(c_op_list) == 0 and H.isoper:
+        dims = H.dims
+        M = H.shape[0]
+    else:
+        dims = H.dims if H.issuper else [H.dims, H.dims]
+        M = H.shape[0] if H.issuper else H.shape[0] ** 2
+
+    u = np.zeros([M, M, len(tlist)], dtype=complex)
+
+    if len(c_op_list) == 0 and H.isoper:
+        A = H.data
+    else:
+        A = liouvillian_fast(H, c_op_list, data_only=True)
+    A = A.tocsr()
+    herm = len(c_op_list) == 0 and H.isoper and H.isherm
+
+    for idx in graph_components(A):
+        block = np.ix_(idx, idx)
+        A_block = A[idx, :][:, idx].toarray()
+        if herm:
+            evals, evecs = la.eigh(A_block)
+            for k, t in enumerate(tlist):
+                phases = np.exp(-1j * evals * (t - tlist[0]))
+                u[:, :, k][block] = np.dot(evecs * phases, evecs.conj().T)
+            continue
+
+        if len(c_op_list) == 0 and H.isoper:
+            A_block = -1j * A_block
+        u_block = np.eye(len(idx), dtype=complex)
+        u[:, :, 0][block] = u_block
+        dt_step = None
+        for k in range(1, len(tlist)):
+            dt = tlist[k] - tlist[k - 1]
+            if dt_step is None or abs(dt - dt_step) > 1e-12 * abs(dt_step):
+                dt_step = dt
+                U_step = la.expm(A_block * dt)
+            u_block = np.dot(U_step, u_block)
+            u[:, :, k][block] = u_block
+
+    return u, dims
+
+
+def _propagator_block(H, tlist, c_op_list, args, options):
+    """
+    Propagators for Hamiltonians and collapse operators in the list format,
+    integrating dU/dt = A(t) U for all columns of U at once.
+    """
+    H, c_op_list, args = _interpolated_terms(H, c_op_list, args, tlist,
+                                             options.coeff_interpolation)
+    H_list = H if isinstance(H, list) else [H]
+    H0 = H_list[0][0] if isinstance(H_list[0], list) else H_list[0]
+    super_form = len(c_op_list) > 0 or H0.issuper
+
+    if not super_form:
+        dims = H0.dims
+        M = H0.shape[0]
+    else:
+        dims = H0.dims if H0.issuper else [H0.dims, H0.dims]
+        M = H0.shape[0] if H0.issuper else H0.shape[0] ** 2
+
+    # constant generator and time-dependent terms of the generator
+    A0 = sp.csr_matrix((M, M), dtype=complex)
+    A_terms = []
+    for h_spec in H_list:
+        h, h_coeff = _matrix_form_term(h_spec, args, options, False,
+                                       superop=True)
+        if h.issuper:
+            A = h.data
+        elif super_form:
+            A = -1j * (spre(h) - spost(h)).data
+        else:
+            A = -1j * h.data
+        if h_coeff is None:
+            A0 = A0 + A
+        else:
+            A_terms.append((A, h_coeff))
+    for c_spec in c_op_list:
+        c = c_spec[0] if isinstance(c_spec, list) else c_spec
+        c, c_coeff = _matrix_form_term(c_spec, args, options, c.isoper,
+                                       superop=True)
+        A = c.data if c.issuper else lindblad_dissipator(c, data_only=True)
+        if c_coeff is None:
+            A0 = A0 + A
+        else:
+            A_terms.append((A, c_coeff))
+
+    ODE = scipy.integrate.ode(_block_rhs)
+    _ode_method_check(options, 'propagator')
+    ODE.set_integrator('zvode', method=options.method, order=options.order,
+                       atol=options.atol, rtol=options.rtol,
+                       nsteps=options.nsteps, first_step=options.first_step,
+                       min_step=options.min_step, max_step=options.max_step)
+    ODE.set_f_params(A0, A_terms, M)
+    ODE.set_initial_value(np.eye(M, dtype=complex).ravel(), tlist[0])
+
+    u = np.zeros([M, M, len(tlist)], dtype=complex)
+    u[:, :, 0] = np.eye(M)
+    for k in range(1, len(tlist)):
+        ODE.integrate(tlist[k])
+        if not ODE.successful():
+            raise Exception("ODE integration error: Try to increase " +
+                            "the allowed number of substeps by increasing " +
+                            "the nsteps parameter in the Odeoptions class.")
+        u[:, :, k] = ODE.y.reshape((M, M))
+
+    return u, dims
+
+
+def _block_rhs(t, y, A0, A_terms, M):
+    """
+    Right-hand side A(t) U of the matrix ODE of the propagator.
+    """
+    Y = y.reshape((M, M))
+    out = A0 * Y
+    for A, coeff in A_terms:
+        out += coeff(t, None) * (A * Y)
+    return out.ravel()
+
+
 def _get_min_and_index(lst):
     """
     Private function for obtaining min and max indicies.
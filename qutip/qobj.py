@@ -1185,7 +1185,7 @@ class Qobj(object):
         raise TypeError("Can only calculate overlap for state vector Qobjs")
 
     def eigenstates(self, sparse=False, sort='low',
-                    eigvals=0, tol=0, maxiter=100000):
+                    eigvals=0, tol=0, maxiter=100000, blocks=False):
         """Eigenstates and eigenenergies.
 
         Eigenstates and eigenenergies are defined for operators and
@@ -1209,6 +1209,11 @@ class Qobj(object):
         maxiter : int
             Maximum number of iterations performed by sparse solver (if used).
 
+        blocks : bool
+            Diagonalize the independent blocks of the operator separately
+            (for example the sectors of a conserved quantity), using the
+            dense solver for each block.
+
         Returns
         -------
         eigvals : array
@@ -1225,14 +1230,15 @@ class Qobj(object):
 
         """
         evals, evecs = sp_eigs(self, sparse=sparse, sort=sort,
-                               eigvals=eigvals, tol=tol, maxiter=maxiter)
+                               eigvals=eigvals, tol=tol, maxiter=maxiter,
+                               blocks=blocks)
         new_dims = [self.dims[0], [1] * len(self.dims[0])]
         ekets = np.array([Qobj(vec, dims=new_dims) for vec in evecs])
         norms = np.array([ket.norm() for ket in ekets])
         return evals, ekets / norms
 
     def eigenenergies(self, sparse=False, sort='low',
-                      eigvals=0, tol=0, maxiter=100000):
+                      eigvals=0, tol=0, maxiter=100000, blocks=False):
         """Eigenenergies of a quantum object.
 
         Eigenenergies (eigenvalues) are defined for operators or superoperators
@@ -1256,6 +1262,10 @@ class Qobj(object):
         maxiter : int
             Maximum number of iterations performed by sparse solver (if used).
 
+        blocks : bool
+            Diagonalize the independent blocks of the operator separately,
+            using the dense solver for each block.
+
         Returns
         -------
         eigvals: array
@@ -1268,7 +1278,8 @@ class Qobj(object):
 
         """
         return sp_eigs(self, vecs=False, sparse=sparse, sort=sort,
-                       eigvals=eigvals, tol=tol, maxiter=maxiter)
+                       eigvals=eigvals, tol=tol, maxiter=maxiter,
+                       blocks=blocks)
 
     def groundstate(self, sparse=False, tol=0, maxiter=100000):
         """Ground state Eigenvalue and Eigenvector.
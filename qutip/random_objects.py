@@ -239,6 +239,32 @@ def rand_super(dim=5):
         create(dim), destroy(dim), jmat(float(dim - 1) / 2.0, 'z')
     ])
 
+def _trajectory_seeds(seeds=None):
+    """
+    Returns the seeds for the random number generators of a set of
+    trajectories, see :func:`_trajectory_prng`. If `seeds` is None, a base
+    seed is drawn from the global numpy random state.
+    """
+    if seeds is None:
+        return np.random.randint(2 ** 31)
+    return seeds
+
+
+def _trajectory_prng(seeds, n):
+    """
+    Returns the random number generator of trajectory `n`.
+
+    If `seeds` is a list, it holds one seed per trajectory. Otherwise it is a
+    base seed, and the generator of trajectory `n` is seeded with the pair
+    (seeds, n). Each trajectory then has its own independent stream, so the
+    result of a trajectory depends only on the base seed and its index, and
+    not on how the trajectories are split between processes.
+    """
+    if isinstance(seeds, (list, tuple, np.ndarray)):
+        return np.random.RandomState(seeds[n])
+    return np.random.RandomState([int(seeds), int(n)])
+
+
 def _check_dims(dims, N1, N2):
     if len(dims) != 2:
         raise Exception("Qobj dimensions must be list of length 2.")
@@ -34,10 +34,11 @@ import os
 import numpy
 from scipy import ndarray, array
 
-from qutip.cy.codegen import Codegen
+from qutip.cy.codegen import Codegen, _rhs_remove
 from qutip.odeoptions import Odeoptions
 from qutip.odechecks import _ode_checks
 from qutip.odeconfig import odeconfig
+from qutip.interpolate import _interpolated_terms
 from qutip.qobj import Qobj
 from qutip.superoperator import spre, spost
 
@@ -91,10 +92,8 @@ def rhs_generate(H, c_ops, args={}, options=Odeoptions(), name=None):
     odeconfig.reset()
     odeconfig.options = options
 
-    if name:
-        odeconfig.tdname = name
-    else:
-        odeconfig.tdname = "rhs" + str(odeconfig.cgen_num)
+    H, c_ops, args = _interpolated_terms(H, c_ops, args, None,
+                                         options.coeff_interpolation)
 
     Lconst = 0
 
@@ -162,7 +161,7 @@ def rhs_generate(H, c_ops, args={}, options=Odeoptions(), name=None):
 
     cgen = Codegen(h_terms=n_L_terms, h_tdterms=Lcoeff, args=args,
                    odeconfig=odeconfig)
-    cgen.generate(odeconfig.tdname + ".pyx")
+    odeconfig.tdname = cgen.generate_module(name)
 
     code = compile('from ' + odeconfig.tdname +
                    ' import cy_td_ode_rhs', '<string>', 'exec')
@@ -170,6 +169,6 @@ def rhs_generate(H, c_ops, args={}, options=Odeoptions(), name=None):
 
     odeconfig.tdfunc = cy_td_ode_rhs
     try:
-        os.remove(odeconfig.tdname + ".pyx")
+        _rhs_remove(odeconfig.tdname)
     except:
         pass
@@ -43,17 +43,18 @@ import scipy.integrate
 from scipy.linalg import norm
 
 from qutip.qobj import Qobj, isket
-from qutip.expect import expect
+from qutip.expect import expect, _ExpectOps
 from qutip.rhs_generate import rhs_generate
 from qutip.odedata import Odedata
 from qutip.odeoptions import Odeoptions
 from qutip.odeconfig import odeconfig
-from qutip.odechecks import _ode_checks
+from qutip.odechecks import _ode_checks, _ode_method_check
+from qutip.interpolate import _interpolated_terms
 from qutip.settings import debug
-from qutip.cy.spmatfuncs import (cy_expect_psi, cy_ode_rhs,
-                                 cy_ode_psi_func_td,
+from qutip.cy.spmatfuncs import (cy_ode_rhs, cy_ode_psi_func_td,
                                  cy_ode_psi_func_td_with_state)
-from qutip.cy.codegen import Codegen
+from qutip.cy.codegen import Codegen, _rhs_remove
+from qutip.krylov import Krylov
 
 from qutip.gui.progressbar import BaseProgressBar
 
@@ -123,12 +124,16 @@ def sesolve(H, rho0, tlist, e_ops, args={}, options=None,
     else:
         e_ops_dict = None
 
-    # check for type (if any) of time-dependent inputs
-    n_const, n_func, n_str = _ode_checks(H, [])
-
     if options is None:
         options = Odeoptions()
 
+    # sampled coefficients are interpolated in string-format terms
+    H, _, args = _interpolated_terms(H, [], args, tlist,
+                                     options.coeff_interpolation)
+
+    # check for type (if any) of time-dependent inputs
+    n_const, n_func, n_str = _ode_checks(H, [])
+
     if (not options.rhs_reuse) or (not odeconfig.tdfunc):
         # reset odeconfig time-dependence flags to default values
         odeconfig.reset()
@@ -210,6 +215,7 @@ def _sesolve_list_func_td(H_list, psi0, tlist, e_ops, args, opt,
         r = scipy.integrate.ode(psi_list_td)
     else:
         r = scipy.integrate.ode(psi_list_td_with_state)
+    _ode_method_check(opt, 'sesolve')
     r.set_integrator('zvode', method=opt.method, order=opt.order,
                      atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
                      first_step=opt.first_step, min_step=opt.min_step,
@@ -273,18 +279,25 @@ def _sesolve_const(H, psi0, tlist, e_ops, args, opt, progress_bar):
 
     if not isket(psi0):
         raise TypeError("psi0 must be a ket")
+    _ode_method_check(opt, 'sesolve', ('adams', 'bdf', 'krylov'))
 
     #
     # setup integrator.
     #
     initial_vector = psi0.full().ravel()
-    r = scipy.integrate.ode(cy_ode_rhs)
-    L = -1.0j * H
-    r.set_f_params(L.data.data, L.data.indices, L.data.indptr)  # cython RHS
-    r.set_integrator('zvode', method=opt.method, order=opt.order,
-                     atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
-                     first_step=opt.first_step, min_step=opt.min_step,
-                     max_step=opt.max_step)
+    if opt.method == 'krylov':
+        # exact propagation with the matrix exponential in Krylov subspaces
+        r = Krylov(H.data, H.isherm)
+        r.set_integrator('krylov', atol=opt.atol, nsteps=opt.nsteps,
+                         max_dim=opt.krylov_dim)
+    else:
+        r = scipy.integrate.ode(cy_ode_rhs)
+        L = -1.0j * H
+        r.set_f_params(L.data.data, L.data.indices, L.data.indptr)
+        r.set_integrator('zvode', method=opt.method, order=opt.order,
+                         atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
+                         first_step=opt.first_step, min_step=opt.min_step,
+                         max_step=opt.max_step)
 
     r.set_initial_value(initial_vector, tlist[0])
 
@@ -364,20 +377,17 @@ def _sesolve_list_str_td(H_list, psi0, tlist, e_ops, args, opt,
     for k in range(n_L_terms):
         string_list.append("Ldata[%d], Linds[%d], Lptrs[%d]" % (k, k, k))
     for name, value in args.items():
-        string_list.append(str(value))
+        # passed by reference, arrays have no exact literal form
+        string_list.append("args[%r]" % name)
     parameter_string = ",".join(string_list)
 
     #
     # generate and compile new cython code if necessary
     #
     if not opt.rhs_reuse or odeconfig.tdfunc is None:
-        if opt.rhs_filename is None:
-            odeconfig.tdname = "rhs" + str(odeconfig.cgen_num)
-        else:
-            odeconfig.tdname = opt.rhs_filename
         cgen = Codegen(h_terms=n_L_terms, h_tdterms=Lcoeff, args=args,
                        odeconfig=odeconfig)
-        cgen.generate(odeconfig.tdname + ".pyx")
+        odeconfig.tdname = cgen.generate_module(opt.rhs_filename)
 
         code = compile('from ' + odeconfig.tdname + ' import cy_td_ode_rhs',
                        '<string>', 'exec')
@@ -389,6 +399,7 @@ def _sesolve_list_str_td(H_list, psi0, tlist, e_ops, args, opt,
     #
     initial_vector = psi0.full().ravel()
     r = scipy.integrate.ode(odeconfig.tdfunc)
+    _ode_method_check(opt, 'sesolve')
     r.set_integrator('zvode', method=opt.method, order=opt.order,
                      atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
                      first_step=opt.first_step, min_step=opt.min_step,
@@ -462,13 +473,9 @@ def _sesolve_list_td(H_func, psi0, tlist, e_ops, args, opt, progress_bar):
 
     # run code generator
     if not opt.rhs_reuse or odeconfig.tdfunc is None:
-        if opt.rhs_filename is None:
-            odeconfig.tdname = "rhs" + str(odeconfig.cgen_num)
-        else:
-            odeconfig.tdname = opt.rhs_filename
         cgen = Codegen(h_terms=n_L_terms, h_tdterms=Lcoeff, args=args,
                        odeconfig=odeconfig)
-        cgen.generate(odeconfig.tdname + ".pyx")
+        odeconfig.tdname = cgen.generate_module(opt.rhs_filename)
 
         code = compile('from ' + odeconfig.tdname + ' import cy_td_ode_rhs',
                        '<string>', 'exec')
@@ -479,6 +486,7 @@ def _sesolve_list_td(H_func, psi0, tlist, e_ops, args, opt, progress_bar):
     #
     initial_vector = psi0.full().ravel()
     r = scipy.integrate.ode(odeconfig.tdfunc)
+    _ode_method_check(opt, 'sesolve')
     r.set_integrator('zvode', method=opt.method, order=opt.order,
                      atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
                      first_step=opt.first_step, min_step=opt.min_step,
@@ -513,6 +521,35 @@ def _sesolve_func_td(H_func, psi0, tlist, e_ops, args, opt, progress_bar):
     #
     # setup integrator
     #
+    new_args = _sesolve_func_args(args)
+
+    initial_vector = psi0.full().ravel()
+
+    if not opt.rhs_with_state:
+        r = scipy.integrate.ode(cy_ode_psi_func_td)
+    else:
+        r = scipy.integrate.ode(cy_ode_psi_func_td_with_state)
+
+    _ode_method_check(opt, 'sesolve')
+    r.set_integrator('zvode', method=opt.method, order=opt.order,
+                     atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
+                     first_step=opt.first_step, min_step=opt.min_step,
+                     max_step=opt.max_step)
+    r.set_initial_value(initial_vector, tlist[0])
+    r.set_f_params(H_func, new_args)
+
+    #
+    # call generic ODE code
+    #
+    return _generic_ode_solve(r, psi0, tlist, e_ops, opt, progress_bar, norm,
+                              dims=psi0.dims)
+
+
+def _sesolve_func_args(args):
+    """
+    Internal function. Returns the args of a function-format Hamiltonian,
+    with Qobjs replaced by their data.
+    """
     new_args = None
 
     if type(args) is dict:
@@ -539,25 +576,7 @@ def _sesolve_func_td(H_func, psi0, tlist, e_ops, args, opt, progress_bar):
         else:
             new_args = args
 
-    initial_vector = psi0.full().ravel()
-
-    if not opt.rhs_with_state:
-        r = scipy.integrate.ode(cy_ode_psi_func_td)
-    else:
-        r = scipy.integrate.ode(cy_ode_psi_func_td_with_state)
-
-    r.set_integrator('zvode', method=opt.method, order=opt.order,
-                     atol=opt.atol, rtol=opt.rtol, nsteps=opt.nsteps,
-                     first_step=opt.first_step, min_step=opt.min_step,
-                     max_step=opt.max_step)
-    r.set_initial_value(initial_vector, tlist[0])
-    r.set_f_params(H_func, new_args)
-
-    #
-    # call generic ODE code
-    #
-    return _generic_ode_solve(r, psi0, tlist, e_ops, opt, progress_bar, norm,
-                              dims=psi0.dims)
+    return new_args
 
 
 #
@@ -615,6 +634,7 @@ def _generic_ode_solve(r, psi0, tlist, e_ops, opt, progress_bar,
                     output.expect.append(np.zeros(n_tsteps))
                 else:
                     output.expect.append(np.zeros(n_tsteps, dtype=complex))
+            e_ops_set = _ExpectOps(e_ops)
     else:
         raise TypeError("Expectation parameter must be a list or a function")
 
@@ -641,8 +661,9 @@ def _generic_ode_solve(r, psi0, tlist, e_ops, opt, progress_bar,
             # use callback method
             e_ops(t, Qobj(r.y, dims=psi0.dims))
 
-        for m in range(n_expt_op):
-            output.expect[m][t_idx] = cy_expect_psi(e_ops[m].data, r.y, e_ops[m].isherm)
+        if n_expt_op:
+            for m, val in enumerate(e_ops_set.expect(r.y)):
+                output.expect[m][t_idx] = val
 
         if t_idx < n_tsteps - 1:
             r.integrate(r.t + dt[t_idx])
@@ -651,7 +672,7 @@ def _generic_ode_solve(r, psi0, tlist, e_ops, opt, progress_bar,
 
     if not opt.rhs_reuse and odeconfig.tdname is not None:
         try:
-            os.remove(odeconfig.tdname + ".pyx")
+            _rhs_remove(odeconfig.tdname)
         except:
             pass
 
@@ -35,6 +35,8 @@ This module contains settings for the QuTiP GUI,multiprocessing, and
 tidyup functionality.
 
 """
+import os
+
 # QuTiP Graphics (set at qutip import)
 qutip_graphics = None
 # use auto tidyup
@@ -51,6 +53,16 @@ num_cpus = 1
 fortran = False
 # debug mode for development
 debug = False
+# directory for the cache of compiled time-dependent RHS modules (None to
+# disable the cache)
+rhs_cache_dir = os.path.join(os.path.expanduser("~"), ".qutip", "rhs_cache")
+# maximum size of the RHS cache in MB
+rhs_cache_size = 200
+# compile string-format time-dependence with Cython (if False, generated
+# python code is used, which is slower but needs no compilation). Switched
+# off at qutip import if Cython cannot be set up, and by the solvers if the
+# compilation fails.
+rhs_compile = True
 
 
 def reset():
@@ -64,7 +76,8 @@ def load_rc_file(rc_file):
     directory.
     """
     global qutip_graphics, qutip_gui, auto_tidyup, auto_herm, \
-        auto_tidyup_atol, num_cpus, debug, atol
+        auto_tidyup_atol, num_cpus, debug, atol, rhs_cache_dir, \
+        rhs_cache_size, rhs_compile
 
     with open(rc_file) as f:
         for line in f.readlines():
@@ -91,3 +104,12 @@ def load_rc_file(rc_file):
 
                 elif var == "debug":
                     debug = True if val == "True" else False
+
+                elif var == "rhs_cache_dir":
+                    rhs_cache_dir = None if val == "None" else val
+
+                elif var == "rhs_cache_size":
+                    rhs_cache_size = float(val)
+
+                elif var == "rhs_compile":
+                    rhs_compile = True if val == "True" else False
@@ -43,6 +43,7 @@ _dznrm2 = get_blas_funcs("znrm2")
 from qutip.cy.sparse_utils import (
         _sparse_permute, _sparse_reverse_permute, _sparse_bandwidth)
 from qutip.settings import debug
+import qutip.settings as qset
 
 if debug:
     import inspect
@@ -137,8 +138,66 @@ def sp_reshape(A, shape, format='csr'):
         raise ValueError('Return format not valid.')
 
 
+# blocks of at least this dimension are diagonalized in the worker pool
+_block_parallel_min = 200
+
+
+def _block_eig(task):
+    """
+    Dense eigenvalues (and vectors) of one block, see _sp_eigs_blocks.
+    """
+    A, isherm, vecs = task
+    if isherm:
+        return la.eigh(A) if vecs else (la.eigvalsh(A), None)
+    else:
+        return la.eig(A) if vecs else (la.eigvals(A), None)
+
+
+def _sp_eigs_blocks(op, vecs=True, sort='low', eigvals=0):
+    """
+    Eigenvalues and eigenvectors of a Qobj that splits into independent
+    blocks, obtained by diagonalizing each block separately.
+    """
+    from qutip.graph import graph_components
+
+    N = op.shape[0]
+    A = op.data.tocsr()
+    comps = graph_components(A)
+    tasks = [(A[idx, :][:, idx].toarray(), op.isherm, vecs)
+             for idx in comps]
+    if (qset.num_cpus > 1 and len(comps) > 1 and
+            max([len(idx) for idx in comps]) >= _block_parallel_min):
+        from qutip.parfor import parallel_pool
+        results = parallel_pool().map(_block_eig, tasks)
+    else:
+        results = [_block_eig(task) for task in tasks]
+
+    evals = np.hstack([res[0] for res in results])
+    perm = np.argsort(evals, kind='mergesort')
+    if sort == 'high':
+        perm = perm[::-1]
+    if eigvals > 0:
+        perm = perm[:eigvals]
+    evals = evals[perm]
+    if op.isherm:
+        evals = np.real(evals)
+    if not vecs:
+        return evals
+
+    # eigenvectors of the blocks, embedded in the full space
+    rows = np.hstack([np.repeat(idx, len(idx)) for idx in comps])
+    offsets = np.cumsum([0] + [len(idx) for idx in comps])
+    cols = np.hstack([(np.arange(len(idx) ** 2) % len(idx)) + offsets[k]
+                      for k, idx in enumerate(comps)])
+    data = np.hstack([res[1].ravel() for res in results])
+    evecs = sp.csr_matrix((data, (rows, cols)), shape=(N, N),
+                          dtype=complex)
+    evecs = np.array([evecs[:, k] for k in perm])
+    return evals, evecs
+
+
 def sp_eigs(op, vecs=True, sparse=False, sort='low',
-            eigvals=0, tol=0, maxiter=100000):
+            eigvals=0, tol=0, maxiter=100000, blocks=False):
     """Returns Eigenvalues and Eigenvectors for Qobj.
     Uses dense eigen-solver unless user sets sparse=True.
 
@@ -158,6 +217,10 @@ def sp_eigs(op, vecs=True, sparse=False, sort='low',
         Tolerance for sparse eigensolver.  Default = 0 (Machine precision)
     maxiter : int
         Max. number of iterations used by sparse sigensolver.
+    blocks : bool {False, True}
+        Split the operator into its independent blocks (the connected
+        components of its sparsity graph) and diagonalize each block with
+        the dense solver. Large blocks are diagonalized in parallel.
 
     Returns
     -------
@@ -176,6 +239,9 @@ def sp_eigs(op, vecs=True, sparse=False, sort='low',
     if eigvals > N:
         raise ValueError("Number of requested eigen vals/vecs must be <= N.")
 
+    if blocks:
+        return _sp_eigs_blocks(op, vecs=vecs, sort=sort, eigvals=eigvals)
+
     remove_one = False
     if eigvals == (N - 1) and sparse:
         # calculate all eigenvalues and remove one at output if using sparse
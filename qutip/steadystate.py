@@ -59,7 +59,7 @@ if settings.debug:
 def steadystate(A, c_op_list=[], method='direct', sparse=True, use_rcm=True,
                 sym=False, use_precond=True, M=None, drop_tol=1e-3,
                 fill_factor=12, diag_pivot_thresh=None, maxiter=1000, tol=1e-5,
-                use_umfpack=False):
+                use_umfpack=False, use_blocks=False):
 
     """Calculates the steady state for quantum evolution subject to the
     supplied Hamiltonian or Liouvillian operator and (if given a Hamiltonian) a
@@ -77,11 +77,16 @@ def steadystate(A, c_op_list=[], method='direct', sparse=True, use_rcm=True,
     c_op_list : list
         A list of collapse operators.
 
-    method : str {'direct', 'iterative', 'iterative-bicg', 'lu', 'svd', 'power'}
+    method : str {'direct', 'iterative', 'iterative-bicg', 'lu', 'svd', 'power',
+                  'real', 'iterative-real'}
         Method for solving the underlying linear equation. Direct solver
         'direct' (default), iterative GMRES method 'iterative',
         iterative method BICGSTAB 'iterative-bicg', LU decomposition 'lu',
-        SVD 'svd' (dense), or inverse-power method 'power'.
+        SVD 'svd' (dense), or inverse-power method 'power'. The methods
+        'real' (LU) and 'iterative-real' (GMRES) solve the real system for
+        the coefficients of the density matrix in a Hermitian basis, which
+        is assembled from the Hamiltonian and the collapse operators one
+        term at a time, without forming the complex Liouvillian.
 
     sparse : bool, default = True
         Solve for the steady state using sparse algorithms. If set to False,
@@ -91,6 +96,12 @@ def steadystate(A, c_op_list=[], method='direct', sparse=True, use_rcm=True,
     use_rcm : bool, default = True
         Use reverse Cuthill-Mckee reordering to minimize fill-in in the
         LU factorization of the Liouvillian.
+
+    use_blocks : bool, default = False
+        DIRECT AND LU ONLY. Split the Liouvillian into its independent
+        blocks, and only solve the block that contains the populations.
+        Useful for models with a conserved quantity such as the excitation
+        number, where the coherences between different sectors decouple.
     
     maxiter : int, optional
         Maximum number of iterations to perform if using an iterative method
@@ -137,6 +148,10 @@ def steadystate(A, c_op_list=[], method='direct', sparse=True, use_rcm=True,
     -----
     The SVD method works only for dense operators (i.e. small systems).
 
+    For parameter sweeps over Liouvillians with the same sparsity pattern,
+    :class:`SteadyStateSolver` reuses the orderings of the 'direct', 'lu',
+    'power' and 'real' methods between calls.
+
     """
     n_op = len(c_op_list)
 
@@ -145,15 +160,21 @@ def steadystate(A, c_op_list=[], method='direct', sparse=True, use_rcm=True,
             raise TypeError('Cannot calculate the steady state for a ' +
                             'non-dissipative system ' +
                             '(no collapse operators given)')
-        else:
+        elif method not in ['real', 'iterative-real']:
+            # the real methods assemble their system from A and c_op_list
             A = liouvillian_fast(A, c_op_list)
-    if not issuper(A):
+    elif not issuper(A):
         raise TypeError('Solving for steady states requires ' +
                         'Liouvillian (super) operators')
 
     if use_umfpack:
         warnings.warn("The use of use_umfpack is deprecated.")
 
+    if use_blocks and sparse and method in ['direct', 'lu']:
+        rhoss = _steadystate_blocks(A, use_rcm=use_rcm)
+        if rhoss is not None:
+            return rhoss
+
     if method == 'direct':
         if sparse:
             return _steadystate_direct_sparse(A, use_rcm=use_rcm, 
@@ -179,6 +200,16 @@ def steadystate(A, c_op_list=[], method='direct', sparse=True, use_rcm=True,
     elif method == 'lu':
         return _steadystate_lu(A, use_umfpack=use_umfpack)
 
+    elif method == 'real':
+        return _steadystate_real(A, c_op_list, use_rcm=use_rcm)
+
+    elif method == 'iterative-real':
+        return _steadystate_real(A, c_op_list, use_rcm=use_rcm,
+                                 iterative=True, tol=tol,
+                                 use_precond=use_precond, maxiter=maxiter,
+                                 drop_tol=drop_tol, fill_factor=fill_factor,
+                                 diag_pivot_thresh=diag_pivot_thresh)
+
     elif method == 'svd':
         return _steadystate_svd_dense(A, atol=1e-12, rtol=0,
                                       all_steadystates=False)
@@ -201,7 +232,198 @@ def steady(L, maxiter=10, tol=1e-6, itertol=1e-5, method='solve',
                        use_umfpack=use_umfpack, use_precond=use_precond)
 
 
-def _steadystate_direct_sparse(L, use_rcm=True, use_umfpack=False):
+class SteadyStateSolver():
+    """
+    Sparse LU solver for the steady state problem that caches the work
+    which only depends on the sparsity pattern of the Liouvillian.
+
+    The reverse Cuthill-McKee ordering, the fill-reducing column ordering
+    and the structure of the permuted matrix are computed the first time a
+    pattern is seen, and reused for the numerical factorization of any
+    Liouvillian with the same pattern, which is the typical situation in a
+    parameter sweep. A Liouvillian identical to the last one is not
+    factorized again at all.
+
+    Parameters
+    ----------
+    method : str {'direct', 'lu', 'power', 'real'}
+        Method used by :meth:`steadystate`.
+
+    use_rcm : bool, default = True
+        Use reverse Cuthill-Mckee reordering to minimize fill-in in the
+        LU factorization of the Liouvillian.
+
+    maxiter : int, default = 10
+        Maximum number of iterations for the 'power' method.
+
+    tol : float, default = 1e-5
+        Tolerance of the 'power' method.
+
+    Examples
+    --------
+    >>> solver = SteadyStateSolver()
+    >>> rho_list = [solver.steadystate(H, [sqrt(g) * a]) for g in gammas]
+
+    """
+    def __init__(self, method='direct', use_rcm=True, maxiter=10, tol=1e-5):
+        if method not in ['direct', 'lu', 'power', 'real']:
+            raise ValueError('Invalid method argument for ' +
+                             'SteadyStateSolver.')
+        self.method = method
+        self.use_rcm = use_rcm
+        self.maxiter = maxiter
+        self.tol = tol
+        # sparsity pattern the cached orderings belong to
+        self._indptr = None
+        self._indices = None
+        # row and column orderings, and the structure of the permuted matrix
+        self._rperm = None
+        self._cperm = None
+        self._data_map = None
+        self._perm_indices = None
+        self._perm_indptr = None
+        # last factorized matrix data, its factorization and orderings
+        self._data = None
+        self._lu = None
+        self._lu_rperm = None
+        self._lu_cperm = None
+        # number of numerical factorizations
+        self.nfact = 0
+
+    def _same_pattern(self, A):
+        return (self._indptr is not None and
+                self._data.dtype == A.dtype and
+                self._indptr.shape == A.indptr.shape and
+                self._indices.shape == A.indices.shape and
+                np.array_equal(self._indptr, A.indptr) and
+                np.array_equal(self._indices, A.indices))
+
+    def _analyze(self, A):
+        """
+        Computes the orderings for the pattern of A, and factorizes A.
+        """
+        n = A.shape[0]
+        if self.use_rcm:
+            perm = symrcm(A)
+        else:
+            perm = np.arange(n)
+        B = sparse_permute(A, perm, perm)
+        B.sort_indices()
+        lu = splu(B, permc_spec='COLAMD')
+        self.nfact += 1
+        # SuperLU factorizes B[:, argsort(perm_c)], so that column order
+        # can be given up front for the following factorizations
+        self._rperm = perm
+        self._cperm = perm[np.argsort(lu.perm_c)]
+        # index map from the data of A to the data of the permuted matrix
+        T = sp.csc_matrix((np.arange(1, A.nnz + 1, dtype=float),
+                           A.indices, A.indptr), shape=A.shape)
+        T = sparse_permute(T, self._rperm, self._cperm)
+        T.sort_indices()
+        self._data_map = T.data.astype(int) - 1
+        self._perm_indices = T.indices
+        self._perm_indptr = T.indptr
+        self._indptr = A.indptr.copy()
+        self._indices = A.indices.copy()
+        self._lu = lu
+        self._lu_rperm = perm
+        self._lu_cperm = perm
+
+    def factorize(self, A):
+        """
+        LU factorization of the sparse matrix A, reusing the orderings of
+        earlier calls if A has the same sparsity pattern.
+
+        Parameters
+        ----------
+        A : csc_matrix
+            Matrix to factorize. Real matrices are factorized in real
+            arithmetic, anything else as complex.
+
+        Returns
+        -------
+        solver : SteadyStateSolver
+            The solver itself, to be used with :meth:`solve`.
+
+        """
+        A = sp.csc_matrix(A)
+        if A.dtype != np.float64:
+            A = A.astype(complex)
+        A.sum_duplicates()
+        A.sort_indices()
+        if not self._same_pattern(A):
+            if settings.debug:
+                print('New sparsity pattern, computing orderings...')
+            self._analyze(A)
+        elif not np.array_equal(A.data, self._data):
+            B = sp.csc_matrix((A.data[self._data_map], self._perm_indices,
+                               self._perm_indptr), shape=A.shape)
+            self._lu = splu(B, permc_spec='NATURAL')
+            self.nfact += 1
+            self._lu_rperm = self._rperm
+            self._lu_cperm = self._cperm
+        self._data = A.data.copy()
+        return self
+
+    def solve(self, b):
+        """
+        Solves the last factorized system for the right-hand side(s) b.
+
+        Parameters
+        ----------
+        b : array
+            Right-hand side vector, or array with one right-hand side per
+            column.
+
+        Returns
+        -------
+        x : array
+            Solution with the same shape as b. Like spsolve, a single
+            column right-hand side gives a one-dimensional solution.
+
+        """
+        if self._lu is None:
+            raise Exception('SteadyStateSolver: no matrix factorized.')
+        b = np.asarray(b)
+        if self._data.dtype == np.float64 and np.iscomplexobj(b):
+            return self.solve(b.real) + 1j * self.solve(b.imag)
+        b = b.astype(self._data.dtype)
+        if b.ndim == 2 and b.shape[1] == 1:
+            b = b[:, 0]
+        y = self._lu.solve(np.ascontiguousarray(b[self._lu_rperm]))
+        x = np.empty_like(y)
+        x[self._lu_cperm] = y
+        return x
+
+    def steadystate(self, A, c_op_list=[]):
+        """
+        Steady state for the Hamiltonian or Liouvillian A, see
+        :func:`steadystate`.
+        """
+        if isoper(A):
+            if len(c_op_list) == 0:
+                raise TypeError('Cannot calculate the steady state for a ' +
+                                'non-dissipative system ' +
+                                '(no collapse operators given)')
+            elif self.method != 'real':
+                A = liouvillian_fast(A, c_op_list)
+        elif not issuper(A):
+            raise TypeError('Solving for steady states requires ' +
+                            'Liouvillian (super) operators')
+
+        if self.method == 'direct':
+            return _steadystate_direct_sparse(A, solver=self)
+        elif self.method == 'lu':
+            return _steadystate_lu(A, solver=self)
+        elif self.method == 'real':
+            return _steadystate_real(A, c_op_list, solver=self)
+        else:
+            return _steadystate_power(A, maxiter=self.maxiter, tol=self.tol,
+                                      itertol=self.tol, solver=self)
+
+
+def _steadystate_direct_sparse(L, use_rcm=True, use_umfpack=False,
+                               solver=None):
     """
     Direct solver that uses scipy sparse matrices
     """
@@ -210,22 +432,54 @@ def _steadystate_direct_sparse(L, use_rcm=True, use_umfpack=False):
     dims=L.dims[0]
     weight=np.abs(L.data.max())
     n = prod(L.dims[0][0])
-    b = np.zeros((n ** 2, 1), dtype=complex)
-    b[0,0] = weight
-    L = L.data + sp.csr_matrix((weight*np.ones(n), (np.zeros(n), [nn * (n + 1) for nn in range(n)])),
-                               shape=(n ** 2, n ** 2))
-    L.sort_indices()
-    use_solver(assumeSortedIndices=True, useUmfpack=use_umfpack)
-    if use_rcm:
-        perm = symrcm(L)
-        L = sparse_permute(L,perm,perm)
-        b = b[np.ix_(perm,)]
-    
-    v = spsolve(L, b)
-    if use_rcm:
-        rev_perm = np.argsort(perm)
-        v = v[np.ix_(rev_perm,)]
-    
+    b = np.zeros(n ** 2, dtype=complex)
+    b[0] = weight
+    L = L.data.tocsc() + sp.csc_matrix((weight*np.ones(n),
+                    (np.zeros(n), [nn * (n + 1) for nn in range(n)])),
+        shape=(n ** 2, n ** 2))
+    if solver is None:
+        solver = SteadyStateSolver(use_rcm=use_rcm)
+    solver.factorize(L)
+    v = solver.solve(b)
+
+    data = vec2mat(v)
+    data = 0.5 * (data + data.conj().T)
+    return Qobj(data, dims=dims, isherm=True)
+
+
+def _steadystate_blocks(L, use_rcm=True, solver=None):
+    """
+    Direct solver for the block of the Liouvillian that contains the
+    populations. The other blocks only couple coherences, which vanish in
+    the steady state. Returns None if the populations are spread over
+    several blocks (the steady state is then not unique).
+    """
+    from qutip.graph import graph_components
+
+    dims = L.dims[0]
+    n = prod(L.dims[0][0])
+    diag = np.arange(n) * (n + 1)
+    comps = graph_components(L.data)
+    idx = comps[0]
+    if len(comps) == 1 or len(np.intersect1d(idx, diag)) < n:
+        return None
+    if settings.debug:
+        print('Solving block of size %d out of %d blocks' %
+              (len(idx), len(comps)))
+
+    A = L.data.tocsr()[idx, :][:, idx].tocsc()
+    weight = np.abs(A.data.max())
+    b = np.zeros(len(idx), dtype=complex)
+    b[0] = weight
+    A = A + sp.csc_matrix((weight * np.ones(n),
+                          (np.zeros(n), np.searchsorted(idx, diag))),
+                          shape=A.shape)
+    if solver is None:
+        solver = SteadyStateSolver(use_rcm=use_rcm)
+    solver.factorize(A)
+    v = np.zeros(n ** 2, dtype=complex)
+    v[idx] = solver.solve(b)
+
     data = vec2mat(v)
     data = 0.5 * (data + data.conj().T)
     return Qobj(data, dims=dims, isherm=True)
@@ -379,7 +633,7 @@ def _steadystate_iterative_bicg(L, tol=1e-5, use_precond=True, use_rcm=True,
     return Qobj(data, dims=dims, isherm=True)
 
 
-def _steadystate_lu(L, use_rcm=True, use_umfpack=False):
+def _steadystate_lu(L, use_rcm=True, use_umfpack=False, solver=None):
     """
     Find the steady state(s) of an open quantum system by computing the
     LU decomposition of the underlying matrix.
@@ -394,25 +648,141 @@ def _steadystate_lu(L, use_rcm=True, use_umfpack=False):
     L = L.data.tocsc() + sp.csc_matrix((weight*np.ones(n),
                     (np.zeros(n), [nn * (n + 1) for nn in range(n)])),
         shape=(n ** 2, n ** 2))
-    
-    L.sort_indices()
-    use_solver(assumeSortedIndices=True, useUmfpack=use_umfpack)
-    if use_rcm:
-        perm = symrcm(L)
-        L = sparse_permute(L,perm,perm)
-        b = b[np.ix_(perm,)]
-    
-    solve = factorized(L)
-    v = solve(b)
-    if use_rcm:
-        rev_perm = np.argsort(perm)
-        v = v[np.ix_(rev_perm,)]
+    if solver is None:
+        solver = SteadyStateSolver(use_rcm=use_rcm)
+    solver.factorize(L)
+    v = solver.solve(b)
     data = vec2mat(v)
     data = 0.5 * (data + data.conj().T)
 
     return Qobj(data, dims=dims, isherm=True)
 
 
+def _herm_basis(n):
+    """
+    Orthonormal basis of the n x n Hermitian matrices, as the columns of a
+    sparse unitary matrix acting on column-stacked density matrices. The
+    first n columns are the diagonal projectors, in order.
+    """
+    rows = list(range(0, n ** 2, n + 1))
+    cols = list(range(n))
+    vals = [1.0] * n
+    col = n
+    s = 1 / np.sqrt(2)
+    for j in range(n):
+        for k in range(j + 1, n):
+            # (E_jk + E_kj) / sqrt(2) and i (E_jk - E_kj) / sqrt(2)
+            rows += [j + k * n, k + j * n, j + k * n, k + j * n]
+            cols += [col, col, col + 1, col + 1]
+            vals += [s, s, 1j * s, -1j * s]
+            col += 2
+    return sp.csc_matrix((vals, (rows, cols)), shape=(n ** 2, n ** 2),
+                         dtype=complex)
+
+
+def _herm_basis_real(T, S):
+    """
+    Real part of T^dag S T for the Hermitian basis T from _herm_basis,
+    calculated with real sparse products only.
+    """
+    S = sp.csc_matrix(S)
+    Tr = sp.csc_matrix(T.real)
+    Ti = sp.csc_matrix(T.imag)
+    Sr = sp.csc_matrix(S.real)
+    Si = sp.csc_matrix(S.imag)
+    R = Tr.T * (Sr * Tr - Si * Ti)
+    R = R + Ti.T * (Si * Tr + Sr * Ti)
+    return R.tocsc()
+
+
+def _steadystate_real(A, c_op_list=[], use_rcm=True, solver=None,
+                      iterative=False, tol=1e-5, use_precond=True,
+                      maxiter=1000, drop_tol=1e-3, fill_factor=12,
+                      diag_pivot_thresh=None):
+    """
+    Steady state solver working on the real coefficients of the density
+    matrix in a Hermitian operator basis. The unit trace is used to
+    eliminate one coefficient, leaving a real system of n**2 - 1 equations
+    that is solved with a real sparse LU, or with GMRES if `iterative`.
+
+    For a Hamiltonian A, the real system is accumulated from the
+    superoperator terms of A and the collapse operators c_op_list one at a
+    time, so the complex Liouvillian is never formed. A Liouvillian A is
+    transformed as a whole.
+    """
+    if settings.debug:
+        print('Starting real Hermitian-basis solver...')
+    dims = A.dims[0] if issuper(A) else A.dims
+    n = prod(dims[0])
+    T = _herm_basis(n)
+
+    # a Hermiticity preserving L has real matrix elements in this basis,
+    # and so has the sum of the real parts of its terms
+    if issuper(A):
+        R = _herm_basis_real(T, A.data)
+    else:
+        spI = sp.identity(n, format='csr')
+        H = A.data
+        R = _herm_basis_real(T, -1j * sp.kron(spI, H, format='csr'))
+        R = R + _herm_basis_real(T, 1j * sp.kron(H.T, spI, format='csr'))
+        for c_op in c_op_list:
+            if c_op.issuper:
+                R = R + _herm_basis_real(T, c_op.data)
+                continue
+            c = c_op.data
+            cdc = c.T.conj() * c
+            R = R + _herm_basis_real(T, sp.kron(c.conj(), c, format='csr'))
+            R = R - 0.5 * _herm_basis_real(T, sp.kron(spI, cdc,
+                                                      format='csr'))
+            R = R - 0.5 * _herm_basis_real(T, sp.kron(cdc.T, spI,
+                                                      format='csr'))
+    R = R.tocsc()
+    R.eliminate_zeros()
+    # coefficient 0 (of the first projector) is one minus the sum of the
+    # other diagonal coefficients; its equation is the sum of the others
+    t = np.zeros(n ** 2 - 1)
+    t[:n - 1] = 1.0
+    r0 = R[1:, 0]
+    A = (R[1:, 1:] - r0 * sp.csr_matrix(t)).tocsc()
+    b = -r0.toarray().ravel()
+
+    if iterative:
+        if use_rcm:
+            perm = symrcm(A)
+            A = sparse_permute(A, perm, perm)
+            b = b[perm]
+        A.sort_indices()
+        M = None
+        if use_precond:
+            try:
+                P = spilu(A, drop_tol=drop_tol,
+                          diag_pivot_thresh=diag_pivot_thresh,
+                          fill_factor=fill_factor,
+                          options=dict(ILU_MILU='SMILU_3'))
+                M = LinearOperator(A.shape, matvec=P.solve)
+            except:
+                warnings.warn("Preconditioning failed. Continuing without.",
+                              UserWarning)
+        y, check = gmres(A, b, tol=tol, M=M, maxiter=maxiter)
+        if check > 0:
+            raise Exception("Steadystate solver did not reach tolerance " +
+                            "after " + str(check) + " steps.")
+        elif check < 0:
+            raise Exception("Steadystate solver failed with fatal error: " +
+                            str(check) + ".")
+        if use_rcm:
+            y = y[np.argsort(perm)]
+    else:
+        if solver is None:
+            solver = SteadyStateSolver(use_rcm=use_rcm)
+        solver.factorize(A)
+        y = solver.solve(b)
+
+    x = np.hstack([1 - np.sum(y[:n - 1]), y])
+    data = vec2mat(T * x)
+    return Qobj(data, dims=dims, isherm=True)
+
+
 def _steadystate_svd_dense(L, atol=1e-12, rtol=0, all_steadystates=False):
     """
     Find the steady state(s) of an open quantum system by solving for the
@@ -438,14 +808,13 @@ def _steadystate_svd_dense(L, atol=1e-12, rtol=0, all_steadystates=False):
         return rhoss / rhoss.tr()
 
 
-def _steadystate_power(L, maxiter=10, tol=1e-6, itertol=1e-5):
+def _steadystate_power(L, maxiter=10, tol=1e-6, itertol=1e-5, solver=None):
     """
     Inverse power method for steady state solving.
     """
     if settings.debug:
         print('Starting iterative power method Solver...')
 
-    use_solver(assumeSortedIndices=True)
     rhoss = Qobj()
     sflag = issuper(L)
     if sflag:
@@ -454,12 +823,16 @@ def _steadystate_power(L, maxiter=10, tol=1e-6, itertol=1e-5):
         rhoss.dims = [L.dims[0], 1]
     n = prod(rhoss.shape)
     L = L.data.tocsc() - (tol ** 2) * sp.eye(n, n, format='csc')
-    L.sort_indices()
+    if solver is None:
+        solver = SteadyStateSolver(use_rcm=False)
+    # the shifted Liouvillian is the same in every iteration, so it is
+    # factorized once and only the right-hand side changes
+    solver.factorize(L)
     v = mat2vec(rand_dm(rhoss.shape[0], 0.5 / rhoss.shape[0] + 0.5).full())
 
     it = 0
     while (la.norm(L * v, np.inf) > tol) and (it < maxiter):
-        v = spsolve(L, v)
+        v = solver.solve(v)
         v = v / la.norm(v, np.inf)
         it += 1
     if it >= maxiter:
@@ -480,6 +853,147 @@ def _steadystate_power(L, maxiter=10, tol=1e-6, itertol=1e-5):
     return rhoss.tidyup() if settings.auto_tidyup else rhoss
 
 
+def steadystate_sweep(A_list, c_op_list=[], method='iterative',
+                      use_rcm=True, use_precond=True, tol=1e-5, maxiter=1000,
+                      drop_tol=1e-3, fill_factor=12, diag_pivot_thresh=None,
+                      precond_growth=2.0):
+    """Calculates the steady states for a sequence of Hamiltonians or
+    Liouvillians, such as the points of a parameter sweep, with an
+    iterative solver.
+
+    Each solve is started from the steady state of the previous point, and
+    the incomplete LU preconditioner of an earlier point is reused as long
+    as it keeps the number of iterations low. It is rebuilt when the
+    iteration count grows past `precond_growth` times the count right after
+    the last rebuild, or when the solver does not converge with it.
+
+    Parameters
+    ----------
+    A_list : list of qobj
+        Hamiltonians or Liouvillians, ordered so that neighbouring elements
+        are close to each other.
+
+    c_op_list : list
+        A list of collapse operators, used for the Hamiltonians in A_list.
+
+    method : str {'iterative', 'iterative-bicg'}
+        Iterative GMRES method 'iterative' (default) or BICGSTAB
+        'iterative-bicg'.
+
+    use_rcm : bool, default = True
+        Use reverse Cuthill-Mckee reordering of the Liouvillian. The
+        ordering is recomputed together with the preconditioner.
+
+    use_precond : bool, default = True
+        Use an incomplete sparse LU decomposition as a preconditioner.
+
+    tol : float, default = 1e-5
+        Tolerance used for terminating the iterative solver.
+
+    maxiter : int, default = 1000
+        Maximum number of iterations per point.
+
+    drop_tol, fill_factor, diag_pivot_thresh :
+        Parameters of the iLU preconditioner, see :func:`steadystate`.
+
+    precond_growth : float, default = 2.0
+        Relative growth of the iteration count at which the preconditioner
+        is rebuilt.
+
+    Returns
+    -------
+    rhoss_list, iterations : list of qobj, list of int
+        Steady state density matrices, and the number of iterations spent
+        on each point (including those of a rebuilt preconditioner retry).
+
+    """
+    if method == 'iterative':
+        solve = gmres
+        weight = 1e-1
+    elif method == 'iterative-bicg':
+        solve = bicgstab
+        weight = 1.0
+    else:
+        raise ValueError('Invalid method argument for steadystate_sweep.')
+
+    rhoss_list = []
+    iterations = []
+    perm = None
+    M = None
+    v = None
+    base_count = None
+    for A in A_list:
+        if isoper(A):
+            if len(c_op_list) == 0:
+                raise TypeError('Cannot calculate the steady state for a ' +
+                                'non-dissipative system ' +
+                                '(no collapse operators given)')
+            A = liouvillian_fast(A, c_op_list)
+        if not issuper(A):
+            raise TypeError('Solving for steady states requires ' +
+                            'Liouvillian (super) operators')
+
+        dims = A.dims[0]
+        n = prod(A.dims[0][0])
+        b = np.zeros(n ** 2)
+        b[0] = weight
+        L = A.data.tocsc() + sp.csc_matrix((weight * np.ones(n),
+                        (np.zeros(n), [nn * (n + 1) for nn in range(n)])),
+            shape=(n ** 2, n ** 2))
+        L.sort_indices()
+
+        rebuild = perm is None or (use_precond and M is None)
+        count = 0
+        while True:
+            if rebuild:
+                perm = symrcm(L) if use_rcm else np.arange(n ** 2)
+            Lp = sparse_permute(L, perm, perm)
+            if rebuild and use_precond:
+                M = _iterative_precondition(Lp, n, drop_tol,
+                                            diag_pivot_thresh, fill_factor)
+            bp = b[perm]
+            x0 = None if v is None else v[perm]
+
+            it = [0]
+
+            def _count(r):
+                it[0] += 1
+
+            x, check = solve(Lp, bp, x0=x0, tol=tol, M=M, maxiter=maxiter,
+                             callback=_count)
+            count += it[0]
+            if check < 0:
+                raise Exception("Steadystate solver failed with fatal " +
+                                "error: " + str(check) + ".")
+            if rebuild:
+                base_count = it[0]
+                if check > 0:
+                    raise Exception("Steadystate solver did not reach " +
+                                    "tolerance after " + str(check) +
+                                    " steps.")
+                break
+            if check > 0:
+                # the old preconditioner is no longer good enough
+                rebuild = True
+                continue
+            if use_precond and it[0] > precond_growth * max(base_count, 1):
+                # converged, but rebuild for the next point
+                M = None
+            break
+
+        if settings.debug:
+            print('Iterations: ', count)
+        v = np.empty_like(x)
+        v[perm] = x
+        iterations.append(count)
+
+        data = vec2mat(v)
+        data = 0.5 * (data + data.conj().T)
+        rhoss_list.append(Qobj(data, dims=dims, isherm=True))
+
+    return rhoss_list, iterations
+
+
 def steadystate_nonlinear(L_func, rho0, args={}, maxiter=10,
                           random_initial_state=False, tol=1e-6, itertol=1e-5,
                           use_umfpack=True):
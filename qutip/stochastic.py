@@ -52,20 +52,25 @@ Todo:
 
 4) cythonize some rhs or d1,d2 functions - done
 
-5) parallelize
+5) parallelize - done
 
 """
 
+import copy
+import os
+import pickle
+import warnings
+from functools import partial
 import numpy as np
 import scipy.sparse as sp
 import scipy
+from scipy.sparse.linalg import splu
 from scipy.linalg.blas import get_blas_funcs
 try:
     norm = get_blas_funcs("znrm2", dtype=np.float64)
 except:
     from scipy.linalg import norm
 
-from numpy.random import RandomState
 
 from qutip.qobj import Qobj, isket
 from qutip.states import ket2dm
@@ -76,10 +81,17 @@ from qutip.superoperator import (spre, spost, mat2vec, vec2mat,
                                  liouvillian_fast, lindblad_dissipator)
 from qutip.cy.spmatfuncs import cy_expect_psi_csr, spmv, cy_expect_rho_vec
 from qutip.cy.stochastic import (cy_d1_rho_photocurrent,
-                                 cy_d2_rho_photocurrent)
+                                 cy_d2_rho_photocurrent,
+                                 cy_rhs_rho_euler_homodyne,
+                                 cy_rhs_rho_euler_heterodyne,
+                                 cy_rhs_rho_euler_photocurrent)
 from qutip.gui.progressbar import TextProgressBar
 from qutip.odeoptions import Odeoptions
+from qutip.random_objects import _trajectory_seeds, _trajectory_prng
+from qutip.fileio import _checkpoint_load, _checkpoint_save, _checkpoint_hash
+from qutip.parfor import pool_initialize, pool_shutdown
 from qutip.settings import debug
+import qutip.settings
 
 
 if debug:
@@ -89,15 +101,52 @@ if debug:
 class _StochasticSolverData:
     """
     Internal class for passing data between stochastic solver functions.
+
+    The records kept for each trajectory, besides the averaged expectation
+    values, are controlled by the keyword arguments:
+
+    store_noise : bool / str {True, False, 'tlist'}
+        Store the noise increments of every substep, no noise at all, or
+        their sums over each interval of tlist ('tlist' is not supported by
+        the 'taylor1.5' solver).
+
+    store_measurement : bool {False, True}
+        Store the measurement records.
+
+    noise_file, measurement_file : str {None}
+        Write the noise or measurement records to a memory-mapped .npy file
+        of this name, with one row per trajectory, instead of keeping them
+        in memory.
+
+    The step size is controlled by:
+
+    theta : float {0.5}
+        Weight of the end of the step in the drift of the 'milstein-imp'
+        solver: 1 for the fully implicit scheme, 0.5 for the semi-implicit
+        (trapezoidal) one.
+
+    adaptive : bool {False}
+        Choose the substeps of smesolve adaptively, starting from
+        ``nsubsteps`` per interval of tlist, by comparing one step with two
+        half steps. For the 'euler-maruyama' and 'milstein' solvers.
+
+    tol : float {1e-4}
+        Largest difference between the density matrix elements after one
+        step and after two half steps that is accepted with ``adaptive``.
     """
     def __init__(self, H=None, state0=None, tlist=None, c_ops=[], sc_ops=[],
                  e_ops=[], m_ops=None, args=None, ntraj=1, nsubsteps=1,
                  d1=None, d2=None, d2_len=1, dW_factors=None, rhs=None,
                  gen_A_ops=None, gen_noise=None, homogeneous=True, solver=None,
                  method=None, distribution='normal', store_measurement=False,
-                 noise=None, normalize=True,
+                 store_noise=True, noise_file=None, measurement_file=None,
+                 theta=0.5, adaptive=False, tol=1e-4, noise=None,
+                 normalize=True,
                  options=Odeoptions(), progress_bar=TextProgressBar()):
 
+        if store_noise not in [True, False, 'tlist']:
+            raise Exception("Unrecognized store_noise '%s'." % store_noise)
+
         self.H = H
         self.d1 = d1
         self.d2 = d2
@@ -125,6 +174,12 @@ class _StochasticSolverData:
         self.progress_bar = progress_bar
         self.store_measurement = store_measurement
         self.store_states = options.store_states
+        self.store_noise = store_noise
+        self.noise_file = noise_file
+        self.measurement_file = measurement_file
+        self.theta = theta
+        self.adaptive = adaptive
+        self.tol = tol
         self.noise = noise
         self.args = args
         self.normalize = normalize
@@ -353,6 +408,12 @@ def smesolve(H, rho0, tlist, c_ops, sc_ops, e_ops, **kwargs):
     if ssdata.rhs is None:
         if ssdata.solver == 'euler-maruyama' or ssdata.solver == None:
             ssdata.rhs = _rhs_rho_euler_maruyama
+            # compiled steps for the built-in d1 and d2 functions
+            fused = _rhs_rho_euler_fused.get((ssdata.d1, ssdata.d2))
+            if fused and ssdata.gen_A_ops is _generate_rho_A_ops:
+                ssdata.rhs = fused
+                ssdata.gen_A_ops = partial(_generate_rho_A_ops_fused,
+                                           method=ssdata.method)
 
         elif ssdata.solver == 'milstein':
             if ssdata.method == 'homodyne' or ssdata.method is None:
@@ -363,10 +424,31 @@ def smesolve(H, rho0, tlist, c_ops, sc_ops, e_ops, **kwargs):
 
             elif ssdata.method == 'heterodyne':
                 ssdata.rhs = _rhs_rho_milstein_homodyne
-                ssdata.d2_len = 1
-                ssdata.sc_ops = []
-                for sc in iter(sc_ops):
-                    ssdata.sc_ops += [sc / sqrt(2), -1.0j * sc / sqrt(2)]
+                _split_heterodyne_ops(ssdata, sc_ops, kwargs)
+
+        elif ssdata.solver == 'milstein-imp':
+            if ssdata.method == 'heterodyne':
+                _split_heterodyne_ops(ssdata, sc_ops, kwargs)
+            elif not (ssdata.method == 'homodyne' or ssdata.method is None):
+                raise Exception("The milstein-imp solver supports homodyne "
+                                "and heterodyne detection only.")
+            ssdata.rhs = _rhs_rho_milstein_implicit
+            ssdata.gen_A_ops = partial(_generate_A_ops_implicit,
+                                       theta=ssdata.theta)
+
+        elif ssdata.solver == 'taylor1.5':
+            if (not (ssdata.method == 'homodyne' or ssdata.method is None)
+                    or len(sc_ops) != 1):
+                raise Exception("The taylor1.5 solver supports homodyne "
+                                "detection with one stochastic operator only.")
+            if ssdata.store_noise == 'tlist':
+                # the noise includes the multiple integrals dZ, which do
+                # not add up over the substeps
+                raise Exception("The taylor1.5 solver does not support " +
+                                "store_noise='tlist'.")
+            ssdata.rhs = _rhs_rho_taylor_15_homodyne_single
+            ssdata.gen_A_ops = _generate_A_ops_taylor_15
+            ssdata.gen_noise = _generate_noise_taylor_15
 
         elif ssdata.solver == 'euler-maruyama_fast' and ssdata.method == 'homodyne':
             ssdata.rhs = _rhs_rho_euler_homodyne_fast
@@ -384,10 +466,7 @@ def smesolve(H, rho0, tlist, c_ops, sc_ops, e_ops, **kwargs):
                     ssdata.rhs = _rhs_rho_milstein_homodyne_fast
 
             elif ssdata.method == 'heterodyne':
-                ssdata.d2_len = 1
-                ssdata.sc_ops = []
-                for sc in iter(sc_ops):
-                    ssdata.sc_ops += [sc / sqrt(2), -1.0j * sc / sqrt(2)]
+                _split_heterodyne_ops(ssdata, sc_ops, kwargs)
                 if len(sc_ops) == 1:
                     ssdata.rhs = _rhs_rho_milstein_homodyne_two_fast
                 else:
@@ -396,6 +475,19 @@ def smesolve(H, rho0, tlist, c_ops, sc_ops, e_ops, **kwargs):
         else:
             raise Exception("Unrecognized solver '%s'." % ssdata.solver)
 
+    if ssdata.adaptive and (
+            ssdata.rhs not in (_rhs_rho_euler_maruyama,
+                               cy_rhs_rho_euler_homodyne,
+                               cy_rhs_rho_euler_heterodyne,
+                               _rhs_rho_milstein_homodyne_single,
+                               _rhs_rho_milstein_homodyne)
+            or not _default_rho_A_ops(ssdata.gen_A_ops)
+            or not ssdata.homogeneous or ssdata.distribution != 'normal'
+            or ssdata.noise):
+        raise Exception("Adaptive steps are only supported by the "
+                        "euler-maruyama and milstein solvers for homodyne "
+                        "and heterodyne detection, without given noise.")
+
     res = smesolve_generic(ssdata, ssdata.options, ssdata.progress_bar)
 
     if e_ops_dict:
@@ -405,6 +497,23 @@ def smesolve(H, rho0, tlist, c_ops, sc_ops, e_ops, **kwargs):
     return res
 
 
+def _split_heterodyne_ops(ssdata, sc_ops, kwargs):
+    """
+    Internal function. For the Milstein schemes, heterodyne detection of each
+    operator c is treated as homodyne detection of the two operators
+    c/sqrt(2) and -ic/sqrt(2), one for each quadrature, with one measurement
+    record each.
+    """
+    ssdata.d2_len = 1
+    ssdata.sc_ops = []
+    for sc in iter(sc_ops):
+        ssdata.sc_ops += [sc / np.sqrt(2), -1.0j * sc / np.sqrt(2)]
+    if not "m_ops" in kwargs:
+        ssdata.m_ops = [[m] for m_op in ssdata.m_ops for m in m_op]
+    if not "dW_factors" in kwargs:
+        ssdata.dW_factors = np.array([np.sqrt(2)])
+
+
 def sepdpsolve(H, psi0, tlist, c_ops=[], e_ops=[], ntraj=1, nsubsteps=10,
                options=Odeoptions(), progress_bar=TextProgressBar()):
     """
@@ -502,32 +611,14 @@ def ssesolve_generic(ssdata, options, progress_bar):
     # when evaluating the RHS of stochastic Schrodinger equations
     A_ops = ssdata.gen_A_ops(ssdata.sc_ops, ssdata.H)
 
-    progress_bar.start(ssdata.ntraj)
-
-    for n in range(ssdata.ntraj):
-        progress_bar.update(n)
+    _stochastic_trajectories(ssdata, options, data, progress_bar,
+                             ['states', 'noise', 'measurement'],
+                             _ssesolve_trajectories, A_ops, dt, N_store,
+                             N_substeps)
 
-        psi_t = ssdata.state0.full().ravel()
-
-        noise = ssdata.noise[n] if ssdata.noise else None
-
-        states_list, dW, m = _ssesolve_single_trajectory(data,
-             ssdata.H, dt, ssdata.tlist, N_store, N_substeps, psi_t, A_ops,
-             ssdata.e_ops, ssdata.m_ops, ssdata.rhs_func, ssdata.d1, ssdata.d2,
-             ssdata.d2_len, ssdata.dW_factors, ssdata.homogeneous, ssdata.distribution, ssdata.args,
-             store_measurement=ssdata.store_measurement, noise=noise,
-             normalize=ssdata.normalize)
-
-        data.states.append(states_list)
-        data.noise.append(dW)
-        data.measurement.append(m)
-
-    progress_bar.finished()
-
-    # average density matrices
-    if options.average_states and np.any(data.states):
-        data.states = [sum([ket2dm(data.states[m][n]) for m in range(NT)]).unit()
-                       for n in range(len(data.times))]
+    # average density matrices, summed by _stochastic_trajectories
+    if options.average_states and data.states:
+        data.states = [rho.unit() for rho in data.states]
 
     # average
     data.expect = data.expect / NT
@@ -545,11 +636,32 @@ def ssesolve_generic(ssdata, options, progress_bar):
     return data
 
 
+def _ssesolve_trajectories(chunk, data, seeds, ssdata, A_ops, dt, N_store,
+                           N_substeps):
+    """
+    Internal function. Runs the trajectories chunk[0] <= n < chunk[1] of
+    ssesolve_generic.
+    """
+    results = []
+    for n in range(chunk[0], chunk[1]):
+        psi_t = ssdata.state0.full().ravel()
+        noise = ssdata.noise[n] if ssdata.noise else None
+        prng = _trajectory_prng(seeds, n)
+
+        results.append(_ssesolve_single_trajectory(data,
+             ssdata.H, dt, ssdata.tlist, N_store, N_substeps, psi_t, A_ops,
+             ssdata.e_ops, ssdata.m_ops, ssdata.rhs_func, ssdata.d1, ssdata.d2,
+             ssdata.d2_len, ssdata.dW_factors, ssdata.homogeneous, ssdata.distribution, ssdata.args,
+             store_measurement=ssdata.store_measurement, noise=noise,
+             normalize=ssdata.normalize, prng=prng))
+    return results
+
+
 def _ssesolve_single_trajectory(data, H, dt, tlist, N_store, N_substeps, psi_t,
                                 A_ops, e_ops, m_ops, rhs, d1, d2, d2_len,
                                 dW_factors, homogeneous, distribution, args,
                                 store_measurement=False, noise=None,
-                                normalize=True):
+                                normalize=True, prng=np.random):
     """
     Internal function. See ssesolve.
     """
@@ -558,7 +670,7 @@ def _ssesolve_single_trajectory(data, H, dt, tlist, N_store, N_substeps, psi_t,
         if homogeneous:
             if distribution == 'normal':
                 dW = np.sqrt(dt) * \
-                    scipy.randn(len(A_ops), N_store, N_substeps, d2_len)
+                    prng.randn(len(A_ops), N_store, N_substeps, d2_len)
             else:
                 raise TypeError('Unsupported increment distribution for homogeneous process.')
         else:
@@ -594,7 +706,7 @@ def _ssesolve_single_trajectory(data, H, dt, tlist, N_store, N_substeps, psi_t,
                     dw_expect = cy_expect_psi_csr(A[3].data,
                                                   A[3].indices,
                                                   A[3].indptr, psi_t, 1) * dt
-                    dW[a_idx, t_idx, j, :] = np.random.poisson(dw_expect, d2_len)
+                    dW[a_idx, t_idx, j, :] = prng.poisson(dw_expect, d2_len)
 
             psi_t = rhs(H.data, psi_t, t + dt * j,
                         A_ops, dt, dW[:, t_idx, j, :], d1, d2, args)
@@ -671,41 +783,19 @@ def smesolve_generic(ssdata, options, progress_bar):
         s_m_ops = [[spre(c) for _ in range(ssdata.d2_len)]
                    for c in ssdata.sc_ops]
 
-    progress_bar.start(ssdata.ntraj)
-
-    for n in range(ssdata.ntraj):
-        progress_bar.update(n)
-
-        rho_t = mat2vec(ssdata.state0.full()).ravel()
-
-        # noise = ssdata.noise[n] if ssdata.noise else None
-        if ssdata.noise:
-            noise = ssdata.noise[n]
-        elif ssdata.gen_noise:
-            noise = ssdata.gen_noise(
-                len(A_ops), N_store, N_substeps, ssdata.d2_len, dt)
-        else:
-            noise = None
-
-        states_list, dW, m = _smesolve_single_trajectory(data,
-                                 L, dt, ssdata.tlist, N_store, N_substeps,
-                                 rho_t, A_ops, s_e_ops, s_m_ops, ssdata.rhs,
-                                 ssdata.d1, ssdata.d2, ssdata.d2_len,
-                                 ssdata.dW_factors, ssdata.homogeneous,
-                                 ssdata.distribution, ssdata.args,
-                                 store_measurement=ssdata.store_measurement,
-                                 store_states=ssdata.store_states, noise=noise)
-
-        data.states.append(states_list)
-        data.noise.append(dW)
-        data.measurement.append(m)
+    if options.block_trajectories and _smesolve_block_supported(ssdata):
+        traj_func = _smesolve_block
+    else:
+        traj_func = _smesolve_trajectories
 
-    progress_bar.finished()
+    _stochastic_trajectories(ssdata, options, data, progress_bar,
+                             ['states', 'noise', 'measurement'],
+                             traj_func, L, A_ops, s_e_ops,
+                             s_m_ops, dt, N_store, N_substeps)
 
-    # average density matrices
-    if options.average_states and np.any(data.states):
-        data.states = [sum([data.states[m][n] for m in range(NT)]).unit()
-                       for n in range(len(data.times))]
+    # average density matrices, summed by _stochastic_trajectories
+    if options.average_states and data.states:
+        data.states = [rho.unit() for rho in data.states]
 
     # average
     data.expect = data.expect / NT
@@ -723,11 +813,54 @@ def smesolve_generic(ssdata, options, progress_bar):
     return data
 
 
+def _smesolve_trajectories(chunk, data, seeds, ssdata, L, A_ops, s_e_ops,
+                           s_m_ops, dt, N_store, N_substeps):
+    """
+    Internal function. Runs the trajectories chunk[0] <= n < chunk[1] of
+    smesolve_generic.
+    """
+    results = []
+    for n in range(chunk[0], chunk[1]):
+        rho_t = mat2vec(ssdata.state0.full()).ravel()
+        prng = _trajectory_prng(seeds, n)
+
+        if ssdata.adaptive:
+            results.append(_smesolve_adaptive_trajectory(data,
+                                 L, dt, ssdata.tlist, N_substeps, rho_t,
+                                 A_ops, s_e_ops, s_m_ops, ssdata.rhs,
+                                 ssdata.d1, ssdata.d2, ssdata.d2_len,
+                                 ssdata.dW_factors, ssdata.args, ssdata.tol,
+                                 store_measurement=ssdata.store_measurement,
+                                 store_states=ssdata.store_states,
+                                 prng=prng))
+            continue
+
+        if ssdata.noise:
+            noise = ssdata.noise[n]
+        elif ssdata.gen_noise:
+            noise = ssdata.gen_noise(
+                len(A_ops), N_store, N_substeps, ssdata.d2_len, dt, prng=prng)
+        else:
+            noise = None
+
+        results.append(_smesolve_single_trajectory(data,
+                                 L, dt, ssdata.tlist, N_store, N_substeps,
+                                 rho_t, A_ops, s_e_ops, s_m_ops, ssdata.rhs,
+                                 ssdata.d1, ssdata.d2, ssdata.d2_len,
+                                 ssdata.dW_factors, ssdata.homogeneous,
+                                 ssdata.distribution, ssdata.args,
+                                 store_measurement=ssdata.store_measurement,
+                                 store_states=ssdata.store_states, noise=noise,
+                                 prng=prng))
+    return results
+
+
 def _smesolve_single_trajectory(data, L, dt, tlist, N_store, N_substeps, rho_t,
                                 A_ops, e_ops, m_ops, rhs, d1, d2, d2_len, dW_factors,
                                 homogeneous, distribution, args,
                                 store_measurement=False,
-                                store_states=False, noise=None):
+                                store_states=False, noise=None,
+                                prng=np.random):
     """
     Internal function. See smesolve.
     """
@@ -736,7 +869,7 @@ def _smesolve_single_trajectory(data, L, dt, tlist, N_store, N_substeps, rho_t,
         if homogeneous:
             if distribution == 'normal':
                 dW = np.sqrt(
-                    dt) * scipy.randn(len(A_ops), N_store, N_substeps, d2_len)
+                    dt) * prng.randn(len(A_ops), N_store, N_substeps, d2_len)
             else:
                 raise TypeError('Unsupported increment distribution for homogeneous process.')
         else:
@@ -770,7 +903,7 @@ def _smesolve_single_trajectory(data, L, dt, tlist, N_store, N_substeps, rho_t,
                 for a_idx, A in enumerate(A_ops):
                     dw_expect = cy_expect_rho_vec(A[4], rho_t, 1) * dt
                     if dw_expect > 0:
-                        dW[a_idx, t_idx, j, :] = np.random.poisson(dw_expect, d2_len)
+                        dW[a_idx, t_idx, j, :] = prng.poisson(dw_expect, d2_len)
                     else:
                         dW[a_idx, t_idx, j, :] = np.zeros(d2_len)
 
@@ -793,6 +926,271 @@ def _smesolve_single_trajectory(data, L, dt, tlist, N_store, N_substeps, rho_t,
     return states_list, dW, measurements
 
 
+# substeps are at most this many times halved by the adaptive step control
+_adaptive_max_level = 12
+
+
+def _smesolve_adaptive_trajectory(data, L, dt, tlist, N_substeps, rho_t,
+                                  A_ops, e_ops, m_ops, rhs, d1, d2, d2_len,
+                                  dW_factors, args, tol,
+                                  store_measurement=False,
+                                  store_states=False, prng=np.random):
+    """
+    Internal function. Like _smesolve_single_trajectory, but with adaptive
+    substeps.
+
+    The substeps are the intervals of tlist halved k times. Each substep is
+    compared with two half steps (step doubling). If their results differ
+    by more than `tol`, the step is retried at half the size, and otherwise
+    the result of the half steps is accepted. If the difference is below
+    tol / 4, the next step is taken at twice the size, where the dyadic
+    grid allows it. The first step is an interval of tlist divided by
+    N_substeps, rounded to a power of two.
+
+    The Wiener increments of the halves follow from the Brownian bridge
+    conditioned on the increment of the whole step, with the random numbers
+    of each node of this binary Brownian tree fixed by its position, so
+    that the noise path does not depend on the tolerance.
+
+    The returned noise holds the Wiener increments of the intervals of
+    tlist, as one substep.
+    """
+    A_len = len(A_ops)
+    Dt = dt * N_substeps
+    level = min(int(np.ceil(np.log2(N_substeps))), _adaptive_max_level)
+
+    dW = np.sqrt(Dt) * prng.randn(A_len, len(tlist), 1, d2_len)
+
+    states_list = []
+    measurements = np.zeros((len(tlist), len(m_ops), d2_len), dtype=complex)
+
+    for t_idx, t in enumerate(tlist):
+
+        if e_ops:
+            for e_idx, e in enumerate(e_ops):
+                s = cy_expect_rho_vec(e.data, rho_t, 0)
+                data.expect[e_idx, t_idx] += s
+                data.ss[e_idx, t_idx] += s ** 2
+
+        if store_states or not e_ops:
+            # XXX: need to keep hilbert space structure
+            states_list.append(Qobj(vec2mat(rho_t)))
+
+        if store_measurement:
+            for m_idx, m in enumerate(m_ops):
+                for dW_idx, dW_factor in enumerate(dW_factors):
+                    if m[dW_idx]:
+                        m_expt = cy_expect_rho_vec(m[dW_idx].data, rho_t, 0)
+                    else:
+                        m_expt = 0
+                    measurements[t_idx, m_idx, dW_idx] = m_expt + \
+                        dW_factor * dW[m_idx, t_idx, 0, dW_idx] / Dt
+
+        tree = _BrownianTree(dW[:, t_idx, 0, :], Dt, prng)
+
+        # position in the interval, in steps at the finest level
+        K = _adaptive_max_level
+        pos = 0
+        rho_1 = None
+        while pos < 2 ** K:
+            i = pos >> (K - level)
+            h = Dt / 2 ** level
+            s = t + i * h
+            if rho_1 is None:
+                rho_1 = rhs(L.data, rho_t, s, A_ops, h, tree.dW(level, i),
+                            d1, d2, args)
+            rho_h = rhs(L.data, rho_t, s, A_ops, h / 2,
+                        tree.dW(level + 1, 2 * i), d1, d2, args)
+            rho_2 = rhs(L.data, rho_h, s + h / 2, A_ops, h / 2,
+                        tree.dW(level + 1, 2 * i + 1), d1, d2, args)
+            err = np.max(np.abs(rho_2 - rho_1))
+            if err > tol and level < K:
+                # the first half step is the whole step at the next level
+                level += 1
+                rho_1 = rho_h
+            else:
+                rho_t = rho_2
+                rho_1 = None
+                pos += 2 ** (K - level)
+                if err < tol / 4 and level > 0 and i % 2:
+                    level -= 1
+
+    if d2_len == 1:
+        measurements = measurements.squeeze(axis=(2))
+
+    return states_list, dW, measurements
+
+
+class _BrownianTree:
+    """
+    Internal class. The Wiener increments over the dyadic subintervals of an
+    interval of length Dt, given the increment dW over the whole interval.
+    The increments over the two halves of a subinterval are drawn from the
+    Brownian bridge. The random numbers for all subintervals at one level
+    are drawn together, the first time that level is needed, so that the
+    increments do not depend on the order in which they are asked for.
+    """
+    def __init__(self, dW, Dt, prng):
+        self.Dt = Dt
+        self.prng = np.random.RandomState(prng.randint(2 ** 31))
+        self.levels = [dW[np.newaxis]]
+
+    def dW(self, k, i):
+        """
+        The increment over subinterval i of length Dt / 2**k.
+        """
+        while len(self.levels) <= k:
+            parent = self.levels[-1]
+            h = self.Dt / len(parent)
+            dW_1 = 0.5 * parent + 0.5 * np.sqrt(h) * \
+                self.prng.randn(*parent.shape)
+            level = np.empty((2 * len(parent),) + parent.shape[1:])
+            level[0::2] = dW_1
+            level[1::2] = parent - dW_1
+            self.levels.append(level)
+        return self.levels[k][i]
+
+
+def _smesolve_block_supported(ssdata):
+    """
+    Internal function. Whether _smesolve_block implements the scheme that
+    smesolve has set up in `ssdata`: Euler-Maruyama or Milstein with the
+    built-in homodyne or heterodyne superoperators.
+    """
+    if (not _default_rho_A_ops(ssdata.gen_A_ops) or ssdata.gen_noise
+            or not ssdata.homogeneous or ssdata.distribution != 'normal'
+            or ssdata.adaptive):
+        return False
+    if ssdata.rhs in (_rhs_rho_milstein_homodyne_single,
+                      _rhs_rho_milstein_homodyne):
+        return True
+    return (ssdata.rhs in (_rhs_rho_euler_maruyama,
+                           cy_rhs_rho_euler_homodyne,
+                           cy_rhs_rho_euler_heterodyne) and
+            ssdata.d1 in (d1_rho_homodyne, d1_rho_heterodyne) and
+            ssdata.d2 in (d2_rho_homodyne, d2_rho_heterodyne))
+
+
+def _smesolve_block(chunk, data, seeds, ssdata, L, A_ops, s_e_ops, s_m_ops,
+                    dt, N_store, N_substeps):
+    """
+    Internal function. Runs the trajectories chunk[0] <= n < chunk[1] of
+    smesolve_generic together, as the columns of one dense N**2 x K matrix.
+
+    The Liouvillian and the stochastic superoperators are stacked into one
+    sparse matrix, so that each substep takes a single sparse-dense matrix
+    product for all K trajectories. The noise of trajectory `n` is drawn
+    from its own random number stream, exactly as in
+    _smesolve_trajectories, and the results agree with that function up to
+    rounding errors.
+    """
+    K = chunk[1] - chunk[0]
+    A_len = len(A_ops)
+    d2_len = ssdata.d2_len
+    milstein = ssdata.rhs in (_rhs_rho_milstein_homodyne_single,
+                              _rhs_rho_milstein_homodyne)
+    heterodyne = not milstein and ssdata.d2 is d2_rho_heterodyne
+
+    rho0 = mat2vec(ssdata.state0.full()).ravel()
+    n = ssdata.state0.shape[0]
+    N2 = len(rho0)
+    diag = np.arange(n) * (n + 1)
+    # row vector that takes the trace of a vectorized density matrix
+    tr = sp.csr_matrix((np.ones(n), (np.zeros(n), diag)), shape=(1, N2))
+
+    # drift, then (A_L + Ad_R), (A_L - Ad_R) for heterodyne detection and
+    # the products of (A_L + Ad_R) needed by the Milstein scheme
+    M = [A[0] + A[3] for A in A_ops]
+    ops = [L.data + np.sum([A[7] for A in A_ops], axis=0)]
+    ops += M
+    if heterodyne:
+        ops += [A[0] - A[3] for A in A_ops]
+    if milstein:
+        pairs = [(a, b) for a in range(A_len) for b in range(a + 1)]
+        ops += [M[a] * M[a] if a == b else 0.5 * (M[a] * M[b] + M[b] * M[a])
+                for (a, b) in pairs]
+    S = sp.vstack(ops).tocsr()
+    n_terms = len(ops)
+
+    if s_e_ops:
+        E = sp.vstack([tr * e.data for e in s_e_ops]).tocsr()
+    if ssdata.store_measurement:
+        m_rows = [(m_idx, dW_idx, tr * m[dW_idx].data)
+                  for m_idx, m in enumerate(s_m_ops)
+                  for dW_idx in range(len(ssdata.dW_factors)) if m[dW_idx]]
+
+    dW = np.empty((K, A_len, N_store, N_substeps, d2_len))
+    for k in range(K):
+        if ssdata.noise:
+            dW[k] = ssdata.noise[chunk[0] + k]
+        else:
+            prng = _trajectory_prng(seeds, chunk[0] + k)
+            dW[k] = np.sqrt(dt) * prng.randn(A_len, N_store, N_substeps,
+                                             d2_len)
+
+    states_list = [[] for k in range(K)]
+    measurements = np.zeros((K, N_store, len(s_m_ops), d2_len),
+                            dtype=complex)
+
+    R = np.tile(rho0[:, np.newaxis], (1, K))
+
+    for t_idx, t in enumerate(ssdata.tlist):
+
+        if s_e_ops:
+            s = E * R
+            data.expect[:, t_idx] += s.sum(axis=1)
+            data.ss[:, t_idx] += (s ** 2).sum(axis=1)
+
+        if ssdata.store_states or not s_e_ops:
+            for k in range(K):
+                states_list[k].append(Qobj(vec2mat(R[:, k])))
+
+        R_prev = R
+
+        for j in range(N_substeps):
+            w = dW[:, :, t_idx, j, :].T
+            Y = np.asarray(S * R).reshape(n_terms, N2, K)
+            e = Y[:, diag, :].sum(axis=1)
+
+            dR = Y[0] * dt
+            D = [Y[1 + a] - e[1 + a] * R for a in range(A_len)]
+            if heterodyne:
+                for a in range(A_len):
+                    D2 = Y[1 + A_len + a] - e[1 + A_len + a] * R
+                    dR += (D[a] * w[0, a] - 1.0j * D2 * w[1, a]) / np.sqrt(2)
+            else:
+                for a in range(A_len):
+                    dR += D[a] * w[0, a]
+
+            if milstein:
+                for p, (a, b) in enumerate(pairs):
+                    Y2 = Y[1 + A_len + p]
+                    e2 = e[1 + A_len + p]
+                    if a == b:
+                        dR += 0.5 * (Y2 - 2.0 * e[1 + a] * Y[1 + a] +
+                                     (-e2 + 2.0 * e[1 + a] ** 2) * R) * \
+                            (w[0, a] ** 2 - dt)
+                    else:
+                        dR += (Y2 - e[1 + b] * Y[1 + a] -
+                               e[1 + a] * Y[1 + b] +
+                               (-e2 + 2.0 * e[1 + a] * e[1 + b]) * R) * \
+                            (w[0, a] * w[0, b])
+
+            R = R + dR
+
+        if ssdata.store_measurement:
+            for m_idx, dW_idx, m in m_rows:
+                measurements[:, t_idx, m_idx, dW_idx] = (m * R_prev)[0]
+            measurements[:, t_idx, :, :] += ssdata.dW_factors * \
+                dW[:, :len(s_m_ops), t_idx, :, :].sum(axis=2) / \
+                (dt * N_substeps)
+
+    if d2_len == 1:
+        measurements = measurements.squeeze(axis=3)
+
+    return [(states_list[k], dW[k], measurements[k]) for k in range(K)]
+
+
 #------------------------------------------------------------------------------
 # Generic parameterized stochastic SE PDP solver
 #
@@ -827,27 +1225,14 @@ def sepdpsolve_generic(ssdata, options, progress_bar):
     for c in ssdata.c_ops:
         Heff += -0.5j * c.dag() * c
 
-    progress_bar.start(ssdata.ntraj)
-
-    for n in range(ssdata.ntraj):
-        progress_bar.update(n)
-        psi_t = ssdata.psi0.full().ravel()
-
-        states_list, jump_times, jump_op_idx = \
-            _sepdpsolve_single_trajectory(data, Heff, dt, ssdata.tlist,
-                                          N_store, N_substeps,
-                                          psi_t, ssdata.c_ops, ssdata.e_ops)
+    _stochastic_trajectories(ssdata, options, data, progress_bar,
+                             ['states', 'jump_times', 'jump_op_idx'],
+                             _sepdpsolve_trajectories, Heff, dt, N_store,
+                             N_substeps)
 
-        data.states.append(states_list)
-        data.jump_times.append(jump_times)
-        data.jump_op_idx.append(jump_op_idx)
-
-    progress_bar.finished()
-
-    # average density matrices
-    if options.average_states and np.any(data.states):
-        data.states = [sum([data.states[m][n] for m in range(NT)]).unit()
-                       for n in range(len(data.times))]
+    # average density matrices, summed by _stochastic_trajectories
+    if options.average_states and data.states:
+        data.states = [rho.unit() for rho in data.states]
 
     # average
     data.expect = data.expect / NT
@@ -865,8 +1250,22 @@ def sepdpsolve_generic(ssdata, options, progress_bar):
     return data
 
 
+def _sepdpsolve_trajectories(chunk, data, seeds, ssdata, Heff, dt, N_store,
+                             N_substeps):
+    """
+    Internal function. Runs the trajectories chunk[0] <= n < chunk[1] of
+    sepdpsolve_generic.
+    """
+    return [_sepdpsolve_single_trajectory(data, Heff, dt, ssdata.tlist,
+                                          N_store, N_substeps,
+                                          ssdata.psi0.full().ravel(),
+                                          ssdata.c_ops, ssdata.e_ops,
+                                          _trajectory_prng(seeds, n))
+            for n in range(chunk[0], chunk[1])]
+
+
 def _sepdpsolve_single_trajectory(data, Heff, dt, tlist, N_store, N_substeps,
-                                  psi_t, c_ops, e_ops):
+                                  psi_t, c_ops, e_ops, prng):
     """
     Internal function.
     """
@@ -874,7 +1273,6 @@ def _sepdpsolve_single_trajectory(data, Heff, dt, tlist, N_store, N_substeps,
 
     phi_t = np.copy(psi_t)
 
-    prng = RandomState()  # todo: seed it
     r_jump, r_op = prng.rand(2)
 
     jump_times = []
@@ -955,6 +1353,7 @@ def smepdpsolve_generic(ssdata, options, progress_bar):
     data.solver = "smepdpsolve"
     data.times = ssdata.tlist
     data.expect = np.zeros((len(ssdata.e_ops), N_store), dtype=complex)
+    data.ss = np.zeros((len(ssdata.e_ops), N_store), dtype=complex)
     data.jump_times = []
     data.jump_op_idx = []
 
@@ -962,27 +1361,14 @@ def smepdpsolve_generic(ssdata, options, progress_bar):
     # needs to be modified for TD systems
     L = liouvillian_fast(ssdata.H, ssdata.c_ops)
 
-    progress_bar.start(ssdata.ntraj)
-
-    for n in range(ssdata.ntraj):
-        progress_bar.update(n)
-        rho_t = mat2vec(ssdata.rho0.full()).ravel()
+    _stochastic_trajectories(ssdata, options, data, progress_bar,
+                             ['states', 'jump_times', 'jump_op_idx'],
+                             _smepdpsolve_trajectories, L, dt, N_store,
+                             N_substeps)
 
-        states_list, jump_times, jump_op_idx = \
-            _smepdpsolve_single_trajectory(data, L, dt, ssdata.tlist,
-                                           N_store, N_substeps,
-                                           rho_t, ssdata.c_ops, ssdata.e_ops)
-
-        data.states.append(states_list)
-        data.jump_times.append(jump_times)
-        data.jump_op_idx.append(jump_op_idx)
-
-    progress_bar.finished()
-
-    # average density matrices
-    if options.average_states and np.any(data.states):
-        data.states = [sum([data.states[m][n] for m in range(NT)]).unit()
-                       for n in range(len(data.times))]
+    # average density matrices, summed by _stochastic_trajectories
+    if options.average_states and data.states:
+        data.states = [rho.unit() for rho in data.states]
 
     # average
     data.expect = data.expect / ssdata.ntraj
@@ -996,8 +1382,22 @@ def smepdpsolve_generic(ssdata, options, progress_bar):
     return data
 
 
+def _smepdpsolve_trajectories(chunk, data, seeds, ssdata, L, dt, N_store,
+                              N_substeps):
+    """
+    Internal function. Runs the trajectories chunk[0] <= n < chunk[1] of
+    smepdpsolve_generic.
+    """
+    return [_smepdpsolve_single_trajectory(data, L, dt, ssdata.tlist,
+                                           N_store, N_substeps,
+                                           mat2vec(ssdata.rho0.full()).ravel(),
+                                           ssdata.c_ops, ssdata.e_ops,
+                                           _trajectory_prng(seeds, n))
+            for n in range(chunk[0], chunk[1])]
+
+
 def _smepdpsolve_single_trajectory(data, L, dt, tlist, N_store, N_substeps,
-                                   rho_t, c_ops, e_ops):
+                                   rho_t, c_ops, e_ops, prng):
     """
     Internal function.
     """
@@ -1005,7 +1405,6 @@ def _smepdpsolve_single_trajectory(data, L, dt, tlist, N_store, N_substeps,
 
     rho_t = np.copy(rho_t)
 
-    prng = RandomState()  # todo: seed it
     r_jump, r_op = prng.rand(2)
 
     jump_times = []
@@ -1054,6 +1453,262 @@ def _smepdpsolve_single_trajectory(data, L, dt, tlist, N_store, N_substeps,
     return states_list, jump_times, jump_op_idx
 
 
+#------------------------------------------------------------------------------
+# Trajectory loop shared by the generic solvers
+#
+def _stochastic_trajectories(ssdata, options, data, progress_bar, fields,
+                             traj_func, *traj_args):
+    """
+    Internal function. Runs the trajectories of a generic solver in chunks
+    of options.chunk_size (default 10), calling
+    ``traj_func(chunk, data, seeds, ssdata, *traj_args)`` for the
+    trajectories chunk[0] <= n < chunk[1]. That function adds the
+    expectation values to data.expect and data.ss, and returns a list with
+    the results of each trajectory, which are stored in the lists of `data`
+    named in `fields` by _store_records.
+
+    If more than one cpu is available, the chunks are run in the persistent
+    worker pool, and their sums and results are merged in the order of the
+    trajectories. Each trajectory has its own random number stream, so the
+    results do not depend on the number of processes. They are only exact
+    for a fixed chunk size, since the sums are formed per chunk.
+    """
+    # one random number stream per trajectory, and the trajectories restored
+    # from a checkpoint, if any
+    seeds, n_done = _checkpoint_resume(ssdata, options, data)
+
+    # the progress bar is not needed (nor always picklable) in the workers
+    config = copy.copy(ssdata)
+    config.progress_bar = None
+
+    progress_bar.start(ssdata.ntraj)
+
+    num_cpus = options.num_cpus or qutip.settings.num_cpus
+    pool = None
+    if num_cpus > 1 and ssdata.ntraj - n_done > 1:
+        try:
+            pool = pool_initialize(_stochastic_init_worker, traj_func, seeds,
+                                   config, traj_args, fields,
+                                   data.expect.shape, num_cpus=num_cpus)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            # e.g. user-defined d1, d2 or rhs functions that cannot be
+            # pickled
+            warnings.warn("Evaluating the trajectories serially, the " +
+                          "problem cannot be sent to the worker " +
+                          "processes: " + str(e))
+            pool = None
+
+    chunk_size = options.chunk_size or 10
+    chunks = [(start, min(start + chunk_size, ssdata.ntraj))
+              for start in range(n_done, ssdata.ntraj, chunk_size)]
+
+    if pool is not None:
+        try:
+            for result in pool.imap(_stochastic_chunk_worker, chunks):
+                _merge_chunk(ssdata, options, data, result)
+                progress_bar.update(result[0][1] - 1)
+        except KeyboardInterrupt:
+            print("Cancel all stochastic trajectories on keyboard interrupt")
+            pool_shutdown()
+            raise
+    else:
+        for chunk in chunks:
+            progress_bar.update(chunk[0])
+            _merge_chunk(ssdata, options, data,
+                         _stochastic_chunk(chunk, traj_func, seeds, config,
+                                           traj_args, fields,
+                                           data.expect.shape))
+
+    for name in fields:
+        records = getattr(data, name)
+        filename = getattr(ssdata, name + '_file', None)
+        if isinstance(records, np.memmap):
+            records.flush()
+        elif filename and n_done and os.path.exists(filename):
+            # all records were streamed to disk before a checkpoint
+            setattr(data, name,
+                    np.lib.format.open_memmap(filename, mode='r+'))
+
+    progress_bar.finished()
+
+
+def _merge_chunk(ssdata, options, data, result, save=True):
+    """
+    Internal function. Adds the expectation value sums of a chunk of
+    trajectories to `data` and stores their records. With save=True the
+    chunk is written to the checkpoint directory, if one is given.
+    """
+    chunk, expect, ss, records = result
+    data.expect += expect
+    data.ss += ss
+    for n, rec in enumerate(records, chunk[0]):
+        _store_records(ssdata, options, data, n, rec)
+    if save:
+        _checkpoint_chunk(ssdata, options, data, result)
+
+
+def _trajectory_records(ssdata, fields, results):
+    """
+    Internal function. Returns the results of a chunk of trajectories as
+    dicts from the names in `fields` to the records that are kept: the noise
+    is dropped or summed over the substeps of each interval of tlist,
+    according to ssdata.store_noise, and measurements are only kept with
+    ssdata.store_measurement.
+    """
+    records = []
+    for res in results:
+        rec = dict(zip(fields, res))
+        if 'noise' in rec:
+            if not ssdata.store_noise:
+                del rec['noise']
+            elif ssdata.store_noise == 'tlist':
+                rec['noise'] = rec['noise'].sum(axis=2)
+        if 'measurement' in rec and not ssdata.store_measurement:
+            del rec['measurement']
+        records.append(rec)
+    return records
+
+
+def _store_records(ssdata, options, data, n, rec):
+    """
+    Internal function. Stores the records `rec` of trajectory `n` in `data`.
+    With options.average_states the states are added to the running sums in
+    data.states, and records with a file name in ssdata (noise_file,
+    measurement_file) are written to a memory-mapped file.
+    """
+    for name, value in rec.items():
+        filename = getattr(ssdata, name + '_file', None)
+        if name == 'states' and options.average_states:
+            if value:
+                value = [ket2dm(s) if isket(s) else s for s in value]
+                if data.states:
+                    value = [s + v for s, v in zip(data.states, value)]
+                data.states = value
+        elif filename:
+            records = getattr(data, name)
+            if not isinstance(records, np.memmap):
+                if n > 0 and os.path.exists(filename):
+                    # resumed from a checkpoint
+                    records = np.lib.format.open_memmap(filename, mode='r+')
+                else:
+                    records = np.lib.format.open_memmap(
+                        filename, mode='w+', dtype=value.dtype,
+                        shape=(ssdata.ntraj,) + value.shape)
+                setattr(data, name, records)
+            records[n] = value
+        else:
+            getattr(data, name).append(value)
+
+
+# trajectory function and solver configuration installed in each worker of
+# the persistent pool by _stochastic_init_worker
+_stochastic_worker_data = None
+
+
+def _stochastic_init_worker(traj_func, seeds, ssdata, traj_args, fields,
+                           shape):
+    global _stochastic_worker_data
+    _stochastic_worker_data = (traj_func, seeds, ssdata, traj_args, fields,
+                               shape)
+
+
+def _stochastic_chunk(chunk, traj_func, seeds, ssdata, traj_args, fields,
+                      shape):
+    """
+    Internal function. Runs the trajectories chunk[0] <= n < chunk[1], and
+    returns their expectation value sums and records.
+    """
+    data = Odedata()
+    data.expect = np.zeros(shape, dtype=complex)
+    data.ss = np.zeros(shape, dtype=complex)
+    results = traj_func(chunk, data, seeds, ssdata, *traj_args)
+    return (chunk, data.expect, data.ss,
+            _trajectory_records(ssdata, fields, results))
+
+
+def _stochastic_chunk_worker(chunk):
+    """
+    Internal function. Runs a chunk of trajectories in a worker of the
+    persistent pool.
+    """
+    traj_func, seeds, ssdata, traj_args, fields, shape = \
+        _stochastic_worker_data
+    return _stochastic_chunk(chunk, traj_func, seeds, ssdata, traj_args,
+                             fields, shape)
+
+
+#------------------------------------------------------------------------------
+# Checkpoints of the trajectory loops
+#
+def _checkpoint_resume(ssdata, options, data):
+    """
+    Internal function. Returns the base seed for the trajectories and the
+    number of trajectories whose results have been restored into `data` from
+    the chunks saved in the checkpoint directory options.checkpoint_dir, if
+    one is given.
+    """
+    seeds = _trajectory_seeds(options.seeds)
+    if not options.checkpoint_dir:
+        return seeds, 0
+
+    config = {'solver': data.solver,
+              'scheme': str(ssdata.solver),
+              'problem': _checkpoint_hash(
+                  ssdata.H, ssdata.state0, ssdata.c_ops, ssdata.sc_ops,
+                  ssdata.e_ops, ssdata.m_ops, ssdata.args,
+                  ssdata.dW_factors, ssdata.d1, ssdata.d2, ssdata.rhs,
+                  ssdata.distribution, ssdata.homogeneous, ssdata.theta,
+                  ssdata.adaptive, ssdata.tol, ssdata.normalize,
+                  ssdata.noise),
+              'method': ssdata.method,
+              'tlist': ssdata.tlist,
+              'ntraj': ssdata.ntraj,
+              'nsubsteps': ssdata.nsubsteps,
+              'e_num': len(ssdata.e_ops),
+              'seeds': options.seeds,
+              'chunk_size': options.chunk_size or 10,
+              'average_states': options.average_states,
+              'store_noise': ssdata.store_noise,
+              'store_measurement': ssdata.store_measurement,
+              'noise_file': str(ssdata.noise_file),
+              'measurement_file': str(ssdata.measurement_file)}
+    saved = _checkpoint_load(options.checkpoint_dir, config)
+
+    # the seeds of the earlier run give the same trajectories again
+    if 'seeds' in saved:
+        seeds = saved['seeds']
+    else:
+        _checkpoint_save(options.checkpoint_dir, 'seeds', seeds)
+
+    # the chunks are completed in order, so the saved ones are contiguous
+    n_done = 0
+    for name in sorted(saved):
+        if name.startswith('chunk_'):
+            _merge_chunk(ssdata, options, data, saved[name], save=False)
+            n_done = saved[name][0][1]
+    return seeds, n_done
+
+
+def _checkpoint_chunk(ssdata, options, data, result):
+    """
+    Internal function. Saves the expectation value sums and the records of
+    one chunk of trajectories in its own file of the checkpoint directory,
+    once the records streamed to memory-mapped files are on disk.
+    """
+    if not options.checkpoint_dir:
+        return
+    chunk, expect, ss, records = result
+    streamed = [name for name in ['noise', 'measurement']
+                if isinstance(getattr(data, name, None), np.memmap)]
+    for name in streamed:
+        getattr(data, name).flush()
+    records = [dict([(name, value) for name, value in rec.items()
+                     if name not in streamed])
+               for rec in records]
+    _checkpoint_save(options.checkpoint_dir, 'chunk_%08d' % chunk[0],
+                     (chunk, expect, ss, records))
+
+
 #------------------------------------------------------------------------------
 # Helper-functions for stochastic DE
 #
@@ -1244,6 +1899,40 @@ def _generate_rho_A_ops(sc, L, dt):
     return out
 
 
+def _generate_rho_A_ops_fused(sc, L, dt, method='homodyne'):
+    """
+    pre-compute the operators of _generate_rho_A_ops and, stored with the
+    first operator, the drift and stochastic superoperators stacked into one
+    csr matrix, for the compiled Euler-Maruyama steps cy_rhs_rho_euler_*
+    """
+    out = _generate_rho_A_ops(sc, L, dt)
+    if method == 'photocurrent':
+        N = [A[4] + A[5] for A in out]
+        blocks = [L - 0.5 * np.sum(N, axis=0)]
+        blocks += [A[6] for A in out] + N
+    else:
+        blocks = [L + np.sum([A[7] for A in out], axis=0)]
+        for A in out:
+            blocks.append(A[0] + A[3])
+            if method == 'heterodyne':
+                blocks.append(A[0] - A[3])
+    S = sp.vstack(blocks).tocsr()
+    S.data = np.array(S.data, dtype=complex)
+    S.indices = np.array(S.indices, dtype=np.int32)
+    S.indptr = np.array(S.indptr, dtype=np.int32)
+    out[0].append(S)
+    return out
+
+
+def _default_rho_A_ops(gen_A_ops):
+    """
+    Whether gen_A_ops gives (at least) the operators of _generate_rho_A_ops.
+    """
+    return (gen_A_ops is _generate_rho_A_ops or
+            (isinstance(gen_A_ops, partial) and
+             gen_A_ops.func is _generate_rho_A_ops_fused))
+
+
 def _generate_A_ops_Euler(sc, L, dt):
     """
     combine precomputed operators in one long operator for the Euler method
@@ -1288,11 +1977,12 @@ def _generate_A_ops_Milstein(sc, L, dt):
     return out1
 
 
-def _generate_noise_Milstein(sc_len, N_store, N_substeps, d2_len, dt):
+def _generate_noise_Milstein(sc_len, N_store, N_substeps, d2_len, dt,
+                             prng=np.random):
     """
     generate noise terms for the fast Milstein scheme
     """
-    dW_temp = np.sqrt(dt) * scipy.randn(sc_len, N_store, N_substeps, 1)
+    dW_temp = np.sqrt(dt) * prng.randn(sc_len, N_store, N_substeps, 1)
     if sc_len == 1:
         noise = np.vstack([dW_temp, 0.5 * (dW_temp * dW_temp - dt * np.ones((sc_len, N_store, N_substeps, 1)))])
     else:
@@ -1301,6 +1991,69 @@ def _generate_noise_Milstein(sc_len, N_store, N_substeps, d2_len, dt):
     return noise
 
 
+def _generate_noise_taylor_15(sc_len, N_store, N_substeps, d2_len, dt,
+                              prng=np.random):
+    """
+    generate the Wiener increments dW and the multiple integrals
+    dZ = int_t^{t+dt} (W(s) - W(t)) ds for the order 1.5 Taylor scheme, as
+    the two noise terms of each substep
+    """
+    U = prng.randn(sc_len, N_store, N_substeps, 2)
+    noise = np.empty((sc_len, N_store, N_substeps, 2))
+    noise[..., 0] = np.sqrt(dt) * U[..., 0]
+    noise[..., 1] = 0.5 * dt ** 1.5 * (U[..., 0] + U[..., 1] / np.sqrt(3))
+    return noise
+
+
+def _generate_A_ops_taylor_15(sc, L, dt):
+    """
+    precomputed operators for the order 1.5 Taylor scheme: in addition to
+    those of _generate_rho_A_ops, the drift superoperator L + D[c] and
+    c_L + cd_R
+    """
+    out = _generate_rho_A_ops(sc, L, dt)
+    for A in out:
+        A += [L + A[7], A[0] + A[3]]
+    return out
+
+
+class _ImplicitDrift:
+    """
+    Internal class. The LU factorization of I - theta * dt * L for the drift
+    superoperator L of the drift-implicit Milstein scheme. The factorization
+    is not pickled, but recomputed on first use, e.g. in worker processes.
+    """
+    def __init__(self, L, dt, theta):
+        self.L = L
+        self.dt = dt
+        self.theta = theta
+        self.A = (sp.identity(L.shape[0], dtype=complex, format='csc') -
+                  theta * dt * L).tocsc()
+        self.lu = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['lu'] = None
+        return state
+
+    def solve(self, b):
+        if self.lu is None:
+            self.lu = splu(self.A)
+        return self.lu.solve(b)
+
+
+def _generate_A_ops_implicit(sc, L, dt, theta=0.5):
+    """
+    precomputed operators for the drift-implicit Milstein scheme: in addition
+    to those of _generate_rho_A_ops, the factorized implicit drift, stored
+    with the first operator
+    """
+    out = _generate_rho_A_ops(sc, L, dt)
+    drift = L + np.sum([A[7] for A in out], axis=0)
+    out[0].append(_ImplicitDrift(drift, dt, theta))
+    return out
+
+
 def sop_H(A, rho_vec):
     """
     Evaluate the superoperator
@@ -1422,6 +2175,15 @@ def _rhs_rho_deterministic(L, rho_t, t, dt, args):
 # equations
 #
 
+# compiled Euler-Maruyama steps for the built-in (d1, d2) pairs, see
+# _generate_rho_A_ops_fused
+_rhs_rho_euler_fused = {
+    (d1_rho_homodyne, d2_rho_homodyne): cy_rhs_rho_euler_homodyne,
+    (d1_rho_heterodyne, d2_rho_heterodyne): cy_rhs_rho_euler_heterodyne,
+    (cy_d1_rho_photocurrent, cy_d2_rho_photocurrent):
+        cy_rhs_rho_euler_photocurrent}
+
+
 def _rhs_psi_euler_maruyama(H, psi_t, t, A_ops, dt, dW, d1, d2, args):
     """
     .. note::
@@ -1655,3 +2417,60 @@ def _rhs_rho_milstein_homodyne_fast(L, rho_t, t, A, dt, ddW, d1, d2, args):
     drho_t += np.dot(dW, d_vec[:-1])
 
     return drho_t
+
+
+def _rhs_rho_milstein_implicit(L, rho_t, t, A_ops, dt, dW, d1, d2, args):
+    """
+    Drift-implicit Milstein scheme for homodyne detection with commuting
+    stochastic jump operators,
+
+        rho_new - theta a(rho_new) dt = rho + (1 - theta) a(rho) dt
+                                        + (Milstein noise terms),
+
+    with the drift a(rho) = (L + sum D[c]) rho. Stable for stiff
+    Liouvillians, for theta >= 0.5.
+    """
+    drift = A_ops[0][8]
+    rho_expl = _rhs_rho_milstein_homodyne(L, rho_t, t, A_ops, dt, dW, d1, d2,
+                                          args)
+    rho_expl -= (drift.theta * dt) * spmv(drift.L, rho_t)
+    return drift.solve(rho_expl)
+
+
+def _rhs_rho_taylor_15_homodyne_single(L, rho_t, t, A_ops, dt, dW, d1, d2,
+                                       args):
+    """
+    Strong order 1.5 Taylor scheme for homodyne detection with a single
+    stochastic operator, see Eq. (10.4.1) of Kloeden and Platen, Numerical
+    Solution of Stochastic Differential Equations. dW[0, 0] is the Wiener
+    increment and dW[0, 1] the integral dZ of W over the step.
+
+    With the drift a = (L + D[c]) rho, the diffusion b = M rho - e rho,
+    where M = c_L + cd_R and e = Tr[M rho], and the derivative
+    Db[v] = M v - Tr[M v] rho - e v in the direction v, the operators of the
+    scheme are
+
+        L1 b = Db[b],  L1 a = (L + D[c]) b,  L0 a = (L + D[c]) a,
+        L0 b = Db[a] - Tr[M b] b,  L1 L1 b = Db[L1 b] - 2 Tr[M b] b.
+    """
+    A = A_ops[0]
+    drift, M = A[8], A[9]
+    dW, dZ = dW[0, 0], dW[0, 1]
+
+    def Db(v):
+        return spmv(M, v) - cy_expect_rho_vec(M, v, 0) * rho_t - e * v
+
+    e = cy_expect_rho_vec(M, rho_t, 0)
+    a = spmv(drift, rho_t)
+    b = spmv(M, rho_t) - e * rho_t
+    e_b = cy_expect_rho_vec(M, b, 0)
+
+    L1b = Db(b)
+    L1a = spmv(drift, b)
+    L0a = spmv(drift, a)
+    L0b = Db(a) - e_b * b
+    L1L1b = Db(L1b) - 2.0 * e_b * b
+
+    return (rho_t + a * dt + b * dW + 0.5 * L1b * (dW * dW - dt) +
+            L1a * dZ + L0b * (dW * dt - dZ) + 0.5 * L0a * dt * dt +
+            0.5 * L1L1b * (dW * dW / 3.0 - dt) * dW)
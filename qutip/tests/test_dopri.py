@@ -0,0 +1,72 @@
+# This file is part of QuTiP: Quantum Toolbox in Python.
+#
+#    Copyright (c) 2011 and later, Paul D. Nation and Robert J. Johansson.
+#    All rights reserved.
+#
+#    Redistribution and use in source and binary forms, with or without 
+#    modification, are permitted provided that the following conditions are 
+#    met:
+#
+#    1. Redistributions of source code must retain the above copyright notice, 
+#       this list of conditions and the following disclaimer.
+#
+#    2. Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#
+#    3. Neither the name of the QuTiP: Quantum Toolbox in Python nor the names
+#       of its contributors may be used to endorse or promote products derived
+#       from this software without specific prior written permission.
+#
+#    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS 
+#    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A 
+#    PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT 
+#    HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, 
+#    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT 
+#    LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+#    DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY 
+#    THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT 
+#    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+#    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+
+import numpy as np
+from numpy.testing import assert_, run_module_suite
+
+from qutip.dopri import Dopri5
+
+
+def _rhs(t, y, h):
+    return -1j * h * y
+
+
+def test_dopri_integrate():
+    "Dopri5: integrate to final time"
+    h = np.array([1.0, 2.0 - 0.1j, 3.0 - 0.5j])
+    y0 = np.ones(3, dtype=complex)
+    ode = Dopri5(_rhs).set_f_params(h)
+    ode.set_integrator('dopri5', atol=1e-10, rtol=1e-8)
+    ode.set_initial_value(y0, 0.0)
+    ode.integrate(5.0)
+    assert_(ode.successful())
+    assert_(ode.t == 5.0)
+    assert_(np.allclose(ode.y, np.exp(-5.0j * h) * y0, atol=1e-6))
+
+
+def test_dopri_dense_output():
+    "Dopri5: dense output within a single step"
+    h = np.array([1.0, 2.0 - 0.1j, 3.0 - 0.5j])
+    y0 = np.ones(3, dtype=complex)
+    ode = Dopri5(_rhs).set_f_params(h)
+    ode.set_integrator('dopri5', atol=1e-10, rtol=1e-8)
+    ode.set_initial_value(y0, 0.0)
+    ode.integrate(10.0, step=1)
+    assert_(0 < ode.t < 10.0)
+    for t in np.linspace(0, ode.t, 5):
+        assert_(np.allclose(ode.dense(t), np.exp(-1j * t * h) * y0,
+                            atol=1e-6))
+
+
+if __name__ == "__main__":
+    run_module_suite()
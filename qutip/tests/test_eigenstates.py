@@ -88,5 +88,25 @@ def test_diagHamiltonian2():
             abs((H * ekets[n] - evals[n] * ekets[n]).full())) < 1e-10, True)
 
 
+def test_diagHamiltonianBlocks():
+    """
+    Diagonalization of a Hamiltonian with independent blocks
+    """
+
+    N = 10
+    a = tensor(destroy(N), qeye(2))
+    sm = tensor(qeye(N), destroy(2))
+    # Jaynes-Cummings model, which conserves the number of excitations
+    H = a.dag() * a + 0.9 * sm.dag() * sm + 0.3 * (a.dag() * sm + a * sm.dag())
+
+    evals, ekets = H.eigenstates(blocks=True)
+    assert_equal(amax(abs(evals - H.eigenenergies())) < 1e-10, True)
+
+    for n in range(len(evals)):
+        # assert that max(H * ket - e * ket) is small
+        assert_equal(amax(
+            abs((H * ekets[n] - evals[n] * ekets[n]).full())) < 1e-10, True)
+
+
 if __name__ == "__main__":
     run_module_suite()
@@ -37,7 +37,9 @@ from numpy.testing import assert_, run_module_suite
 from qutip.operators import (num, destroy,
                              sigmax, sigmay, sigmaz, sigmam, sigmap)
 from qutip.states import fock, fock_dm
-from qutip.expect import expect
+from qutip.expect import expect, _ExpectOps
+from qutip.random_objects import rand_ket, rand_dm
+from qutip.superoperator import mat2vec
 from qutip.mesolve import mesolve
 
 
@@ -158,6 +160,24 @@ class TestExpect:
             assert_(e1[n].dtype == e2[n].dtype)
             assert_(all(abs(e1[n] - e2[n]) < 1e-12))
 
+    def testExpectOps(self):
+        """
+        expect: stacked operators for kets and density matrices
+        """
+        N = 10
+        e_ops = [num(N), destroy(N), destroy(N) + destroy(N).dag()]
+        e_set = _ExpectOps(e_ops)
+        e_set_rho = _ExpectOps(e_ops, rho_vec=True)
+
+        psi = rand_ket(N)
+        rho = rand_dm(N)
+        e1 = e_set.expect(psi.full().ravel())
+        e2 = e_set_rho.expect(mat2vec(rho.full()).ravel())
+        for n, op in enumerate(e_ops):
+            assert_(abs(e1[n] - expect(op, psi)) < 1e-12)
+            assert_(abs(e2[n] - expect(op, rho)) < 1e-12)
+            assert_(np.iscomplexobj(e1[n]) == (not op.isherm))
+
 
 if __name__ == "__main__":
     run_module_suite()
@@ -104,6 +104,36 @@ def test_graph_rcm_boost():
     bw=sparse_bandwidth(P)
     assert_equal(bw[2], 4)
 
+def test_graph_components():
+    "Graph: Connected components"
+    M=np.zeros((6,6))
+    M[0,3]=1
+    M[3,5]=1
+    M[1,4]=1
+    M=sp.csr_matrix(M)
+    comps=graph_components(M)
+    assert_equal(len(comps), 3)
+    assert_equal(comps[0], [0,3,5])
+    assert_equal(comps[1], [1,4])
+    assert_equal(comps[2], [2])
+
+
+def test_graph_components_cancelling():
+    "Graph: Connected components with cancelling entries"
+    comps=graph_components(sigmay())
+    assert_equal(len(comps), 1)
+    assert_equal(comps[0], [0,1])
+    M=sp.csr_matrix(np.array([[0,1,0],[-1,0,0],[0,0,1]], dtype=float))
+    comps=graph_components(M)
+    assert_equal(len(comps), 2)
+    assert_equal(comps[0], [0,1])
+    assert_equal(comps[1], [2])
+    H=tensor(sigmay(), qeye(2))
+    comps=graph_components(H.data)
+    assert_equal(len(comps), 2)
+    assert_equal(comps[0], [0,2])
+    assert_equal(comps[1], [1,3])
+
 
 if __name__ == "__main__":
     run_module_suite()
@@ -38,6 +38,9 @@ from numpy import allclose, linspace, mean, ones
 from numpy.testing import assert_equal, run_module_suite
 from numpy.testing.decorators import skipif
 import unittest
+import os
+import shutil
+import tempfile
 # find Cython if it exists
 try:
     import Cython
@@ -370,5 +373,119 @@ def test_mc_dtypes2():
     assert_equal(isinstance(data.expect[0][1][1], float), True)
     assert_equal(isinstance(data.expect[0][2][1], complex), True)
 
+
+def test_MCSimpleConstDopri():
+    "Monte-carlo: Constant H with constant collapse (dopri5)"
+    N = 10  # number of basis states to consider
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 9)  # initial state
+    kappa = 0.2  # coupling to oscillator
+    c_op_list = [sqrt(kappa) * a]
+    tlist = linspace(0, 10, 100)
+    mcdata = mcsolve(H, psi0, tlist, c_op_list, [a.dag() * a],
+                     options=Odeoptions(gui=False, method='dopri5'))
+    expt = mcdata.expect[0]
+    actual_answer = 9.0 * exp(-kappa * tlist)
+    avg_diff = mean(abs(actual_answer - expt) / actual_answer)
+    assert_equal(avg_diff < mc_error, True)
+
+
+def test_MCChunked():
+    "Monte-carlo: trajectories averaged in chunks"
+    N = 10  # number of basis states to consider
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 9)  # initial state
+    kappa = 0.2  # coupling to oscillator
+    c_op_list = [sqrt(kappa) * a]
+    tlist = linspace(0, 10, 100)
+    opts = Odeoptions(gui=False, chunk_size=50)
+    mcdata = mcsolve(H, psi0, tlist, c_op_list, [a.dag() * a], options=opts)
+    expt = mcdata.expect[0]
+    actual_answer = 9.0 * exp(-kappa * tlist)
+    avg_diff = mean(abs(actual_answer - expt) / actual_answer)
+    assert_equal(avg_diff < mc_error, True)
+    # the initial state is the same for all trajectories
+    assert_equal(mcdata.expect_err[0][0] < 1e-8, True)
+    assert_equal(all(mcdata.expect_err[0][1:] > 0), True)
+    assert_equal(len(mcdata.col_times), opts.ntraj)
+
+
+def test_MCSeedsReproducible():
+    "Monte-carlo: trajectories reproducible from a base seed"
+    N = 10  # number of basis states to consider
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 9)  # initial state
+    kappa = 0.2  # coupling to oscillator
+    c_op_list = [sqrt(kappa) * a]
+    tlist = linspace(0, 10, 100)
+    opts1 = Odeoptions(gui=False, seeds=1234, ntraj=50, num_cpus=1)
+    opts2 = Odeoptions(gui=False, seeds=1234, ntraj=50, num_cpus=2)
+    data1 = mcsolve(H, psi0, tlist, c_op_list, [a.dag() * a], options=opts1)
+    data2 = mcsolve(H, psi0, tlist, c_op_list, [a.dag() * a], options=opts2)
+    assert_equal(allclose(data1.expect[0], data2.expect[0]), True)
+
+
+def test_MCCheckpoint():
+    "Monte-carlo: resume from checkpoint"
+    N = 10  # number of basis states to consider
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 9)  # initial state
+    kappa = 0.2  # coupling to oscillator
+    c_op_list = [sqrt(kappa) * a]
+    tlist = linspace(0, 10, 100)
+    path = tempfile.mkdtemp()
+    try:
+        opts = Odeoptions(gui=False, ntraj=100, chunk_size=20,
+                          checkpoint_dir=os.path.join(path, 'mc'))
+        data1 = mcsolve(H, psi0, tlist, c_op_list, [a.dag() * a],
+                        options=opts)
+        # lose the last chunks, as if the run had been interrupted
+        for name in ['chunk_00000060.qu', 'chunk_00000080.qu']:
+            os.remove(os.path.join(path, 'mc', name))
+        data2 = mcsolve(H, psi0, tlist, c_op_list, [a.dag() * a],
+                        options=opts)
+    finally:
+        shutil.rmtree(path)
+    assert_equal(allclose(data1.expect[0], data2.expect[0]), True)
+    assert_equal(data2.ntraj, 100)
+
+
+def test_MCBlock():
+    "Monte-carlo: trajectories evolved as one block"
+    N = 10  # number of basis states to consider
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 9)  # initial state
+    kappa = 0.2  # coupling to oscillator
+    c_op_list = [sqrt(kappa) * a]
+    tlist = linspace(0, 10, 100)
+    opts = Odeoptions(gui=False, block_trajectories=True, chunk_size=50)
+    mcdata = mcsolve(H, psi0, tlist, c_op_list, [a.dag() * a], options=opts)
+    expt = mcdata.expect[0]
+    actual_answer = 9.0 * exp(-kappa * tlist)
+    avg_diff = mean(abs(actual_answer - expt) / actual_answer)
+    assert_equal(avg_diff < mc_error, True)
+
+
+def test_MCTargetTol():
+    "Monte-carlo: number of trajectories set by target tolerance"
+    N = 10  # number of basis states to consider
+    a = destroy(N)
+    H = a.dag() * a
+    psi0 = basis(N, 9)  # initial state
+    kappa = 0.2  # coupling to oscillator
+    c_op_list = [sqrt(kappa) * a]
+    tlist = linspace(0, 10, 100)
+    opts = Odeoptions(gui=False, target_tol=0.2)
+    mcdata = mcsolve(H, psi0, tlist, c_op_list, [a.dag() * a], options=opts)
+    assert_equal(mcdata.ntraj < opts.ntraj, True)
+    assert_equal(max(mcdata.expect_err[0]) <= 0.2, True)
+    assert_equal(len(mcdata.col_times) >= mcdata.ntraj, True)
+
+
 if __name__ == "__main__":
     run_module_suite()
@@ -33,7 +33,7 @@
 
 from functools import partial
 from numpy import allclose, linspace, mean, ones
-from numpy.testing import assert_, run_module_suite
+from numpy.testing import assert_, assert_raises, run_module_suite
 
 # disable the MC progress bar
 import os
@@ -41,6 +41,11 @@ os.environ['QUTIP_GRAPHICS'] = "NO"
 
 from qutip import *
 from qutip.odechecks import _ode_checks
+import qutip.settings
+import shutil
+import tempfile
+import warnings
+from distutils.errors import CompileError
 
 
 class TestJCModelEvolution:
@@ -189,6 +194,34 @@ class TestJCModelEvolution:
         assert_(max(abs(sy - sy_analytic)) < 0.05)
         assert_(max(abs(sz - sz_analytic)) < 0.05)
 
+    def testQubitDynamicsKrylov(self):
+        "mesolve: qubit without dissipation, krylov propagation"
+
+        delta = 1.0 * 2 * pi   # atom frequency
+        H = delta / 2.0 * sigmax()
+        psi0 = basis(2, 0)        # initial state
+        tlist = linspace(0, 5, 200)
+
+        opts = Odeoptions(method='krylov')
+        output = mesolve(H, psi0, tlist, [], [sigmay(), sigmaz()],
+                         options=opts)
+        sy, sz = output.expect
+
+        assert_(max(abs(sy + sin(2 * pi * tlist))) < 1e-6)
+        assert_(max(abs(sz - cos(2 * pi * tlist))) < 1e-6)
+
+    def testQubitDynamicsUnsupportedMethod(self):
+        "mesolve: dissipative qubit, unsupported integration method"
+
+        H = 2 * pi * sigmax()
+        psi0 = basis(2, 0)
+        tlist = linspace(0, 5, 20)
+        c_ops = [sqrt(0.1) * destroy(2)]
+
+        for method in ['krylov', 'dopri5']:
+            assert_raises(ValueError, mesolve, H, psi0, tlist, c_ops, [],
+                          options=Odeoptions(method=method))
+
     def testCase1(self):
         "mesolve: cavity-qubit interaction, no dissipation"
 
@@ -367,6 +400,24 @@ class TestMESolverConstDecay:
         avg_diff = mean(abs(actual_answer - expt) / actual_answer)
         assert_(avg_diff < me_error)
 
+    def testMESimpleConstDecayMatrixForm(self):
+        "mesolve: constant decay in matrix form"
+
+        N = 10  # number of basis states to consider
+        a = destroy(N)
+        H = a.dag() * a
+        psi0 = basis(N, 9)  # initial state
+        kappa = 0.2  # coupling to oscillator
+        c_op_list = [sqrt(kappa) * a]
+        tlist = linspace(0, 10, 100)
+        opts = Odeoptions(rhs_matrix_form=True)
+        medata = mesolve(H, psi0, tlist, c_op_list, [a.dag() * a],
+                         options=opts)
+        expt = medata.expect[0]
+        actual_answer = 9.0 * exp(-kappa * tlist)
+        avg_diff = mean(abs(actual_answer - expt) / actual_answer)
+        assert_(avg_diff < me_error)
+
 
 # average error for failure
 me_error = 1e-6
@@ -433,6 +484,141 @@ class TestMESolveTDDecay:
         avg_diff = mean(abs(actual_answer - expt) / actual_answer)
         assert_(avg_diff < me_error)
 
+    def testMESimpleTDDecayAsStrListNoCompile(self):
+        "mesolve: string list time-dependence without compilation"
+
+        N = 10  # number of basis states to consider
+        a = destroy(N)
+        H = a.dag() * a
+        psi0 = basis(N, 9)  # initial state
+        kappa = 0.2  # coupling to oscillator
+        c_op_list = [[a, 'sqrt(k*exp(-t))']]
+        args = {'k': kappa}
+        tlist = linspace(0, 10, 100)
+        qutip.settings.rhs_compile = False
+        try:
+            medata = mesolve(H, psi0, tlist, c_op_list, [a.dag() * a],
+                             args=args)
+        finally:
+            qutip.settings.rhs_compile = True
+        expt = medata.expect[0]
+        actual_answer = 9.0 * exp(-kappa * (1.0 - exp(-tlist)))
+        avg_diff = mean(abs(actual_answer - expt) / actual_answer)
+        assert_(avg_diff < me_error)
+
+    def testMESimpleTDDecayAsSampledList(self):
+        "mesolve: simple time-dependence as sampled coefficients"
+
+        N = 10  # number of basis states to consider
+        a = destroy(N)
+        H = a.dag() * a
+        psi0 = basis(N, 9)  # initial state
+        kappa = 0.2  # coupling to oscillator
+        tlist = linspace(0, 10, 100)
+        actual_answer = 9.0 * exp(-kappa * (1.0 - exp(-tlist)))
+        # samples at the output times and on a separate grid
+        times = linspace(0, 10, 51)
+        for samples in [sqrt(kappa * exp(-tlist)),
+                        (times, sqrt(kappa * exp(-times)))]:
+            c_op_list = [[a, samples]]
+            medata = mesolve(H, psi0, tlist, c_op_list, [a.dag() * a])
+            expt = medata.expect[0]
+            avg_diff = mean(abs(actual_answer - expt) / actual_answer)
+            assert_(avg_diff < me_error)
+
+    def testMESimpleTDDecayAsStrListCached(self):
+        "mesolve: string list time-dependence from the RHS cache"
+
+        N = 10  # number of basis states to consider
+        a = destroy(N)
+        H = a.dag() * a
+        psi0 = basis(N, 9)  # initial state
+        c_op_list = [[a, 'sqrt(k*exp(-t))']]
+        tlist = linspace(0, 10, 100)
+        cache_dir = qutip.settings.rhs_cache_dir
+        qutip.settings.rhs_cache_dir = tempfile.mkdtemp()
+        try:
+            # the second and third problems only differ in the values of the
+            # args and use the module compiled for the first
+            for kappa in [0.2, 0.1, 0.05]:
+                medata = mesolve(H, psi0, tlist, c_op_list, [a.dag() * a],
+                                 args={'k': kappa})
+                actual_answer = 9.0 * exp(-kappa * (1.0 - exp(-tlist)))
+                avg_diff = mean(abs(actual_answer - medata.expect[0]) /
+                                actual_answer)
+                assert_(avg_diff < me_error)
+            assert_(len([f for f in os.listdir(qutip.settings.rhs_cache_dir)
+                         if f.startswith('rhs_')]) == 1)
+        finally:
+            shutil.rmtree(qutip.settings.rhs_cache_dir)
+            qutip.settings.rhs_cache_dir = cache_dir
+
+    def testMESimpleTDDecayAsStrListCompileFailure(self):
+        "mesolve: python RHS module if the compilation fails"
+
+        N = 10  # number of basis states to consider
+        a = destroy(N)
+        H = a.dag() * a
+        psi0 = basis(N, 9)  # initial state
+        kappa = 0.2  # coupling to oscillator
+        c_op_list = [[a, 'sqrt(k*exp(-t))']]
+        tlist = linspace(0, 10, 100)
+
+        def _build_failure(*args, **kwargs):
+            raise CompileError("no compiler")
+
+        try:
+            from pyximport import pyxbuild
+            pyx_to_dll = pyxbuild.pyx_to_dll
+            pyxbuild.pyx_to_dll = _build_failure
+        except ImportError:
+            pyxbuild = None
+        cache_dir = qutip.settings.rhs_cache_dir
+        rhs_compile = qutip.settings.rhs_compile
+        qutip.settings.rhs_cache_dir = tempfile.mkdtemp()
+        qutip.settings.rhs_compile = True
+        try:
+            with warnings.catch_warnings(record=True) as w:
+                warnings.simplefilter("always")
+                medata = mesolve(H, psi0, tlist, c_op_list, [a.dag() * a],
+                                 args={'k': kappa})
+            assert_(len(w) > 0)
+            # the failure does not switch off compilation for later calls
+            assert_(qutip.settings.rhs_compile)
+            assert_([f for f in os.listdir(qutip.settings.rhs_cache_dir)
+                     if f.startswith('rhs_')][0].endswith('.py'))
+        finally:
+            if pyxbuild is not None:
+                pyxbuild.pyx_to_dll = pyx_to_dll
+            shutil.rmtree(qutip.settings.rhs_cache_dir)
+            qutip.settings.rhs_cache_dir = cache_dir
+            qutip.settings.rhs_compile = rhs_compile
+        actual_answer = 9.0 * exp(-kappa * (1.0 - exp(-tlist)))
+        avg_diff = mean(abs(actual_answer - medata.expect[0]) / actual_answer)
+        assert_(avg_diff < me_error)
+
+    def testMESimpleTDDecayMatrixForm(self):
+        "mesolve: simple time-dependence in matrix form"
+
+        N = 10  # number of basis states to consider
+        a = destroy(N)
+        H = a.dag() * a
+        psi0 = basis(N, 9)  # initial state
+        kappa = 0.2  # coupling to oscillator
+
+        def sqrt_kappa(t, args):
+            return sqrt(kappa * exp(-t))
+        tlist = linspace(0, 10, 100)
+        actual_answer = 9.0 * exp(-kappa * (1.0 - exp(-tlist)))
+        opts = Odeoptions(rhs_matrix_form=True)
+        for c_op_list in [[[a, sqrt_kappa]], [[a, 'sqrt(k*exp(-t))']]]:
+            medata = mesolve([H, [H, '0.5 * sin(t)']], psi0, tlist,
+                             c_op_list, [a.dag() * a], args={'k': kappa},
+                             options=opts)
+            expt = medata.expect[0]
+            avg_diff = mean(abs(actual_answer - expt) / actual_answer)
+            assert_(avg_diff < me_error)
+
 
 if __name__ == "__main__":
     run_module_suite()
@@ -31,8 +31,12 @@
 #    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 ###############################################################################
 
+import os
+import sys
 import scipy
 import time
+import shutil
+import tempfile
 from numpy.testing import assert_, run_module_suite
 
 from qutip import *
@@ -53,5 +57,44 @@ def test_parfor1():
     assert_((array(y1) == array(y2)).all())
 
 
+def _pid(x):
+    return os.getpid()
+
+
+def test_parfor_pool_reuse():
+    "parfor: persistent worker pool is reused between calls"
+
+    pids1 = set(parfor(_pid, arange(20), num_cpus=2))
+    pids2 = set(parfor(_pid, arange(20), num_cpus=2))
+
+    assert_(pids2 <= pids1)
+
+    pool_shutdown()
+    pids3 = set(parfor(_pid, arange(20), num_cpus=2))
+
+    assert_(len(pids3 & pids1) == 0)
+
+
+def test_parfor_late_function():
+    "parfor: function unknown to the running workers"
+
+    parfor(_pid, arange(4), num_cpus=2)
+
+    # a module that only becomes importable after the pool was started
+    path = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(path, '_parfor_late.py'), 'w') as f:
+            f.write("def square(x):\n    return x**2\n")
+        sys.path.insert(0, path)
+        import _parfor_late
+        y = parfor(_parfor_late.square, arange(10), num_cpus=2)
+        assert_((array(y) == arange(10)**2).all())
+    finally:
+        sys.path.remove(path)
+        sys.modules.pop('_parfor_late', None)
+        shutil.rmtree(path)
+        pool_shutdown()
+
+
 if __name__ == "__main__":
     run_module_suite()
@@ -0,0 +1,129 @@
+# This file is part of QuTiP: Quantum Toolbox in Python.
+#
+#    Copyright (c) 2011 and later, Paul D. Nation and Robert J. Johansson.
+#    All rights reserved.
+#
+#    Redistribution and use in source and binary forms, with or without 
+#    modification, are permitted provided that the following conditions are 
+#    met:
+#
+#    1. Redistributions of source code must retain the above copyright notice, 
+#       this list of conditions and the following disclaimer.
+#
+#    2. Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#
+#    3. Neither the name of the QuTiP: Quantum Toolbox in Python nor the names
+#       of its contributors may be used to endorse or promote products derived
+#       from this software without specific prior written permission.
+#
+#    THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS 
+#    "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+#    LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A 
+#    PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT 
+#    HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, 
+#    SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT 
+#    LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, 
+#    DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY 
+#    THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT 
+#    (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE 
+#    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+###############################################################################
+
+import numpy as np
+from numpy.testing import assert_, run_module_suite
+
+from qutip import (sigmax, sigmay, sigmaz, destroy, qeye, tensor, basis,
+                   ket2dm, liouvillian, mesolve, mat2vec, vec2mat, Odeoptions)
+from qutip.propagator import propagator
+
+
+def test_propagator_const_unitary():
+    "propagator: constant Hamiltonian"
+    H = np.pi * sigmax() + 0.3 * sigmaz()
+    tlist = np.linspace(0, 3, 7)
+    U = propagator(H, tlist, [])
+    for k, t in enumerate(tlist):
+        assert_(np.allclose(U[k].full(), (-1j * H * t).expm().full()))
+
+
+def test_propagator_const_complex_hermitian():
+    "propagator: constant complex Hermitian Hamiltonian"
+    for H in [sigmay(), 0.5 * sigmay() + 0.3 * sigmaz(),
+              tensor(sigmay(), qeye(2)) + 0.2 * tensor(sigmaz(), sigmax())]:
+        tlist = np.linspace(0, 3, 7)
+        U = propagator(H, tlist, [])
+        for k, t in enumerate(tlist):
+            assert_(np.allclose(U[k].full(), (-1j * H * t).expm().full()))
+
+
+def test_propagator_const_complex_dissipative():
+    "propagator: constant Liouvillian with a complex Hamiltonian"
+    H = sigmay()
+    c_ops = [np.sqrt(0.2) * destroy(2)]
+    L = liouvillian(H, c_ops)
+    tlist = np.linspace(0, 2, 5)
+    U = propagator(H, tlist, c_ops)
+    for k, t in enumerate(tlist):
+        assert_(np.allclose(U[k].full(), (L * t).expm().full()))
+
+
+def test_propagator_const_dissipative():
+    "propagator: constant Liouvillian, unequal time steps"
+    H = np.pi * sigmax() + 0.3 * sigmaz()
+    c_ops = [np.sqrt(0.2) * destroy(2)]
+    L = liouvillian(H, c_ops)
+    tlist = [0, 0.1, 0.5, 0.6, 2.0]
+    U = propagator(H, tlist, c_ops)
+    for k, t in enumerate(tlist):
+        assert_(np.allclose(U[k].full(), (L * t).expm().full()))
+
+
+def test_propagator_td():
+    "propagator: time-dependent Hamiltonian and collapse operators"
+    H = [np.pi * sigmax(), [sigmaz(), 'cos(w * t)']]
+    c_ops = [[destroy(2), '0.3 * t']]
+    args = {'w': 1.0}
+    opts = Odeoptions(atol=1e-10, rtol=1e-8)
+    U = propagator(H, 2.0, c_ops, args=args, options=opts)
+    rho0 = ket2dm(basis(2, 0))
+    rho_t = mesolve(H, rho0, [0, 2.0], c_ops, [], args=args,
+                    options=opts).states[-1]
+    rho_u = vec2mat(np.dot(U.full(), mat2vec(rho0.full())))
+    assert_(np.allclose(rho_u, rho_t.full(), atol=1e-6))
+
+
+def test_propagator_td_liouvillian():
+    "propagator: time-dependent Liouvillian in the list format"
+    H0 = np.pi * sigmax()
+    c_ops = [np.sqrt(0.2) * destroy(2)]
+    tlist = np.linspace(0, 2, 5)
+    opts = Odeoptions(atol=1e-10, rtol=1e-8)
+    U_super = propagator([liouvillian(H0, c_ops),
+                          [liouvillian(sigmaz(), []), 'cos(t)']],
+                         tlist, [], options=opts)
+    U_oper = propagator([H0, [sigmaz(), 'cos(t)']], tlist, c_ops,
+                        options=opts)
+    for k in range(len(tlist)):
+        assert_(np.allclose(U_super[k].full(), U_oper[k].full(), atol=1e-6))
+
+
+def _H_func(t, args):
+    return (np.pi * sigmax() + np.cos(t) * sigmaz()).data
+
+
+def test_propagator_func_parallel():
+    "propagator: function format Hamiltonian, parallel columns"
+    tlist = np.linspace(0, 2, 5)
+    U_func = propagator(_H_func, tlist, [],
+                        options=Odeoptions(atol=1e-10, rtol=1e-8,
+                                           num_cpus=2))
+    U_list = propagator([np.pi * sigmax(), [sigmaz(), 'cos(t)']], tlist, [],
+                        options=Odeoptions(atol=1e-10, rtol=1e-8))
+    for k in range(len(tlist)):
+        assert_(np.allclose(U_func[k].full(), U_list[k].full(), atol=1e-6))
+
+
+if __name__ == "__main__":
+    run_module_suite()
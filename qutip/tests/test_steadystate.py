@@ -32,6 +32,7 @@
 ###############################################################################
 
 
+import importlib
 from qutip import *
 from numpy import linspace
 from numpy.testing import assert_, assert_equal, run_module_suite
@@ -110,5 +111,137 @@ def test_driven_cavity():
     assert_((rho_ss - rho_ss_analytic).norm() < 1e-4)
 
 
+def test_jc_blocks():
+    "Steady state: Jaynes-Cummings model solved for the population block"
+
+    N = 10
+    a = tensor(destroy(N), qeye(2))
+    sm = tensor(qeye(N), destroy(2))
+    H = a.dag() * a + 0.9 * sm.dag() * sm + 0.3 * (a.dag() * sm + a * sm.dag())
+    c_ops = [sqrt(0.1) * a, sqrt(0.05) * sm, sqrt(0.02) * sm.dag()]
+
+    rho_ss = steadystate(H, c_ops, use_blocks=True)
+    assert_((rho_ss - steadystate(H, c_ops)).norm() < 1e-10)
+
+
+def test_driven_cavity_real():
+    "Steady state: Driven cavity with the real Hermitian-basis solvers"
+
+    N = 30
+    Omega = 0.01 * 2 * pi
+    Gamma = 0.05
+
+    a = destroy(N)
+    H = Omega * (a.dag() + a)
+    c_ops = [sqrt(Gamma) * a]
+    rho_ss_analytic = coherent_dm(N, -1.0j * (Omega)/(Gamma/2))
+
+    for method in ['real', 'iterative-real']:
+        rho_ss = steadystate(H, c_ops, method=method)
+        assert_(rho_ss.isherm)
+        assert_(abs(rho_ss.tr() - 1) < 1e-12)
+        assert_((rho_ss - rho_ss_analytic).norm() < 1e-4)
+
+
+def test_real_hamiltonian_liouvillian():
+    "Steady state: real solvers from H and c_ops or from the Liouvillian"
+
+    N = 4
+    a = destroy(N)
+    sm = tensor(qeye(N), sigmam())
+    a = tensor(a, qeye(2))
+    H = (a.dag() * a + 0.5 * sm.dag() * sm +
+         0.3j * (a.dag() * sm - sm.dag() * a) + 0.2 * (a + a.dag()))
+    c_ops = [sqrt(0.1) * a, sqrt(0.05) * sm, sqrt(0.02) * sm.dag() * sm]
+    rho_ss = steadystate(H, c_ops)
+    L = liouvillian_fast(H, c_ops)
+    for method in ['real', 'iterative-real']:
+        assert_((steadystate(H, c_ops, method=method) -
+                 rho_ss).norm() < 1e-4)
+        assert_((steadystate(L, method=method) - rho_ss).norm() < 1e-4)
+
+
+def test_driven_cavity_sweep():
+    "Steady state: Driven cavity sweep with cached factorization"
+
+    N = 30
+    Gamma = 0.05
+
+    a = destroy(N)
+    c_ops = [sqrt(Gamma) * a]
+    for method in ['direct', 'lu', 'power', 'real']:
+        solver = SteadyStateSolver(method=method)
+        for Omega in linspace(0.005, 0.01, 4) * 2 * pi:
+            H = Omega * (a.dag() + a)
+            rho_ss = solver.steadystate(H, c_ops)
+            rho_ss_analytic = coherent_dm(N, -1.0j * (Omega)/(Gamma/2))
+            assert_((rho_ss - rho_ss_analytic).norm() < 1e-4)
+        # orderings are only computed for the first point, and an unchanged
+        # Liouvillian is not factorized again
+        nfact = solver.nfact
+        solver.steadystate(H, c_ops)
+        assert_equal(solver.nfact, nfact)
+
+
+def test_driven_cavity_iterative_sweep():
+    "Steady state: Driven cavity sweep with warm-started iterative solvers"
+
+    N = 30
+    Gamma = 0.05
+
+    a = destroy(N)
+    c_ops = [sqrt(Gamma) * a]
+    H_list = [Omega * (a.dag() + a)
+              for Omega in linspace(0.005, 0.01, 6) * 2 * pi]
+    for method in ['iterative', 'iterative-bicg']:
+        rho_list, iterations = steadystate_sweep(H_list, c_ops,
+                                                 method=method, tol=1e-8)
+        assert_equal(len(iterations), len(H_list))
+        for H, rho_ss in zip(H_list, rho_list):
+            assert_((rho_ss - steadystate(H, c_ops)).norm() < 1e-4)
+
+    # without a preconditioner, the first point is a costly cold start,
+    # which the warm starts from the neighbouring points improve on
+    rho_list, iterations = steadystate_sweep(H_list, c_ops, tol=1e-8,
+                                             use_precond=False)
+    assert_(max(iterations[1:]) < iterations[0])
+    for H, rho_ss in zip(H_list, rho_list):
+        assert_((rho_ss - steadystate(H, c_ops)).norm() < 1e-4)
+
+
+def test_driven_cavity_sweep_precond_rebuild():
+    "Steady state: Driven cavity sweep with preconditioner rebuilds"
+
+    N = 30
+    Gamma = 0.05
+
+    a = destroy(N)
+    c_ops = [sqrt(Gamma) * a]
+    H_list = [Omega * (a.dag() + a)
+              for Omega in linspace(0.005, 0.01, 6) * 2 * pi]
+
+    # count the preconditioners that are built
+    module = importlib.import_module('qutip.steadystate')
+    precondition = module._iterative_precondition
+    builds = []
+
+    def _precondition(*args):
+        builds.append(1)
+        return precondition(*args)
+
+    module._iterative_precondition = _precondition
+    try:
+        rho_list, iterations = steadystate_sweep(H_list, c_ops, tol=1e-8,
+                                                 precond_growth=1.0)
+    finally:
+        module._iterative_precondition = precondition
+
+    # rebuilt after the points that took more iterations than the last
+    # rebuild, and reused for the others
+    assert_(1 < len(builds) < len(H_list))
+    for H, rho_ss in zip(H_list, rho_list):
+        assert_((rho_ss - steadystate(H, c_ops)).norm() < 1e-4)
+
+
 if __name__ == "__main__":
     run_module_suite()
@@ -31,9 +31,14 @@
 #    OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 ###############################################################################
 
+import os
+import shutil
+import tempfile
+
 from qutip import *
 import numpy as np
-from numpy.testing import assert_, assert_equal, run_module_suite
+from numpy.testing import (assert_, assert_equal, assert_raises,
+                           run_module_suite)
 
 
 def test_ssesolve_photocurrent():
@@ -123,5 +128,224 @@ def test_ssesolve_heterodyne():
                  for m in res.measurement]))
 
 
+def test_smesolve_higher_order():
+    "Stochastic: smesolve: taylor1.5, implicit and adaptive milstein"
+    tol = 0.01
+
+    N = 4
+    gamma = 0.25
+    ntraj = 25
+    a = destroy(N)
+
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [sqrt(gamma) * a]
+    e_ops = [a.dag() * a, a + a.dag(), (-1j)*(a - a.dag())]
+
+    times = np.linspace(0, 2.5, 50)
+    res_ref = mesolve(H, psi0, times, sc_ops, e_ops)
+
+    for kwargs in [{'solver': 'taylor1.5', 'nsubsteps': 10},
+                   {'solver': 'milstein-imp', 'nsubsteps': 10},
+                   {'solver': 'milstein-imp', 'nsubsteps': 10, 'theta': 1.0,
+                    'method': 'heterodyne'},
+                   {'solver': 'milstein', 'nsubsteps': 1, 'adaptive': True}]:
+        res = smesolve(H, psi0, times, [], sc_ops, e_ops,
+                       ntraj=ntraj, store_measurement=True, **kwargs)
+
+        assert_(all([np.mean(abs(res.expect[idx] - res_ref.expect[idx])) < tol
+                     for idx in range(len(e_ops))]))
+        assert_(len(res.measurement) == ntraj)
+
+    assert_raises(Exception, smesolve, H, psi0, times, [], sc_ops, e_ops,
+                  ntraj=1, solver='taylor1.5', store_noise='tlist')
+
+
+def test_smesolve_parallel():
+    "Stochastic: smesolve: parallel trajectories"
+    N = 4
+    gamma = 0.25
+    ntraj = 7
+    nsubsteps = 20
+    a = destroy(N)
+
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [sqrt(gamma) * a]
+    e_ops = [a.dag() * a, a + a.dag()]
+
+    times = np.linspace(0, 1.0, 20)
+    res = [smesolve(H, psi0, times, [], sc_ops, e_ops,
+                    ntraj=ntraj, nsubsteps=nsubsteps, method='homodyne',
+                    store_measurement=True,
+                    options=Odeoptions(num_cpus=num_cpus, seeds=123,
+                                       chunk_size=3))
+           for num_cpus in [1, 2]]
+
+    # the same trajectories, independent of the number of processes
+    for idx in range(len(e_ops)):
+        assert_equal(res[0].expect[idx], res[1].expect[idx])
+    assert_(len(res[1].measurement) == ntraj)
+    for m0, m1 in zip(res[0].measurement, res[1].measurement):
+        assert_equal(m0, m1)
+
+
+def test_smesolve_block():
+    "Stochastic: smesolve: block of trajectories"
+    N = 4
+    gamma = 0.25
+    ntraj = 5
+    nsubsteps = 20
+    a = destroy(N)
+
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [sqrt(gamma) * a]
+    e_ops = [a.dag() * a, a + a.dag()]
+
+    times = np.linspace(0, 1.0, 20)
+    for solver in ['euler-maruyama', 'milstein']:
+        for method in ['homodyne', 'heterodyne']:
+            res = [smesolve(H, psi0, times, [], sc_ops, e_ops,
+                            ntraj=ntraj, nsubsteps=nsubsteps, solver=solver,
+                            method=method, store_measurement=True,
+                            options=Odeoptions(seeds=123, chunk_size=ntraj,
+                                               block_trajectories=block))
+                   for block in [False, True]]
+
+            # the same trajectories as with one trajectory at a time
+            for idx in range(len(e_ops)):
+                assert_(np.max(abs(res[0].expect[idx] -
+                                   res[1].expect[idx])) < 1e-12)
+            assert_(all([np.max(abs(m0 - m1)) < 1e-12
+                         for m0, m1 in zip(res[0].measurement,
+                                           res[1].measurement)]))
+
+
+def test_smesolve_fused():
+    "Stochastic: smesolve: compiled euler-maruyama steps"
+    from qutip.stochastic import _rhs_rho_euler_maruyama
+
+    N = 4
+    gamma = 0.25
+    ntraj = 5
+    nsubsteps = 20
+    a = destroy(N)
+
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    e_ops = [a.dag() * a, a + a.dag()]
+
+    times = np.linspace(0, 1.0, 20)
+    for method, sc_ops in [('homodyne', [sqrt(gamma) * a, 0.3 * a * a]),
+                           ('heterodyne', [sqrt(gamma) * a, 0.3 * a * a]),
+                           ('photocurrent', [sqrt(gamma) * a])]:
+        res = [smesolve(H, psi0, times, [], sc_ops, e_ops,
+                        ntraj=ntraj, nsubsteps=nsubsteps, method=method,
+                        options=Odeoptions(seeds=123), **kwargs)
+               for kwargs in [{'rhs': _rhs_rho_euler_maruyama}, {}]]
+
+        # the same trajectories as with the python rhs function
+        for idx in range(len(e_ops)):
+            assert_(np.max(abs(res[0].expect[idx] -
+                               res[1].expect[idx])) < 1e-12)
+
+
+def test_smesolve_records():
+    "Stochastic: smesolve: noise and measurement records"
+    N = 4
+    gamma = 0.25
+    ntraj = 5
+    nsubsteps = 20
+    a = destroy(N)
+
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [sqrt(gamma) * a]
+    e_ops = [a.dag() * a]
+
+    times = np.linspace(0, 1.0, 20)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        res = [smesolve(H, psi0, times, [], sc_ops, e_ops,
+                        ntraj=ntraj, nsubsteps=nsubsteps,
+                        store_measurement=measure, options=Odeoptions(seeds=1),
+                        **kwargs)
+               for measure, kwargs in
+               [(True, {}),
+                (False, {'store_noise': False}),
+                (True, {'store_noise': 'tlist',
+                        'noise_file': os.path.join(tmpdir, 'noise.npy'),
+                        'measurement_file': os.path.join(tmpdir, 'm.npy')})]]
+
+        # only the records that are asked for, same averages
+        assert_(res[1].noise == [] and res[1].measurement == [])
+        assert_(np.max(abs(res[0].expect[0] - res[1].expect[0])) < 1e-12)
+
+        # noise summed over the substeps, streamed to disk
+        noise = np.load(os.path.join(tmpdir, 'noise.npy'))
+        assert_equal(noise.shape, (ntraj, 1, len(times), 1))
+        assert_(np.max(abs(noise - np.array(res[0].noise).sum(axis=3)))
+                < 1e-12)
+        assert_(np.max(abs(res[2].measurement -
+                           np.array(res[0].measurement))) < 1e-12)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def test_smesolve_checkpoint():
+    "Stochastic: smesolve: resume from checkpoint with streamed records"
+    N = 4
+    gamma = 0.25
+    ntraj = 6
+    nsubsteps = 10
+    a = destroy(N)
+
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [sqrt(gamma) * a]
+    e_ops = [a.dag() * a]
+
+    times = np.linspace(0, 1.0, 20)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        ref = smesolve(H, psi0, times, [], sc_ops, e_ops, ntraj=ntraj,
+                       nsubsteps=nsubsteps, store_measurement=True,
+                       options=Odeoptions(seeds=3))
+        opts = Odeoptions(seeds=3, chunk_size=2,
+                          checkpoint_dir=os.path.join(tmpdir, 'sme'))
+        kwargs = {'store_noise': 'tlist', 'store_measurement': True,
+                  'noise_file': os.path.join(tmpdir, 'noise.npy')}
+        smesolve(H, psi0, times, [], sc_ops, e_ops, ntraj=ntraj,
+                 nsubsteps=nsubsteps, options=opts, **kwargs)
+        # one file per chunk; lose the last one, as if the run had been
+        # interrupted
+        assert_equal(sorted([f for f in os.listdir(opts.checkpoint_dir)
+                             if f.startswith('chunk_')]),
+                     ['chunk_00000000.qu', 'chunk_00000002.qu',
+                      'chunk_00000004.qu'])
+        os.remove(os.path.join(opts.checkpoint_dir, 'chunk_00000004.qu'))
+        res = smesolve(H, psi0, times, [], sc_ops, e_ops, ntraj=ntraj,
+                       nsubsteps=nsubsteps, options=opts, **kwargs)
+
+        assert_(np.max(abs(res.expect[0] - ref.expect[0])) < 1e-12)
+        assert_(np.max(abs(np.array(res.measurement) -
+                           np.array(ref.measurement))) < 1e-12)
+        noise = np.load(kwargs['noise_file'])
+        assert_(np.max(abs(noise - np.array(ref.noise).sum(axis=3)))
+                < 1e-12)
+
+        # a run with a different record format is refused
+        try:
+            smesolve(H, psi0, times, [], sc_ops, e_ops, ntraj=ntraj,
+                     nsubsteps=nsubsteps, options=opts)
+        except Exception:
+            pass
+        else:
+            assert_(False, "resumed with a different record format")
+    finally:
+        shutil.rmtree(tmpdir)
+
+
 if __name__ == "__main__":
     run_module_suite()
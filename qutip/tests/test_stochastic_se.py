@@ -33,6 +33,9 @@
 
 from qutip import *
 import numpy as np
+import os
+import shutil
+import tempfile
 from numpy.testing import assert_, assert_equal, run_module_suite
 
 
@@ -123,5 +126,46 @@ def test_ssesolve_heterodyne():
                  for m in res.measurement]))
 
 
+def test_ssesolve_checkpoint():
+    "Stochastic: ssesolve: resume from checkpoint"
+    N = 4
+    gamma = 0.25
+    a = destroy(N)
+
+    H = a.dag() * a
+    psi0 = coherent(N, 0.5)
+    sc_ops = [sqrt(gamma) * a]
+    e_ops = [a.dag() * a]
+    times = np.linspace(0, 1.0, 20)
+
+    path = tempfile.mkdtemp()
+    try:
+        opts = Odeoptions(seeds=11, chunk_size=2,
+                          checkpoint_dir=os.path.join(path, 'sse'))
+        res_ref = ssesolve(H, psi0, times, sc_ops, e_ops, ntraj=5,
+                           nsubsteps=10, method='homodyne',
+                           options=Odeoptions(seeds=11))
+        res1 = ssesolve(H, psi0, times, sc_ops, e_ops, ntraj=5, nsubsteps=10,
+                        method='homodyne', options=opts)
+        # all trajectories are restored from the checkpoint
+        res2 = ssesolve(H, psi0, times, sc_ops, e_ops, ntraj=5, nsubsteps=10,
+                        method='homodyne', options=opts)
+        # a changed Hamiltonian or scheme does not resume from the chunks
+        for H_new, kwargs in [(2 * H, {}), (H, {'solver': 'platen'})]:
+            try:
+                ssesolve(H_new, psi0, times, sc_ops, e_ops, ntraj=5,
+                         nsubsteps=10, method='homodyne', options=opts,
+                         **kwargs)
+            except Exception:
+                pass
+            else:
+                assert_(False, "resumed a different problem")
+    finally:
+        shutil.rmtree(path)
+
+    assert_(np.allclose(res1.expect[0], res_ref.expect[0]))
+    assert_(np.allclose(res2.expect[0], res_ref.expect[0]))
+
+
 if __name__ == "__main__":
     run_module_suite()